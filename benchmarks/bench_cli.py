@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+"""
+Cold-start benchmark of the command-line interface: wall time of
+'python -m pycfd mesh' (and of the other startups) w.r.t. a bare NumPy import
+
+To run it: navigate to the 'benchmarks' directory and execute:
+python bench_cli.py
+
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import context
+
+
+def time_command(command, repeat, env):
+    """Median wall time of a command run in a new process"""
+
+    times = []
+    for _ in range(repeat):
+        t_start = time.perf_counter()
+        subprocess.run(command, env=env, check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - t_start)
+
+    return statistics.median(times)
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the startup of the CLI')
+    parser.add_argument('--repeat', type=int, default=10,
+                        help='runs of every command (the median is printed)')
+    parser.add_argument('--size', type=int, default=1000,
+                        help='number of cells of the generated mesh')
+    parser.add_argument('--threshold', type=float, default=None,
+                        help="exit with code 1 if 'pycfd mesh' is slower than the "
+                             "NumPy import by more than this fraction")
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONPATH=context.abs_path_parent_dir)
+    with tempfile.TemporaryDirectory() as work_dir:
+        input_file = os.path.join(work_dir, 'geometry.input')
+        with open(input_file, 'w') as file:
+            file.write('X0\n0\n\nXL\n1\n\nN\n' + str(args.size) + '\n\nSPACING\nuniform\n')
+        mesh = [sys.executable, '-m', 'pycfd', '-q', 'mesh', input_file,
+                os.path.join(work_dir, 'geometry.mesh'), '--no-cache']
+        commands = [('python (empty)', [sys.executable, '-c', 'pass']),
+                    ('import numpy', [sys.executable, '-c', 'import numpy']),
+                    ('pycfd --help', [sys.executable, '-m', 'pycfd', '--help']),
+                    ('pycfd mesh', mesh),
+                    ('import matplotlib.pyplot', [sys.executable, '-c',
+                                                  'import matplotlib.pyplot'])]
+        # warm up the file system cache (the times are of a warm 'cold start')
+        time_command(mesh, 1, env)
+        times = {name: time_command(command, args.repeat, env)
+                 for name, command in commands}
+
+    print('{:<26s} {:>10s} {:>14s}'.format('command', 'time [s]', 'w.r.t. numpy'))
+    for name, _ in commands:
+        print('{:<26s} {:>10.3f} {:>14.2f}'.format(name, times[name],
+                                                   times[name] / times['import numpy']))
+
+    if args.threshold is not None:
+        overhead = times['pycfd mesh'] / times['import numpy'] - 1
+        if overhead > args.threshold:
+            print("'pycfd mesh' is " + '{:.0%}'.format(overhead) +
+                  ' slower than the NumPy import')
+            sys.exit(1)
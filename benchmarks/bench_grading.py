@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark of the graded face nodes: vectorized engine vs sequential loop
+
+To run it: navigate to the 'benchmarks' directory and execute:
+python bench_grading.py
+
+"""
+
+import time
+import numpy as np
+import context
+import pycfd.pymesh as pmsh
+
+
+def legacy_geometric_face_nodes(xf_0, xf_N, N_fv, exp_ratio):
+    """Sequential recurrence previously used by ``mesher()``"""
+    
+    sum_geom_series = (1 - exp_ratio**N_fv) / (1 - exp_ratio)
+    h_1 = (xf_N - xf_0) / sum_geom_series
+    xf = np.zeros(N_fv+1)
+    xf[0] = xf_0
+    xf[-1] = xf_N
+    i = 1
+    while i < N_fv:
+        h_i = h_1 * exp_ratio**(i-1)
+        xf[i] = xf[i-1] + h_i
+        i = i + 1
+    
+    return xf
+
+
+def best_time(fun, *args, repeat=3):
+    """Best wall time (in seconds) over some repetitions"""
+    
+    times = []
+    for _ in range(repeat):
+        t_start = time.perf_counter()
+        fun(*args)
+        times.append(time.perf_counter() - t_start)
+    
+    return min(times)
+
+
+
+if __name__ == '__main__':
+    xf_0, xf_N = 0.0, 1.0
+    print('{:>10s} {:>14s} {:>14s} {:>10s} {:>12s}'.format(
+          'N', 'loop [s]', 'vector [s]', 'speed-up', 'max diff'))
+    for N_fv in [10**3, 10**4, 10**5, 10**6, 10**7]:
+        # keep the ratio between the last and the first cell bounded
+        exp_ratio = 1 + 10 / N_fv
+        t_loop = best_time(legacy_geometric_face_nodes, xf_0, xf_N, N_fv, exp_ratio, 
+                           repeat=1)
+        t_vect = best_time(pmsh.grade_face_nodes, xf_0, xf_N, N_fv, 'geometric', 
+                           exp_ratio)
+        diff = np.abs(legacy_geometric_face_nodes(xf_0, xf_N, N_fv, exp_ratio) - 
+                      pmsh.grade_face_nodes(xf_0, xf_N, N_fv, 'geometric', exp_ratio))
+        print('{:>10d} {:>14.6f} {:>14.6f} {:>10.1f} {:>12.3e}'.format(
+              N_fv, t_loop, t_vect, t_loop/t_vect, diff.max()))
+    
+    print()
+    N_fv = 10**7
+    for spacing, exp_ratio in [('double-sided', 1 + 20/N_fv), 
+                               ('bi-geometric', (1 + 20/N_fv, 1 + 10/N_fv)),
+                               ('tanh', 4.0), ('roberts', 1.01)]:
+        t_vect = best_time(pmsh.grade_face_nodes, xf_0, xf_N, N_fv, spacing, exp_ratio)
+        print('{:>14s} N = {:d}: {:.6f} s'.format(spacing, N_fv, t_vect))
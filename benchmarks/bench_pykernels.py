@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark of the kernel backends: Thomas algorithm in NumPy vs Numba
+
+Every available backend factors and solves the same tridiagonal systems, from
+10^3 to 10^7 unknowns. The first call of the 'numba' backend compiles the
+kernels: its time is printed separately and not counted in the timings.
+
+To run it: navigate to the 'benchmarks' directory and execute:
+python bench_pykernels.py
+
+"""
+
+import argparse
+import time
+import numpy as np
+import context
+import pycfd.pykernels as pykernels
+
+
+def random_system(N, seed=0):
+    """Diagonally dominant tridiagonal system in banded form"""
+
+    rng = np.random.default_rng(seed)
+    A = rng.uniform(-1, 0, (3, N))
+    A[1] = 2.5 + rng.uniform(0, 1, N)
+    A[0, 0] = 0.0
+    A[2, -1] = 0.0
+
+    return A, rng.uniform(-1, 1, N)
+
+
+def thomas(backend, A, b, factors, x):
+    """Factor and solve a system with the kernels of a backend"""
+
+    pykernels.get_kernel('factor_tridiagonal', backend)(*A, *factors)
+    pykernels.get_kernel('solve_factored', backend)(A[0], *factors, b, x)
+
+
+def best_time(fun, *args, repeat=3):
+    """Best wall time (in seconds) over some repetitions"""
+
+    times = []
+    for _ in range(repeat):
+        t_start = time.perf_counter()
+        fun(*args)
+        times.append(time.perf_counter() - t_start)
+
+    return min(times)
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the kernel backends')
+    parser.add_argument('--max-size', type=int, default=10**7,
+                        help='largest number of unknowns')
+    args = parser.parse_args()
+
+    backends = pykernels.available_backends()
+    for backend in pykernels.KERNEL_BACKENDS:
+        if backend not in backends:
+            print('backend ' + backend + ' not available')
+    # compilation (or first import) of the kernels
+    A, b = random_system(10)
+    for backend in backends:
+        t_start = time.perf_counter()
+        thomas(backend, A, b, np.empty((2, 10)), np.empty(10))
+        print('first call of the ' + backend + ' backend: ' +
+              '{:.3f} s'.format(time.perf_counter() - t_start))
+
+    header = '{:>10s}'.format('N') + ''.join('{:>14s}'.format(backend + ' [s]')
+                                             for backend in backends)
+    if 'numba' in backends:
+        header += '{:>10s} {:>12s}'.format('speed-up', 'max diff')
+    print(header)
+    for N in [10**3, 10**4, 10**5, 10**6, 10**7]:
+        if N > args.max_size:
+            break
+        A, b = random_system(N)
+        factors = np.empty((2, N))
+        solutions = {backend: np.empty(N) for backend in backends}
+        times = {backend: best_time(thomas, backend, A, b, factors, solutions[backend])
+                 for backend in backends}
+        line = '{:>10d}'.format(N) + ''.join('{:>14.6f}'.format(times[backend])
+                                             for backend in backends)
+        if 'numba' in backends:
+            diff = np.abs(solutions['numba'] - solutions['numpy']).max()
+            line += '{:>10.1f} {:>12.3e}'.format(times['numpy'] / times['numba'], diff)
+        print(line)
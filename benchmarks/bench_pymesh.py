@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark suite for the mesher and the mesh I/O
+
+Every case is run for meshes from 10^2 to 10^7 cells (by default), measuring
+the wall time (best of some repetitions) and the peak memory allocated while
+running it (with ``tracemalloc``, in a separate run so that tracing does not
+affect the timings). The results are saved in a JSON file, which can be
+compared against a baseline saved in the same format.
+
+To run it: navigate to the 'benchmarks' directory and execute:
+python bench_pymesh.py --output results.json
+
+To compare the results against a baseline (exit code 1 if there is a
+regression larger than the threshold):
+python bench_pymesh.py --output results.json --baseline baseline.json
+
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import context
+import pycfd
+import pycfd.pymesh as pmsh
+import pycfd.pymonitor as pymonitor
+
+
+# number of blocks used for the connect_more_meshes() benchmark
+N_BLOCKS = 8
+
+
+
+def write_input_file(input_file, N_fv, spacing):
+    """Write a geometry input file with N_fv cells in [0, 1]"""
+
+    with open(input_file, 'w') as file:
+        file.write('X0\n0\n\nXL\n1\n\nN\n' + str(N_fv) + '\n\n')
+        file.write('SPACING\n' + spacing + '\n\n')
+        # keep the ratio between the last and the first cell bounded
+        file.write('EXPANSION RATIO\n' + repr(1 + 10/N_fv) + '\n')
+
+
+def setup_cases(work_dir, N_fv):
+    """
+    Cases to be benchmarked for a mesh with N_fv cells
+
+    Returns
+    -------
+    cases : dictionary
+        Name of the case and function (without arguments) running it
+
+    """
+
+    uniform_input = os.path.join(work_dir, 'uniform.input')
+    geometric_input = os.path.join(work_dir, 'geometric.input')
+    write_input_file(uniform_input, N_fv, 'uniform')
+    write_input_file(geometric_input, N_fv, 'geometric')
+    mesh_file = os.path.join(work_dir, 'bench.mesh')
+    binary_file = os.path.join(work_dir, 'bench_binary.mesh')
+    parametric_file = os.path.join(work_dir, 'bench_parametric.mesh')
+
+    mesh = pmsh.mesher(geometric_input, mesh_file, use_cache=False)
+    pmsh.print_mesh(mesh, binary_file, file_format='binary')
+    pmsh.print_mesh(mesh, parametric_file, file_format='parametric')
+
+    # consecutive blocks of the same mesh
+    block_files = []
+    i_blocks = np.linspace(0, N_fv, N_BLOCKS + 1).astype(int)
+    for i in range(N_BLOCKS):
+        block = pmsh.Mesh(mesh.centroids[i_blocks[i]:i_blocks[i+1]],
+                          mesh.face_nodes[i_blocks[i]:i_blocks[i+1] + 1])
+        block_files.append(os.path.join(work_dir, 'block_' + str(i) + '.mesh'))
+        pmsh.print_mesh(block, block_files[-1], file_format='binary')
+
+    batch_N = np.geomspace(10, 10**4, N_fv).astype(int)
+    # as many random points as cells
+    points = np.random.default_rng(0).random(N_fv)
+
+    cases = {
+        'mesher_uniform': lambda: pmsh.mesher(uniform_input, mesh_file, use_cache=False),
+        'mesher_geometric': lambda: pmsh.mesher(geometric_input, mesh_file, use_cache=False),
+        'print_mesh_text': lambda: pmsh.print_mesh(mesh, mesh_file),
+        'print_mesh_binary': lambda: pmsh.print_mesh(mesh, binary_file, 'binary'),
+        'read_mesh_text': lambda: pmsh.read_mesh(mesh_file),
+        'read_mesh_binary': lambda: pmsh.read_mesh(binary_file),
+        'print_mesh_parametric': lambda: pmsh.print_mesh(mesh, parametric_file, 'parametric'),
+        'read_mesh_parametric': lambda: pmsh.read_mesh(parametric_file),
+        # a new mesh every time, so that the index is built as well
+        'locate_points': lambda: pmsh.Mesh(mesh.centroids, mesh.face_nodes).locate(points),
+        'probe_points': lambda: mesh.probe(mesh.centroids, points),
+        'mesh_quality': lambda: pmsh.mesh_quality(mesh),
+        'connect_more_meshes': lambda: pmsh.connect_more_meshes(block_files),
+        'calculate_expansion_ratio': lambda: pmsh.calculate_expansion_ratio(
+                                                 N_fv, 0.0, 1.0, 0.5/N_fv),
+        # N_fv solves at once, for meshes of 10 to 10^4 cells
+        'calculate_expansion_ratio_batch': lambda: pmsh.calculate_expansion_ratio(
+                                                 batch_N, 0.0, 1.0, 0.5/batch_N),
+        }
+
+    return cases
+
+
+def measure(fun, repeat):
+    """
+    Wall time and peak memory of a function
+
+    Returns
+    -------
+    result : dictionary
+        Best wall time (in seconds) and peak of the memory allocated (in
+        bytes). If the function raises an exception, only the error is stored.
+
+    """
+
+    times = []
+    try:
+        for _ in range(repeat):
+            t_start = time.perf_counter()
+            fun()
+            times.append(time.perf_counter() - t_start)
+
+        tracemalloc.start()
+        fun()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    except Exception as error:
+        return {'error': repr(error)}
+    finally:
+        tracemalloc.stop()
+
+    return {'time': min(times), 'peak_memory': peak_memory}
+
+
+def run_benchmarks(sizes, repeat, cases_to_run=None):
+    """
+    Run all the benchmarks
+
+    Parameters
+    ----------
+    sizes : list
+        Number of cells of the meshes
+    repeat : int
+        Number of repetitions used for the timings
+    cases_to_run : list
+        Names of the cases to be run (``None`` to run all of them)
+
+    Returns
+    -------
+    results : dictionary
+        Results of every case (first key) and of every size (second key)
+
+    """
+
+    results = {}
+    # the messages of the mesher are not needed here
+    pymonitor.setup_logging(quiet=True)
+    with tempfile.TemporaryDirectory() as work_dir:
+        for N_fv in sizes:
+            cases = setup_cases(work_dir, N_fv)
+            for name, fun in cases.items():
+                if cases_to_run is not None and name not in cases_to_run:
+                    continue
+                result = measure(fun, repeat)
+                results.setdefault(name, {})[str(N_fv)] = result
+                print_result(name, N_fv, result, sys.stdout)
+
+    return results
+
+
+def print_result(name, N_fv, result, stream):
+    """Print the result of a case in a human-readable form"""
+
+    if 'error' in result:
+        line = '{:<28s} {:>10d} {}'.format(name, N_fv, result['error'])
+    else:
+        line = '{:<28s} {:>10d} {:>12.6f} s {:>12.3f} MiB'.format(
+               name, N_fv, result['time'], result['peak_memory'] / 2**20)
+    stream.write(line + '\n')
+    stream.flush()
+
+
+def compare_to_baseline(results, baseline, threshold):
+    """
+    Compare the results against a baseline
+
+    Parameters
+    ----------
+    results : dictionary
+        Results (see ``run_benchmarks()``)
+    baseline : dictionary
+        Baseline results, in the same format
+    threshold : float
+        Maximum allowed relative increase of time and memory (e.g. 0.2 means
+        that 20% slower is still fine)
+
+    Returns
+    -------
+    regressions : list
+        Description of every regression found
+
+    """
+
+    regressions = []
+    for name, results_case in results.items():
+        for size, result in results_case.items():
+            reference = baseline.get(name, {}).get(size)
+            if reference is None:
+                continue
+            if 'error' in result and 'error' not in reference:
+                regressions.append(name + ' (N = ' + size + '): ' + result['error'])
+                continue
+            for quantity in ['time', 'peak_memory']:
+                if quantity not in result or quantity not in reference:
+                    continue
+                ratio = result[quantity] / max(reference[quantity], 1e-12)
+                if ratio > 1 + threshold:
+                    regressions.append('{} (N = {}): {} is {:.2f}x the baseline'.format(
+                                       name, size, quantity, ratio))
+
+    return regressions
+
+
+def metadata():
+    """Description of the machine and of the software used"""
+
+    return {'pycfd': pycfd.__version__,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count()
+            }
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the mesher and the mesh I/O')
+    parser.add_argument('--max-size', type=int, default=10**7,
+                        help='largest number of cells (sizes are powers of 10 from 10^2)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='number of repetitions of every timing')
+    parser.add_argument('--cases', nargs='+', default=None,
+                        help='cases to be run (default: all)')
+    parser.add_argument('--output', default='bench_pymesh.json',
+                        help='JSON file where the results are saved')
+    parser.add_argument('--baseline', default=None,
+                        help='JSON file with the baseline results')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='maximum relative increase w.r.t. the baseline')
+    args = parser.parse_args()
+
+    sizes = [10**k for k in range(2, 8) if 10**k <= args.max_size]
+    results = run_benchmarks(sizes, args.repeat, args.cases)
+    with open(args.output, 'w') as file:
+        json.dump({'metadata': metadata(), 'results': results}, file, indent=2)
+    print('Results saved to \t' + os.path.abspath(args.output))
+
+    if args.baseline is not None:
+        with open(args.baseline, 'r') as file:
+            baseline = json.load(file)['results']
+        regressions = compare_to_baseline(results, baseline, args.threshold)
+        for regression in regressions:
+            print('REGRESSION: ' + regression)
+        if regressions:
+            sys.exit(1)
+        print('No regressions w.r.t. \t' + os.path.abspath(args.baseline))
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark of the geometric multigrid solver: number of cycles (and of
+preconditioned conjugate gradient iterations) vs number of cells, on
+strongly graded meshes
+
+To run it: navigate to the 'benchmarks' directory and execute:
+python bench_pymultigrid.py
+
+"""
+
+import argparse
+import time
+import numpy as np
+import context
+import pycfd.pymesh as pmsh
+import pycfd.pymultigrid as pmg
+import pycfd.pysolver as psol
+import pycfd.pymonitor as pymonitor
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the multigrid solver')
+    parser.add_argument('--max-size', type=int, default=10**7,
+                        help='largest number of cells (sizes are powers of 10 from 10^3)')
+    parser.add_argument('--ratio', type=float, default=1e6,
+                        help='ratio between the last and the first cell of the mesh')
+    args = parser.parse_args()
+
+    pymonitor.setup_logging(quiet=True)
+    bcs = (('neumann', 1.0), ('dirichlet', 0.0))
+    print('{:>10s} {:>8s} {:>12s} {:>8s} {:>12s} {:>12s} {:>12s}'.format(
+          'N', 'cycles', 'MG [s]', 'PCG it', 'PCG [s]', 'thomas [s]', 'max diff'))
+    for N_fv in [10**k for k in range(3, 8) if 10**k <= args.max_size]:
+        geometry = {'xf_0': 0.0, 'xf_N': 1.0, 'N_fv': N_fv, 'spacing': 'geometric',
+                    'expansion_ratio': args.ratio**(1/N_fv)}
+        mesh = pmsh.generate_mesh(geometry)
+
+        t_start = time.perf_counter()
+        solver = pmg.MultigridSolver(mesh, 1.0, *bcs)
+        phi, info = solver.solve(1.0)
+        t_mg = time.perf_counter() - t_start
+
+        b = solver.rhs(1.0)
+        t_start = time.perf_counter()
+        _, info_pcg = psol.conjugate_gradient(solver.operators[0], b,
+                                              solver.precondition)
+        t_pcg = time.perf_counter() - t_start
+
+        t_start = time.perf_counter()
+        phi_direct = psol.solve_diffusion(mesh, 1.0, 1.0, *bcs)
+        t_thomas = time.perf_counter() - t_start
+
+        print('{:>10d} {:>8d} {:>12.3f} {:>8d} {:>12.3f} {:>12.3f} {:>12.3e}'.format(
+              N_fv, info['n_cycles'], t_mg, info_pcg['n_iterations'], t_pcg, t_thomas,
+              np.abs(phi - phi_direct).max()))
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+"""
+Scaling benchmark of the domain decomposition: an explicit diffusion stencil
+with an expensive source term, run on 1 worker process up to all the cores
+
+To run it: navigate to the 'benchmarks' directory and execute:
+python bench_pypartition.py
+
+"""
+
+import argparse
+import os
+import time
+import numpy as np
+import context
+import pycfd.pymesh as pmsh
+import pycfd.pypartition as ppart
+import pycfd.pymonitor as pymonitor
+
+
+def stencil_kernel(u, subdomain, c, n_terms):
+    """Explicit diffusion step with a source term costing n_terms exponentials"""
+
+    g = subdomain.n_ghost
+    if subdomain.is_first:
+        u[:g] = 0.0
+    if subdomain.is_last:
+        u[-g:] = 0.0
+    interior = u[subdomain.interior]
+    source = np.zeros(len(interior))
+    for k in range(1, n_terms + 1):
+        source += np.exp(-k * interior**2)
+    interior += c * (u[g-1:-g-1] - 2*interior + u[g+1:len(u)-g+1]) + 1e-6*source
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the domain decomposition')
+    parser.add_argument('--size', type=int, default=10**6,
+                        help='number of cells of the mesh')
+    parser.add_argument('--steps', type=int, default=100,
+                        help='number of time steps')
+    parser.add_argument('--terms', type=int, default=8,
+                        help='number of exponentials of the source term of every cell')
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count(),
+                        help='largest number of worker processes')
+    args = parser.parse_args()
+
+    pymonitor.setup_logging(quiet=True)
+    geometry = {'xf_0': 0.0, 'xf_N': 1.0, 'N_fv': args.size, 'spacing': 'uniform',
+                'expansion_ratio': 1.0}
+    mesh = pmsh.generate_mesh(geometry)
+    phi_0 = np.sin(np.pi * mesh.centroids)
+
+    # powers of 2 up to all the cores
+    n_workers = sorted({2**k for k in range(args.max_workers.bit_length())
+                        if 2**k <= args.max_workers} | {args.max_workers})
+
+    print('{:>8s} {:>12s} {:>14s} {:>10s} {:>12s}'.format(
+          'workers', 'time [s]', 'cells*steps/s', 'speed-up', 'efficiency'))
+    t_serial = None
+    for n in n_workers:
+        with ppart.DomainDecomposition(mesh, n) as decomposition, \
+                decomposition.create_field(phi_0) as field:
+            # warm up (start of the workers, first touch of the arrays and of
+            # the shared memory)
+            decomposition.run(stencil_kernel, field, 1, (0.25, args.terms),
+                              parallel=n > 1)
+            t_start = time.perf_counter()
+            decomposition.run(stencil_kernel, field, args.steps, (0.25, args.terms),
+                              parallel=n > 1)
+            t_run = time.perf_counter() - t_start
+        t_serial = t_serial or t_run
+        print('{:>8d} {:>12.3f} {:>14.3e} {:>10.2f} {:>12.2f}'.format(
+              n, t_run, args.size * args.steps / t_run, t_serial / t_run,
+              t_serial / t_run / n))
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+"""
+Throughput benchmark of the results store: appending the fields of every
+time step, compared with raw writes of the same bytes, and reading a single
+step or the time history of a cell
+
+To run it: navigate to the 'benchmarks' directory and execute:
+python bench_pyresults.py
+
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+import context
+import pycfd.pymesh as pmsh
+import pycfd.pyresults as pres
+import pycfd.pymonitor as pymonitor
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the results store')
+    parser.add_argument('--size', type=int, default=10**6,
+                        help='number of cells of the mesh')
+    parser.add_argument('--steps', type=int, default=100,
+                        help='number of time steps')
+    parser.add_argument('--fields', type=int, default=2,
+                        help='number of fields')
+    parser.add_argument('--durable', action='store_true',
+                        help='flush every step to the disk (os.fsync())')
+    parser.add_argument('--dir', default=None,
+                        help='directory of the files (default: a temporary directory)')
+    args = parser.parse_args()
+
+    pymonitor.setup_logging(quiet=True)
+    geometry = {'xf_0': 0.0, 'xf_N': 1.0, 'N_fv': args.size, 'spacing': 'uniform',
+                'expansion_ratio': 1.0}
+    mesh = pmsh.generate_mesh(geometry)
+    names = ['field_' + str(k) for k in range(args.fields)]
+    fields = {name: np.random.default_rng(k).random(args.size)
+              for k, name in enumerate(names)}
+    N_bytes = args.steps * args.fields * args.size * 8
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as work_dir:
+        # RAW WRITES of the same arrays (the reference bandwidth)
+        raw_file = os.path.join(work_dir, 'raw.bin')
+        t_start = time.perf_counter()
+        with open(raw_file, 'wb') as file:
+            for _ in range(args.steps):
+                for name in names:
+                    file.write(memoryview(fields[name]).cast('B'))
+                file.flush()
+                if args.durable:
+                    os.fsync(file.fileno())
+        t_raw = time.perf_counter() - t_start
+
+        # RESULTS STORE
+        results_file = os.path.join(work_dir, 'results.res')
+        t_start = time.perf_counter()
+        with pres.ResultsStore.create(results_file, mesh, names,
+                                      durable=args.durable) as store:
+            for step in range(args.steps):
+                store.append(step, 0.01 * step, fields)
+        t_store = time.perf_counter() - t_start
+
+        # READS
+        t_start = time.perf_counter()
+        store = pres.ResultsStore(results_file)
+        t_open = time.perf_counter() - t_start
+        t_start = time.perf_counter()
+        store.read_step(args.steps // 2, mmap=False)
+        t_step = time.perf_counter() - t_start
+        t_start = time.perf_counter()
+        store.history(names[0], args.size // 2)
+        t_history = time.perf_counter() - t_start
+        store.close()
+
+    print('{:<28s} {:>10s} {:>12s}'.format('operation', 'time [s]', 'MB/s'))
+    print('{:<28s} {:>10.3f} {:>12.1f}'.format('raw writes', t_raw, N_bytes / t_raw / 1e6))
+    print('{:<28s} {:>10.3f} {:>12.1f}'.format('append', t_store, N_bytes / t_store / 1e6))
+    print('{:<28s} {:>10.6f}'.format('open (index ' + str(args.steps) + ' steps)', t_open))
+    print('{:<28s} {:>10.6f}'.format('read one step', t_step))
+    print('{:<28s} {:>10.6f}'.format('history of one cell', t_history))
+    print('append/raw bandwidth: {:.2f}'.format(t_raw / t_store))
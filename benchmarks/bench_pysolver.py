@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark of the steady diffusion solver: Thomas algorithm vs dense solver
+
+The dense solver (``np.linalg.solve`` on the full matrix) needs O(N^2) memory
+and O(N^3) time, so it is run only up to a few thousand cells.
+
+To run it: navigate to the 'benchmarks' directory and execute:
+python bench_pysolver.py
+
+"""
+
+import time
+import numpy as np
+import context
+import pycfd.pymesh as pmsh
+import pycfd.pysolver as psol
+import pycfd.pymonitor as pymonitor
+
+
+# largest mesh solved with the dense solver
+MAX_DENSE_SIZE = 4000
+
+
+def dense_diffusion(mesh, conductivity, source, bc_left, bc_right):
+    """Same system as ``pysolver.solve_diffusion()``, solved as a dense matrix"""
+
+    A, b = psol.assemble_diffusion(mesh, conductivity, source, bc_left, bc_right)
+
+    return np.linalg.solve(psol.banded_to_dense(A), b)
+
+
+def best_time(fun, *args, repeat=3):
+    """Best wall time (in seconds) over some repetitions"""
+
+    times = []
+    for _ in range(repeat):
+        t_start = time.perf_counter()
+        fun(*args)
+        times.append(time.perf_counter() - t_start)
+
+    return min(times)
+
+
+
+if __name__ == '__main__':
+    pymonitor.setup_logging(quiet=True)
+    args = (1.0, 1.0, ('dirichlet', 0.0), ('neumann', 0.0))
+    print('{:>10s} {:>14s} {:>14s} {:>10s} {:>12s}'.format(
+          'N', 'dense [s]', 'thomas [s]', 'speed-up', 'max diff'))
+    for N_fv in [10**2, 10**3, MAX_DENSE_SIZE, 10**5, 10**6, 10**7]:
+        geometry = {'xf_0': 0.0, 'xf_N': 1.0, 'N_fv': N_fv, 'spacing': 'geometric',
+                    'expansion_ratio': 1 + 10/N_fv}
+        mesh = pmsh.generate_mesh(geometry)
+        repeat = 3 if N_fv < 10**7 else 1
+        t_thomas = best_time(psol.solve_diffusion, mesh, *args, repeat=repeat)
+        if N_fv > MAX_DENSE_SIZE:
+            print('{:>10d} {:>14s} {:>14.6f}'.format(N_fv, '-', t_thomas))
+            continue
+        t_dense = best_time(dense_diffusion, mesh, *args)
+        diff = np.abs(dense_diffusion(mesh, *args) - psol.solve_diffusion(mesh, *args))
+        print('{:>10d} {:>14.6f} {:>14.6f} {:>10.1f} {:>12.3e}'.format(
+              N_fv, t_dense, t_thomas, t_dense/t_thomas, diff.max()))
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark of the transient convection-diffusion solver: steps per second of
+every combination of time scheme and convection scheme
+
+To run it: navigate to the 'benchmarks' directory and execute:
+python bench_pytransient.py
+
+For the full comparison (slow: 10^6 cells over 10^5 steps):
+python bench_pytransient.py --size 1000000 --steps 100000
+
+"""
+
+import argparse
+import numpy as np
+import context
+import pycfd.pymesh as pmsh
+import pycfd.pytransient as ptr
+import pycfd.pymonitor as pymonitor
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the transient solver')
+    parser.add_argument('--size', type=int, default=10**6,
+                        help='number of cells of the mesh')
+    parser.add_argument('--steps', type=int, default=100,
+                        help='number of time steps of every scheme')
+    args = parser.parse_args()
+
+    pymonitor.setup_logging(quiet=True)
+    geometry = {'xf_0': 0.0, 'xf_N': 1.0, 'N_fv': args.size, 'spacing': 'geometric',
+                'expansion_ratio': 1 + 10/args.size}
+    mesh = pmsh.generate_mesh(geometry)
+
+    print('{:>16s} {:>10s} {:>10s} {:>12s} {:>14s}'.format(
+          'time scheme', 'convection', 'steps', 'time [s]', 'steps/s'))
+    for time_scheme in ptr.TIME_SCHEMES:
+        for convection_scheme in ptr.CONVECTION_SCHEMES:
+            solver = ptr.ConvectionDiffusion(mesh, velocity=1.0, diffusivity=1e-6,
+                                             bc_left=('dirichlet', 1.0),
+                                             bc_right=('neumann', 0.0),
+                                             time_scheme=time_scheme,
+                                             convection_scheme=convection_scheme)
+            dt = solver.cfl_time_step(0.5)
+            phi = np.zeros(mesh.N_fv)
+            _, stats = solver.run(phi, dt * args.steps, dt=dt)
+            print('{:>16s} {:>10s} {:>10d} {:>12.3f} {:>14.1f}'.format(
+                  time_scheme, convection_scheme, stats['n_steps'],
+                  stats['wall_time'], stats['steps_per_second']))
@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+
+"""
+Entry point of ``python -m pycfd`` (see ``pycli``)
+"""
+
+import sys
+
+from .pycli import main
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+
+"""
+Solution-adaptive h-refinement of 1D meshes
+
+The cells flagged by an error indicator are split in two halves, while pairs
+of neighbour cells flagged for coarsening are merged. The new mesh is obtained
+from the old one by deleting and inserting all the face nodes and centroids
+at once (``np.delete()`` and ``np.insert()``), so the cells that don't change
+keep exactly the same coordinates. The cell values of the fields are
+transferred conservatively: the children of a split cell take the value of
+the parent, and a merged cell takes the volume-weighted average of the two.
+
+Before the mesh is modified, the flags are adjusted so that the width ratio
+of neighbour cells doesn't exceed a maximum, unless it was already larger in
+the old mesh: the coarsening of the larger cell is cancelled or, if it isn't
+being coarsened, the larger cell is refined as well.
+"""
+
+import numpy as np
+
+from . import pymesh
+from . import pymonitor
+from .pymonitor import logger
+
+
+
+def gradient_indicator(mesh, phi):
+    r"""
+    Error indicator based on the gradient of a cell field
+
+    The indicator of every cell is the variation of the field across the cell,
+    :math:`\eta_i = h_i |\nabla \phi|_i`, where the gradient is computed with
+    the values of the neighbour cells (one-sided at the boundaries).
+
+    Parameters
+    ----------
+    mesh : Mesh or dictionary
+        Mesh
+    phi : array
+        Values of the field at the centroids
+
+    Returns
+    -------
+    indicator : array
+        Indicator of every cell
+
+    """
+
+    mesh = pymesh.as_mesh(mesh)
+    xC = mesh.centroids
+    phi = np.asarray(phi, dtype=float)
+    if mesh.N_fv < 2:
+        return np.zeros(mesh.N_fv)
+
+    # extend the centroids with themselves at the boundaries => one-sided
+    # differences in the first and in the last cell
+    i_left = np.maximum(np.arange(mesh.N_fv) - 1, 0)
+    i_right = np.minimum(np.arange(mesh.N_fv) + 1, mesh.N_fv - 1)
+    gradient = (phi[i_right] - phi[i_left]) / (xC[i_right] - xC[i_left])
+
+    return mesh.cell_widths * np.abs(gradient)
+
+
+
+def flag_cells(indicator, refine_threshold=0.3, coarsen_threshold=0.03):
+    """
+    Flag the cells to refine and to coarsen
+
+    Parameters
+    ----------
+    indicator : array
+        Error indicator of every cell (e.g. from ``gradient_indicator()``)
+    refine_threshold : float
+        Cells whose indicator is larger than this fraction of the maximum are
+        refined
+    coarsen_threshold : float
+        Cells whose indicator is smaller than this fraction of the maximum are
+        coarsened
+
+    Raises
+    ------
+    ``ValueError``
+        If the coarsening threshold isn't smaller than the refinement one
+
+    Returns
+    -------
+    refine : array
+        ``True`` for the cells to refine
+    coarsen : array
+        ``True`` for the cells to coarsen
+
+    """
+
+    if not 0 <= coarsen_threshold < refine_threshold:
+        raise ValueError("ERROR: The coarsening threshold must be smaller than "
+                         "the refinement threshold")
+    indicator = np.asarray(indicator, dtype=float)
+    indicator_max = indicator.max() if len(indicator) else 0.0
+    if indicator_max == 0:
+        # uniform field: nothing to refine
+        return np.zeros(len(indicator), dtype=bool), np.ones(len(indicator), dtype=bool)
+
+    refine = indicator > refine_threshold * indicator_max
+    coarsen = indicator < coarsen_threshold * indicator_max
+
+    return refine, coarsen
+
+
+
+@pymonitor.monitored
+def adapt_mesh(mesh, refine, coarsen=None, fields=None, max_ratio=2.0):
+    """
+    Split and merge the flagged cells of a mesh
+
+    Parameters
+    ----------
+    mesh : Mesh or dictionary
+        Mesh to adapt
+    refine : array
+        ``True`` for the cells to split in two halves
+    coarsen : array
+        ``True`` for the cells that can be merged with a neighbour (only pairs
+        of neighbour cells both flagged are merged). Refinement wins when a
+        cell has both flags
+    fields : dictionary
+        Arrays of cell values transferred to the new mesh
+    max_ratio : float
+        Maximum width ratio between neighbour cells (at least 2, since a split
+        cell is half as wide as its neighbours)
+
+    Raises
+    ------
+    ``ValueError``
+        If the flags don't match the number of cells or the maximum ratio is
+        smaller than 2
+
+    Returns
+    -------
+    new_mesh : Mesh
+        Adapted mesh
+    new_fields : dictionary
+        Fields on the adapted mesh (empty if ``fields`` is ``None``)
+
+    """
+
+    mesh = pymesh.as_mesh(mesh)
+    N_fv = mesh.N_fv
+    refine = np.array(refine, dtype=bool)
+    coarsen = (np.zeros(N_fv, dtype=bool) if coarsen is None
+               else np.array(coarsen, dtype=bool))
+    if (len(refine) != N_fv) or (len(coarsen) != N_fv):
+        raise ValueError("ERROR: The flags must have one value per cell")
+    if max_ratio < 2:
+        raise ValueError("ERROR: The maximum ratio between neighbour cells must "
+                         "be at least 2")
+
+    pair_starts = _pair_cells(coarsen & ~refine)
+    refine, pair_starts = _balance_flags(mesh.cell_widths, refine, pair_starts,
+                                         max_ratio)
+    split = np.flatnonzero(refine)
+    merged = np.flatnonzero(pair_starts)
+
+    # COARSENING: delete the face between the two cells of every pair
+    # index of the first cell of the pair after the deletion of the previous pairs
+    merged_new = merged - np.arange(len(merged))
+    xf = np.delete(mesh.face_nodes, merged + 1)
+    xC = np.delete(mesh.centroids, merged + 1)
+    xC[merged_new] = 0.5 * (xf[merged_new] + xf[merged_new + 1])
+
+    # REFINEMENT: insert a face in the middle of every split cell
+    # index of the split cells after the coarsening (they don't belong to pairs)
+    split_new = split - np.searchsorted(merged + 1, split)
+    xf_middle = 0.5 * (xf[split_new] + xf[split_new + 1])
+    xC_left = 0.5 * (xf[split_new] + xf_middle)
+    xC_right = 0.5 * (xf_middle + xf[split_new + 1])
+    xf = np.insert(xf, split_new + 1, xf_middle)
+    xC = np.insert(xC, split_new, xC_left)
+    # after the insertion, the right half follows the left one
+    xC[split_new + np.arange(1, len(split) + 1)] = xC_right
+    new_mesh = pymesh.Mesh(xC, xf, mesh.area)
+    pymonitor.current().allocated(xC, xf)
+
+    # TRANSFER THE FIELDS
+    new_fields = {}
+    widths = mesh.cell_widths
+    for name, values in (fields or {}).items():
+        values = np.asarray(values, dtype=float)
+        if len(values) != N_fv:
+            raise ValueError("ERROR: Field '" + str(name) + "' doesn't have one "
+                             "value per cell")
+        average = ((values[merged] * widths[merged] +
+                    values[merged + 1] * widths[merged + 1]) /
+                   (widths[merged] + widths[merged + 1]))
+        values = np.delete(values, merged + 1)
+        values[merged_new] = average
+        new_fields[name] = np.insert(values, split_new, values[split_new])
+
+    logger.debug('Mesh adapted: ' + str(N_fv) + ' => ' + str(new_mesh.N_fv) +
+                 ' cells (' + str(len(split)) + ' split, ' + str(len(merged)) +
+                 ' pairs merged)')
+
+    return new_mesh, new_fields
+
+
+
+def adapt_to_solution(mesh, phi, refine_threshold=0.3, coarsen_threshold=0.03,
+                      max_ratio=2.0):
+    """
+    Adapt a mesh to a solution with the gradient indicator
+
+    Parameters
+    ----------
+    mesh : Mesh or dictionary
+        Mesh
+    phi : array
+        Values of the solution at the centroids
+    refine_threshold : float
+        See ``flag_cells()``
+    coarsen_threshold : float
+        See ``flag_cells()``
+    max_ratio : float
+        Maximum width ratio between neighbour cells (see ``adapt_mesh()``)
+
+    Returns
+    -------
+    new_mesh : Mesh
+        Adapted mesh
+    new_phi : array
+        Solution transferred to the adapted mesh
+
+    """
+
+    indicator = gradient_indicator(mesh, phi)
+    refine, coarsen = flag_cells(indicator, refine_threshold, coarsen_threshold)
+    new_mesh, new_fields = adapt_mesh(mesh, refine, coarsen, {'phi': phi},
+                                      max_ratio)
+
+    return new_mesh, new_fields['phi']
+
+
+
+def _pair_cells(coarsen):
+    """
+    Group the cells flagged for coarsening in pairs of neighbours
+
+    Every run of consecutive flagged cells is split in pairs from its first
+    cell (with an odd number of cells, the last one isn't merged).
+
+    Returns
+    -------
+    pair_starts : array
+        ``True`` for the first cell of every pair
+
+    """
+
+    N_fv = len(coarsen)
+    index = np.arange(N_fv)
+    run_starts = coarsen & ~np.concatenate([[False], coarsen[:-1]])
+    # index of the first cell of the run each cell belongs to
+    first = np.maximum.accumulate(np.where(run_starts, index, 0))
+    next_flagged = np.concatenate([coarsen[1:], [False]])
+
+    return coarsen & next_flagged & ((index - first) % 2 == 0)
+
+
+
+def _balance_flags(widths, refine, pair_starts, max_ratio):
+    """
+    Adjust the flags so that the adaptation respects the maximum ratio
+
+    A face violates the ratio if, after the adaptation, the ratio between the
+    widths of its cells is larger than ``max_ratio`` and than before. Then,
+    the larger cell stops being coarsened or, if it isn't coarsened, it's
+    refined. Since flags are only added to ``refine`` and removed from
+    ``pair_starts``, the loop ends.
+    """
+
+    refine = refine.copy()
+    pair_starts = pair_starts.copy()
+    ratio_old = np.maximum(widths[1:] / widths[:-1], widths[:-1] / widths[1:])
+    tol = 1 + 1e-12
+
+    while True:
+        pair_ends = np.concatenate([[False], pair_starts[:-1]])
+        new_widths = np.where(refine, 0.5 * widths, widths)
+        starts = np.flatnonzero(pair_starts)
+        new_widths[starts] = new_widths[starts + 1] = widths[starts] + widths[starts + 1]
+
+        left = new_widths[:-1]
+        right = new_widths[1:]
+        ratio = np.maximum(right / left, left / right)
+        faces = np.flatnonzero((ratio > max_ratio * tol) & (ratio > ratio_old * tol))
+        if len(faces) == 0:
+            break
+
+        larger = np.where(left[faces] > right[faces], faces, faces + 1)
+        cancel = larger[pair_starts[larger]]
+        cancel = np.concatenate([cancel, larger[pair_ends[larger]] - 1])
+        grow = larger[~(pair_starts[larger] | pair_ends[larger] | refine[larger])]
+        if (len(cancel) == 0) and (len(grow) == 0):
+            break
+        pair_starts[cancel] = False
+        refine[grow] = True
+
+    return refine, pair_starts
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+
+"""
+Batch meshing of many geometries on a pool of processes
+
+The jobs are distributed to a fixed pool of worker processes (one per core by
+default), so that the start-up of Python and NumPy is paid once per worker
+and not once per geometry. An error in a job is stored in its result instead
+of stopping the whole batch.
+"""
+
+import glob
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+from . import pymesh
+from . import pymeshcache
+from . import pymonitor
+from .pymonitor import logger
+
+
+# characters that make a string a glob pattern
+_GLOB_CHARACTERS = '*?['
+
+
+
+def batch_mesher(inputs, output_dir=None, discr_method='cellcenter',
+                 file_format='text', use_cache=None, max_workers=None,
+                 chunksize=1):
+    """
+    Create the meshes of many geometries in parallel
+
+    Parameters
+    ----------
+    inputs : string or list
+        Glob pattern of geometry input files (e.g. ``'runs/*.input'``) or
+        list of input files, glob patterns and geometry dictionaries (see
+        ``pymesh.read_input_geom()``)
+    output_dir : string
+        Directory where the meshes are saved. If ``None``, every mesh is saved
+        next to its input file (``geometry.input`` => ``geometry.mesh``)
+    discr_method : string
+        Type of discretisation used (see ``pymesh.mesher()``)
+    file_format : string
+        Format of the mesh files (see ``pymesh.print_mesh()``)
+    use_cache : bool
+        If ``True``, use the mesh cache; if ``None``, only if the environment
+        variable ``PYCFD_CACHE_DIR`` is set (see ``pymesh.mesher()``)
+    max_workers : int
+        Number of worker processes (``None`` for one per core). With 1, the
+        meshes are created sequentially in the current process
+    chunksize : int
+        Number of jobs sent to a worker at once (larger values reduce the
+        communication overhead of batches of many small meshes)
+
+    Raises
+    ------
+    ``ValueError``
+        If a geometry dictionary is given without an output directory, or if
+        two jobs would write the same mesh file (e.g. ``a/case.input`` and
+        ``b/case.input`` with the same output directory)
+
+    Returns
+    -------
+    results : list
+        One dictionary for every job, in the same order of the inputs:
+
+            - ``'input'``: input file (or index of the geometry dictionary)
+            - ``'mesh_file'``: mesh file
+            - ``'N_fv'``: number of finite volumes (``None`` if failed)
+            - ``'time'``: wall time of the job (in seconds)
+            - ``'error'``: traceback of the error, ``None`` if successful
+
+    """
+
+    jobs = _create_jobs(inputs, output_dir, discr_method, file_format, use_cache)
+    if max_workers is None:
+        max_workers = os.cpu_count()
+
+    t_start = time.perf_counter()
+    if max_workers == 1 or len(jobs) <= 1:
+        results = [_mesh_job(job) for job in jobs]
+    else:
+        # the workers don't print the messages of the mesher
+        with ProcessPoolExecutor(max_workers=max_workers,
+                                 initializer=pymonitor.set_quiet) as executor:
+            results = list(executor.map(_mesh_job, jobs, chunksize=chunksize))
+    wall_time = time.perf_counter() - t_start
+
+    summary = batch_summary(results, wall_time)
+    logger.info('Meshed ' + str(summary['n_jobs'] - summary['n_failed']) + '/' +
+                str(summary['n_jobs']) + ' geometries in ' +
+                '{:.3f} s'.format(summary['wall_time']))
+    for result in results:
+        if result['error'] is not None:
+            logger.warning('ERROR while meshing ' + str(result['input']) + ':\n' +
+                           result['error'])
+
+    return results
+
+
+
+def batch_summary(results, wall_time=None):
+    """
+    Summary of the timings of a batch
+
+    Parameters
+    ----------
+    results : list
+        Results returned by ``batch_mesher()``
+    wall_time : float
+        Wall time of the whole batch (in seconds)
+
+    Returns
+    -------
+    summary : dictionary
+        ``'n_jobs'``, ``'n_failed'``, ``'wall_time'`` and the total, mean and
+        maximum time of the jobs (``'total_time'``, ``'mean_time'``,
+        ``'max_time'``)
+
+    """
+
+    times = [result['time'] for result in results]
+    summary = {'n_jobs': len(results),
+               'n_failed': sum(result['error'] is not None for result in results),
+               'wall_time': wall_time,
+               'total_time': sum(times),
+               'mean_time': sum(times) / len(times) if times else 0.0,
+               'max_time': max(times, default=0.0)
+               }
+
+    return summary
+
+
+
+def _create_jobs(inputs, output_dir, discr_method, file_format, use_cache):
+    """Expand the inputs into a list of jobs for ``_mesh_job()``"""
+
+    if isinstance(inputs, (str, dict)):
+        inputs = [inputs]
+
+    jobs = []
+    for i, source in enumerate(inputs):
+        if isinstance(source, dict):
+            if output_dir is None:
+                raise ValueError("ERROR: An output directory is needed to mesh geometry dictionaries")
+            mesh_file = os.path.join(output_dir, 'geometry_' + str(i) + '.mesh')
+            jobs.append((i, source, mesh_file, discr_method, file_format, use_cache))
+            continue
+
+        # a glob pattern becomes many input files
+        if any(c in source for c in _GLOB_CHARACTERS):
+            input_files = sorted(glob.glob(source))
+        else:
+            input_files = [source]
+        for input_file in input_files:
+            mesh_file = os.path.splitext(input_file)[0] + '.mesh'
+            if output_dir is not None:
+                mesh_file = os.path.join(output_dir, os.path.basename(mesh_file))
+            jobs.append((input_file, input_file, mesh_file, discr_method,
+                         file_format, use_cache))
+
+    # the workers would overwrite each other's files
+    targets = {}
+    for label, _, mesh_file, *_ in jobs:
+        target = os.path.normcase(os.path.abspath(mesh_file))
+        if target in targets:
+            raise ValueError("ERROR: The meshes of " + str(targets[target]) + " and " +
+                             str(label) + " would both be saved in '" + mesh_file + "'")
+        targets[target] = label
+
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+
+    return jobs
+
+
+
+def _mesh_job(job):
+    """Create a single mesh (executed by the workers)"""
+
+    label, source, mesh_file, discr_method, file_format, use_cache = job
+    result = {'input': label,
+              'mesh_file': mesh_file,
+              'N_fv': None,
+              'time': 0.0,
+              'error': None
+              }
+
+    t_start = time.perf_counter()
+    try:
+        if isinstance(source, dict):
+            if pymeshcache.cache_enabled(use_cache):
+                mesh, _ = pymesh.generate_cached_mesh(source, discr_method)
+            else:
+                mesh = pymesh.generate_mesh(source, discr_method)
+            pymesh.print_mesh(mesh, mesh_file, file_format)
+        else:
+            mesh = pymesh.mesher(source, mesh_file, discr_method, file_format, use_cache)
+        result['N_fv'] = len(mesh)
+    except Exception:
+        result['error'] = traceback.format_exc()
+    result['time'] = time.perf_counter() - t_start
+
+    return result
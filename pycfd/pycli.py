@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+
+"""
+Command-line interface of the library
+
+Run it with ``python -m pycfd <subcommand>`` (``python -m pycfd -h`` for the
+list of subcommands):
+
+    - ``mesh``: generate a mesh from a geometry input file
+    - ``convert``: save a mesh file in another format or precision
+    - ``inspect``: print the size, the precision and the quality of a mesh
+      (exit code 1 if the mesh is not valid)
+    - ``assemble``: connect more mesh files into one
+    - ``plot``: plot a mesh
+
+Only ``argparse`` is imported when the interface starts: every subcommand
+imports the modules it needs when it runs (NumPy and ``pymesh`` for the mesh
+subcommands, Matplotlib only for ``plot``), so a batch job generating meshes
+doesn't pay the import of the plotting libraries.
+"""
+
+import argparse
+import os
+import sys
+
+
+# formats of the mesh files (see pymesh.print_mesh())
+FILE_FORMATS = ('text', 'binary', 'parametric')
+# types of the coordinates (see pymesh.PRECISIONS, not imported to start fast)
+PRECISIONS = ('float32', 'float64')
+
+
+
+def main(argv=None):
+    """
+    Run the command-line interface
+
+    Parameters
+    ----------
+    argv : list
+        Arguments (``None`` for ``sys.argv[1:]``)
+
+    Returns
+    -------
+    exit_code : int
+        0 if the subcommand succeeded, 1 if it failed (the error is printed
+        on the standard error)
+
+    """
+
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    from . import pymonitor
+    pymonitor.setup_logging(args.quiet)
+
+    try:
+        args.run(args)
+    except (ValueError, OSError) as error:
+        message = str(error)
+        if not message.startswith('ERROR'):
+            message = 'ERROR: ' + message
+        print(message, file=sys.stderr)
+        return 1
+
+    return 0
+
+
+
+def _build_parser():
+    """Parser of the arguments of all the subcommands"""
+
+    parser = argparse.ArgumentParser(prog='pycfd',
+                                     description='1D finite volume meshes and solvers')
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help='print only warnings and errors')
+    subparsers = parser.add_subparsers(title='subcommands', dest='subcommand',
+                                       required=True)
+
+    # MESH
+    mesh = subparsers.add_parser('mesh', help='generate a mesh from a geometry input file')
+    mesh.add_argument('input_file', help='geometry input file')
+    mesh.add_argument('mesh_file', nargs='?',
+                      help='mesh file (default: the input file with extension .mesh)')
+    _add_output_arguments(mesh)
+    mesh.add_argument('--stream', action='store_true',
+                      help='generate and write the mesh in chunks, without keeping '
+                           'it in memory')
+    mesh.add_argument('--chunk-size', type=int, default=2**20,
+                      help='values generated at once with --stream')
+    mesh.add_argument('--no-cache', action='store_true',
+                      help="don't look for the mesh in the mesh cache (used only "
+                           "if the environment variable PYCFD_CACHE_DIR is set)")
+    mesh.set_defaults(run=_run_mesh)
+
+    # CONVERT
+    convert = subparsers.add_parser('convert',
+                                    help='save a mesh file in another format or precision')
+    convert.add_argument('mesh_file', help='mesh file to convert')
+    convert.add_argument('output_file', help='converted mesh file')
+    _add_output_arguments(convert)
+    convert.set_defaults(run=_run_convert)
+
+    # INSPECT
+    inspect = subparsers.add_parser('inspect',
+                                    help='print the size, the precision and the quality '
+                                         'of a mesh (exit code 1 if not valid)')
+    inspect.add_argument('mesh_file', help='mesh file')
+    inspect.set_defaults(run=_run_inspect)
+
+    # ASSEMBLE
+    assemble = subparsers.add_parser('assemble', help='connect more mesh files into one')
+    assemble.add_argument('mesh_files', nargs='+',
+                          help='mesh files, in the order they are connected')
+    assemble.add_argument('-o', '--output', required=True, help='assembled mesh file')
+    assemble.add_argument('--format', choices=FILE_FORMATS[:2], default='text',
+                          help='format of the assembled mesh file')
+    assemble.add_argument('--digits', type=int,
+                          help='significant digits of the coordinates in a text file')
+    assemble.add_argument('--tol', type=float, default=1e-10,
+                          help='maximum distance between the interface faces of '
+                               'adjacent meshes')
+    assemble.set_defaults(run=_run_assemble)
+
+    # PLOT
+    plot = subparsers.add_parser('plot', help='plot a mesh')
+    plot.add_argument('mesh_file', help='mesh file')
+    plot.add_argument('--no-legend', action='store_true', help="don't show the legend")
+    plot.add_argument('-o', '--output',
+                      help='image file where to save the plot, instead of showing it')
+    plot.add_argument('--max-markers', type=int,
+                      help='largest number of visible face nodes drawn as markers '
+                           '(with more, the cells are drawn as a strip coloured by '
+                           'their width; default: pymesh.MAX_PLOT_MARKERS)')
+    plot.set_defaults(run=_run_plot)
+
+    return parser
+
+
+
+def _add_output_arguments(parser):
+    """Arguments setting the format and the precision of a mesh file"""
+
+    parser.add_argument('--format', choices=FILE_FORMATS, default='text',
+                        help='format of the mesh file')
+    parser.add_argument('--dtype', choices=PRECISIONS,
+                        help='type of the coordinates (default: double precision, '
+                             'or the type of the converted file)')
+    parser.add_argument('--digits', type=int,
+                        help='significant digits of the coordinates in a text file')
+
+
+
+# SUBCOMMANDS
+def _run_mesh(args):
+    """Generate a mesh from a geometry input file"""
+
+    from . import pymesh
+
+    mesh_file = args.mesh_file
+    if mesh_file is None:
+        mesh_file = os.path.splitext(args.input_file)[0] + '.mesh'
+    dtype = args.dtype or 'float64'
+    if args.stream:
+        pymesh.stream_mesher(args.input_file, mesh_file, file_format=args.format,
+                             chunk_size=args.chunk_size, dtype=dtype,
+                             digits=args.digits)
+    else:
+        pymesh.mesher(args.input_file, mesh_file, file_format=args.format,
+                      use_cache=False if args.no_cache else None, dtype=dtype, digits=args.digits)
+
+
+def _run_convert(args):
+    """Save a mesh file in another format or precision"""
+
+    from . import pymesh
+
+    mesh = pymesh.read_mesh(args.mesh_file, dtype=args.dtype)
+    pymesh.print_mesh(mesh, args.output_file, args.format, args.digits)
+
+
+def _run_inspect(args):
+    """Print the size, the precision and the quality of a mesh"""
+
+    from . import pymesh
+
+    if pymesh.is_parametric_mesh(args.mesh_file):
+        file_format = 'parametric'
+    elif pymesh.is_binary_mesh(args.mesh_file):
+        file_format = 'binary'
+    else:
+        file_format = 'text'
+    # the problems are reported with the quality, not raised while reading
+    mesh = pymesh.read_mesh(args.mesh_file, mmap=True, validate=False)
+    report = pymesh.mesh_quality(mesh)
+    xf = mesh['face_nodes']
+
+    lines = [('file', os.path.abspath(args.mesh_file)),
+             ('format', file_format),
+             ('cells', report['N_fv']),
+             ('face nodes', report['N_faces']),
+             ('precision', xf.dtype.name)]
+    if len(xf) > 0:
+        lines.append(('domain', '[' + str(xf[0]) + ', ' + str(xf[-1]) + ']'))
+    lines += [('min width', report['min_width']),
+              ('max width', report['max_width']),
+              ('max neighbour ratio', report['max_ratio']),
+              ('max centroid offset', report['max_centroid_offset'])]
+    bins = report['ratio_bins']
+    for k, count in enumerate(report['ratio_counts']):
+        lines.append(('ratio ' + '{:g}-{:g}'.format(bins[k], bins[k+1]), count))
+    if getattr(mesh, 'geometry', None) is not None:
+        lines += [(key, value) for key, value in mesh.geometry.items()]
+    lines.append(('valid', not report['errors']))
+    for name, value in lines:
+        print('{:<22s}{}'.format(name, value))
+
+    if report['errors']:
+        raise ValueError("ERROR: Invalid mesh: " + '; '.join(report['errors']))
+
+
+def _run_assemble(args):
+    """Connect more mesh files into one"""
+
+    from . import pymesh
+
+    mesh = pymesh.connect_more_meshes(args.mesh_files, args.tol)
+    pymesh.print_mesh(mesh, args.output, args.format, args.digits)
+
+
+def _run_plot(args):
+    """Plot a mesh"""
+
+    from . import pymesh
+
+    max_markers = args.max_markers
+    if max_markers is None:
+        max_markers = pymesh.MAX_PLOT_MARKERS
+    pymesh.plot_mesh(pymesh.read_mesh(args.mesh_file, mmap=True), not args.no_legend,
+                     max_markers, args.output)
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+
+r"""
+Grid-convergence studies on families of nested meshes
+
+The finest mesh is generated once, and every coarser level agglomerates the
+pairs of cells of the finer one (see ``pymultigrid.coarsen_mesh()``): its
+face nodes are every other face node of the finer mesh, i.e. a strided
+(zero-copy) view of the face nodes of the finest mesh, so the refinement
+ratio is exactly :math:`r = 2` everywhere, also on graded meshes.
+
+The solver is a callback ``solve(mesh, *args)`` returning either a scalar
+(e.g. a flux through a boundary) or a field with a value for every cell.
+The levels are solved in parallel on a pool of processes: the meshes are
+given to the workers when they start, so with the ``fork`` start method they
+are inherited and never pickled. The pool uses ``fork`` explicitly where
+it is available and safe (not on Windows and macOS), whatever the default
+start method of the Python version, unless another context is given. The fields are
+compared on the coarsest mesh, where the solution of every level is
+restricted by averaging over the agglomerated cells (weighted by volume).
+
+From the solutions :math:`f_1, f_2, f_3` of three consecutive levels (from
+the finest) the observed order of accuracy is
+
+.. math:: p = \ln\left(\frac{|f_3 - f_2|}{|f_2 - f_1|}\right) / \ln r
+
+(with the volume-weighted L2 norm of the differences for the fields), the
+Richardson extrapolation is :math:`f_1 + (f_1 - f_2) / (r^p - 1)` and the
+grid convergence index (GCI) of the finest level is
+:math:`F_s |(f_1 - f_2) / f_1| / (r^p - 1)`, a relative error band with
+safety factor :math:`F_s` (1.25 for studies of three or more levels).
+"""
+
+import multiprocessing as mp
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from . import pymesh
+from . import pymonitor
+from . import pymultigrid
+from .pymonitor import logger
+
+
+# refinement ratio of the nested levels
+REFINEMENT_RATIO = 2
+# safety factor of the GCI of studies with at least three levels
+SAFETY_FACTOR = 1.25
+
+# levels of the study running in a worker process (see _init_worker())
+_study = None
+
+
+
+def nested_meshes(mesh, n_levels):
+    """
+    Family of nested meshes, from the given one to the coarsest
+
+    Parameters
+    ----------
+    mesh : Mesh or dictionary
+        Finest mesh
+    n_levels : int
+        Number of levels (including the finest)
+
+    Raises
+    ------
+    ``ValueError``
+        If the number of cells can't be halved ``n_levels - 1`` times
+
+    Returns
+    -------
+    meshes : list
+        Meshes from the finest to the coarsest. The face nodes of every mesh
+        are a view of the face nodes of the finest one
+
+    """
+
+    mesh = pymesh.as_mesh(mesh)
+    if n_levels < 1:
+        raise ValueError("ERROR: At least one level is needed")
+    factor = REFINEMENT_RATIO**(n_levels - 1)
+    if mesh.N_fv % factor != 0:
+        raise ValueError("ERROR: The number of cells (" + str(mesh.N_fv) + ") must be " +
+                         "a multiple of " + str(factor) + " for " + str(n_levels) +
+                         " nested levels")
+
+    meshes = [mesh]
+    for _ in range(n_levels - 1):
+        meshes.append(pymultigrid.coarsen_mesh(meshes[-1]))
+
+    return meshes
+
+
+
+def restrict_field(values, mesh, factor):
+    """
+    Average of a field over groups of agglomerated cells
+
+    Parameters
+    ----------
+    values : array
+        Value of every cell of the fine mesh
+    mesh : Mesh
+        Fine mesh
+    factor : int
+        Number of fine cells in every coarse cell (a power of the refinement
+        ratio, e.g. 4 two levels up)
+
+    Raises
+    ------
+    ``ValueError``
+        If there isn't a value for every cell or the cells can't be grouped
+
+    Returns
+    -------
+    coarse_values : array
+        Volume-weighted average of every group of ``factor`` cells
+
+    """
+
+    values = np.asarray(values, dtype=float)
+    if values.shape != (mesh.N_fv,):
+        raise ValueError("ERROR: The field must have one value per cell")
+    if mesh.N_fv % factor != 0:
+        raise ValueError("ERROR: " + str(mesh.N_fv) + " cells can't be grouped by " +
+                         str(factor))
+    if factor == 1:
+        return values
+
+    volumes = mesh.volumes.reshape(-1, factor)
+    coarse_values = ((values.reshape(-1, factor) * volumes).sum(axis=1) /
+                     volumes.sum(axis=1))
+
+    return coarse_values
+
+
+
+def observed_order(f_fine, f_medium, f_coarse, ratio=REFINEMENT_RATIO, weights=None):
+    """
+    Observed order of accuracy of three solutions
+
+    Parameters
+    ----------
+    f_fine, f_medium, f_coarse : float or array
+        Solutions of three consecutive levels, from the finest. The fields
+        must be on the same cells (see ``restrict_field()``)
+    ratio : float
+        Refinement ratio between consecutive levels
+    weights : array
+        Weights of the cells in the norm of the differences of the fields
+        (e.g. their volumes; ``None`` for the same weight)
+
+    Returns
+    -------
+    order : float
+        Observed order of accuracy, ``nan`` if two solutions are equal
+
+    """
+
+    e_fine = _norm(np.subtract(f_medium, f_fine), weights)
+    e_coarse = _norm(np.subtract(f_coarse, f_medium), weights)
+    if e_fine == 0 or e_coarse == 0:
+        logger.warning("WARNING: Equal solutions on two levels, the order is undefined")
+        return float('nan')
+
+    return float(np.log(e_coarse / e_fine) / np.log(ratio))
+
+
+
+def richardson_extrapolation(f_fine, f_medium, order, ratio=REFINEMENT_RATIO):
+    """
+    Estimate of the solution on an infinitely fine mesh
+
+    Parameters
+    ----------
+    f_fine, f_medium : float or array
+        Solutions of the two finest levels (fields on the same cells)
+    order : float
+        Order of accuracy (e.g. from ``observed_order()``)
+    ratio : float
+        Refinement ratio between the two levels
+
+    Returns
+    -------
+    f_exact : float or array
+        Extrapolated solution
+
+    """
+
+    f_fine = np.asarray(f_fine, dtype=float)
+
+    return f_fine + (f_fine - f_medium) / (ratio**order - 1)
+
+
+
+def grid_convergence_index(f_fine, f_medium, order, ratio=REFINEMENT_RATIO,
+                           safety_factor=SAFETY_FACTOR, weights=None):
+    """
+    Grid convergence index of the finer of two levels
+
+    Parameters
+    ----------
+    f_fine, f_medium : float or array
+        Solutions of two consecutive levels (fields on the same cells)
+    order : float
+        Order of accuracy (e.g. from ``observed_order()``)
+    ratio : float
+        Refinement ratio between the two levels
+    safety_factor : float
+        Safety factor (1.25 for studies of three or more levels, 3 for two)
+    weights : array
+        Weights of the cells in the norms of the fields
+
+    Returns
+    -------
+    gci : float
+        Relative error band of the finer solution (e.g. 0.01 for 1%)
+
+    """
+
+    relative_error = _norm(np.subtract(f_fine, f_medium), weights) / _norm(f_fine, weights)
+
+    return float(safety_factor * relative_error / (ratio**order - 1))
+
+
+
+@pymonitor.monitored
+def convergence_study(mesh, solve, n_levels=3, args=(), max_workers=None,
+                      safety_factor=SAFETY_FACTOR, mp_context=None):
+    """
+    Solve a problem on nested meshes and estimate its discretisation error
+
+    Parameters
+    ----------
+    mesh : Mesh, dictionary
+        Finest mesh, or geometry dictionary of the finest mesh (see
+        ``pymesh.generate_mesh()``)
+    solve : function
+        Called as ``solve(mesh, *args)`` on every level, returns a scalar or
+        an array with a value for every cell. It must be a module-level
+        function (pickled when the workers are not forked)
+    n_levels : int
+        Number of levels (at least 3). The number of cells of the finest
+        mesh must be a multiple of ``2**(n_levels - 1)``
+    args : tuple
+        Other arguments of ``solve``
+    max_workers : int
+        Number of worker processes (``None`` for one per core, at most one
+        per level). With 1, the levels are solved sequentially in the
+        current process
+    safety_factor : float
+        Safety factor of the GCI
+    mp_context : multiprocessing context
+        Context used to start the workers (see
+        ``multiprocessing.get_context()``). ``None`` for the ``fork`` context
+        where it is available and safe (the meshes are inherited, but the
+        current process should not run other threads), or the default one
+        otherwise (e.g. on Windows and macOS, where the meshes are pickled)
+
+    Raises
+    ------
+    ``ValueError``
+        If the levels are less than 3, the mesh can't be coarsened or the
+        fields don't have a value for every cell
+
+    Returns
+    -------
+    study : dictionary
+        - ``'meshes'``: meshes from the finest to the coarsest
+        - ``'N_fv'``: number of cells of every level
+        - ``'solutions'``: solution of every level
+        - ``'restricted'``: fields restricted to the coarsest mesh (the
+          solutions themselves for scalars)
+        - ``'times'``: wall time of the solution of every level (in seconds)
+        - ``'orders'``: observed order of every three consecutive levels,
+          from the finest
+        - ``'order'``: observed order of the three finest levels
+        - ``'extrapolated'``: Richardson extrapolation of the two finest
+          levels (on the coarsest mesh for the fields)
+        - ``'gci'``: GCI of the finest level
+        - ``'gci_medium'``: GCI of the second level
+        - ``'asymptotic_ratio'``: ``gci_medium / (r**order * gci)``, close
+          to 1 when the meshes are in the asymptotic range
+
+    """
+
+    if n_levels < 3:
+        raise ValueError("ERROR: At least 3 levels are needed to compute the order")
+    if isinstance(mesh, dict) and 'centroids' not in mesh:
+        mesh = pymesh.generate_mesh(mesh)
+    meshes = nested_meshes(mesh, n_levels)
+
+    if max_workers is None:
+        max_workers = os.cpu_count()
+    max_workers = min(max_workers, n_levels)
+    if max_workers == 1:
+        _init_worker(meshes, solve, args, quiet=False)
+        try:
+            outputs = [_solve_level(level) for level in range(n_levels)]
+        finally:
+            _init_worker(None, None, None, quiet=False)
+    else:
+        if mp_context is None:
+            mp_context = _default_context()
+        # the finest (slowest) level is submitted first
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context,
+                                 initializer=_init_worker,
+                                 initargs=(meshes, solve, args)) as executor:
+            outputs = list(executor.map(_solve_level, range(n_levels)))
+    solutions = [solution for solution, _ in outputs]
+
+    coarsest = meshes[-1]
+    if np.ndim(solutions[0]) == 0:
+        restricted = [float(solution) for solution in solutions]
+        weights = None
+    else:
+        restricted = [restrict_field(solution, level_mesh, level_mesh.N_fv // coarsest.N_fv)
+                      for solution, level_mesh in zip(solutions, meshes)]
+        weights = coarsest.volumes
+
+    orders = [observed_order(*restricted[k:k+3], weights=weights)
+              for k in range(n_levels - 2)]
+    order = orders[0]
+    gci = grid_convergence_index(restricted[0], restricted[1], order,
+                                 safety_factor=safety_factor, weights=weights)
+    gci_medium = grid_convergence_index(restricted[1], restricted[2], order,
+                                        safety_factor=safety_factor, weights=weights)
+    study = {'meshes': meshes,
+             'N_fv': [level_mesh.N_fv for level_mesh in meshes],
+             'solutions': solutions,
+             'restricted': restricted,
+             'times': [solve_time for _, solve_time in outputs],
+             'orders': orders,
+             'order': order,
+             'extrapolated': richardson_extrapolation(restricted[0], restricted[1], order),
+             'gci': gci,
+             'gci_medium': gci_medium,
+             'asymptotic_ratio': gci_medium / (REFINEMENT_RATIO**order * gci)
+             }
+
+    logger.info('Convergence study on ' + str(n_levels) + ' levels (' +
+                str(study['N_fv'][0]) + ' to ' + str(study['N_fv'][-1]) + ' cells): ' +
+                'order {:.3f}, GCI {:.3e}'.format(order, gci))
+
+    return study
+
+
+
+def _norm(values, weights):
+    """Absolute value, or weighted L2 norm of a field"""
+
+    if np.ndim(values) == 0:
+        return abs(float(values))
+    if weights is None:
+        return float(np.sqrt(np.mean(np.square(values))))
+
+    return float(np.sqrt(np.dot(weights, np.square(values)) / np.sum(weights)))
+
+
+
+def _default_context():
+    """Context of the workers: ``fork`` if available and safe, else the default"""
+
+    if ('fork' in mp.get_all_start_methods()) and (sys.platform != 'darwin'):
+        return mp.get_context('fork')
+
+    return mp.get_context()
+
+
+
+def _init_worker(meshes, solve, args, quiet=True):
+    """Store the levels of the study in the process (inherited when forked)"""
+
+    global _study
+    _study = None if meshes is None else (meshes, solve, args)
+    if quiet:
+        pymonitor.set_quiet()
+
+
+
+def _solve_level(level):
+    """Solve one level of the study (executed by the workers)"""
+
+    meshes, solve, args = _study
+    mesh = meshes[level]
+    t_start = time.perf_counter()
+    solution = solve(mesh, *args)
+    solve_time = time.perf_counter() - t_start
+
+    if np.ndim(solution) != 0:
+        solution = np.asarray(solution, dtype=float)
+        if solution.shape != (mesh.N_fv,):
+            raise ValueError("ERROR: The solution of level " + str(level) + " must be " +
+                             "a scalar or have one value per cell")
+
+    return solution, solve_time
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+
+"""
+Interchangeable implementations (backends) of the sequential kernels
+
+Some loops can't be vectorized with NumPy because every iteration depends on
+the previous one (e.g. the sweeps of the Thomas algorithm). Every such
+kernel has a reference implementation in NumPy and pure Python, and an
+implementation compiled with Numba, used when Numba is installed:
+
+    - ``'numpy'``: always available, processes blocks of Python floats
+    - ``'numba'``: compiled to machine code the first time it's called (the
+      compiled code is cached on disk next to the module)
+
+The backend is chosen when the first kernel is needed: the environment
+variable ``PYCFD_KERNELS`` (``'auto'``, ``'numpy'`` or ``'numba'``) or
+``'auto'``, i.e. Numba if it's installed. It can be changed at any time with
+``set_backend()``. Numba is imported only by the ``'numba'`` backend, so the
+library imports and runs without it.
+
+The kernels work in place on preallocated arrays and have the same
+signature in every backend:
+
+    - ``factor_tridiagonal(lower, diag, upper, inv_pivots, c_mod)``
+    - ``solve_factored(lower, inv_pivots, c_mod, b, x)``
+
+(see ``pysolver.factor_tridiagonal()`` and ``pysolver.solve_factored()``).
+"""
+
+import importlib.util
+import os
+
+from .pymonitor import logger
+
+
+# the backend can be chosen with this environment variable
+BACKEND_VARIABLE = 'PYCFD_KERNELS'
+KERNEL_BACKENDS = ('numpy', 'numba')
+KERNEL_NAMES = ('factor_tridiagonal', 'solve_factored')
+
+# number of unknowns per block of the Thomas algorithm in the 'numpy' backend
+# (the sweeps are sequential, and are done on blocks of Python floats: much
+# faster than indexing the NumPy arrays one element at a time)
+THOMAS_BLOCK_SIZE = 2**16
+
+# selected backend (None until the first kernel is needed)
+_backend = None
+# kernels of every backend, created when the backend is first used
+_kernels = {}
+
+
+
+def available_backends():
+    """
+    Backends that can be used in this environment
+
+    Returns
+    -------
+    backends : tuple
+        Names of the backends, ``'numpy'`` first
+
+    """
+
+    backends = ['numpy']
+    if importlib.util.find_spec('numba') is not None:
+        backends.append('numba')
+
+    return tuple(backends)
+
+
+
+def set_backend(backend='auto'):
+    """
+    Select the backend of the kernels
+
+    Parameters
+    ----------
+    backend : string
+        ``'numpy'``, ``'numba'`` or ``'auto'`` (the fastest one available)
+
+    Raises
+    ------
+    ``ValueError``
+        If the backend is unknown or not available (e.g. Numba is not
+        installed)
+
+    Returns
+    -------
+    backend : string
+        Name of the selected backend
+
+    """
+
+    global _backend
+
+    if backend == 'auto':
+        backend = available_backends()[-1]
+    elif backend not in KERNEL_BACKENDS:
+        raise ValueError("ERROR: Unknown kernel backend '" + str(backend) +
+                         "' (available: auto, " + ', '.join(KERNEL_BACKENDS) + ")")
+    elif backend not in available_backends():
+        raise ValueError("ERROR: The kernel backend '" + backend + "' is not " +
+                         "available (is " + backend + " installed?)")
+    _backend = backend
+
+    return backend
+
+
+
+def get_backend():
+    """
+    Name of the selected backend
+
+    The first time, the backend is selected from the environment variable
+    ``PYCFD_KERNELS``: if it asks for a backend that is not available, the
+    ``'numpy'`` backend is used (with a warning).
+
+    Returns
+    -------
+    backend : string
+        ``'numpy'`` or ``'numba'``
+
+    """
+
+    if _backend is None:
+        try:
+            set_backend(os.environ.get(BACKEND_VARIABLE, 'auto'))
+        except ValueError as error:
+            logger.warning('WARNING: ' + str(error)[len('ERROR: '):] +
+                           ', using the numpy backend')
+            set_backend('numpy')
+
+    return _backend
+
+
+
+def get_kernel(name, backend=None):
+    """
+    Implementation of a kernel
+
+    Parameters
+    ----------
+    name : string
+        Name of the kernel (see ``KERNEL_NAMES``)
+    backend : string
+        Backend of the implementation (``None`` for the selected one)
+
+    Raises
+    ------
+    ``ValueError``
+        If the kernel or the backend are unknown or not available
+
+    Returns
+    -------
+    kernel : function
+        Implementation of the kernel
+
+    """
+
+    if name not in KERNEL_NAMES:
+        raise ValueError("ERROR: Unknown kernel '" + str(name) + "' (available: " +
+                         ', '.join(KERNEL_NAMES) + ")")
+    if backend is None:
+        backend = get_backend()
+    kernels = _kernels.get(backend)
+    if kernels is None:
+        if backend == 'numpy':
+            kernels = {'factor_tridiagonal': _factor_tridiagonal_numpy,
+                       'solve_factored': _solve_factored_numpy
+                       }
+        elif backend in available_backends():
+            try:
+                kernels = _numba_kernels()
+            except ImportError as error:
+                # installed, but broken (e.g. incompatible with NumPy)
+                logger.warning('WARNING: Numba can not be imported (' + str(error) +
+                               '), using the numpy backend')
+                set_backend('numpy')
+                return get_kernel(name, 'numpy')
+        else:
+            # unknown or not available: raise the same error as set_backend()
+            set_backend(backend)
+        _kernels[backend] = kernels
+
+    return kernels[name]
+
+
+
+# NUMPY BACKEND
+def _factor_tridiagonal_numpy(lower, diag, upper, inv_pivots, c_mod):
+    """Forward elimination of the Thomas algorithm on blocks of Python floats"""
+
+    N = len(diag)
+    c_prev = 0.0
+    for i_start in range(0, N, THOMAS_BLOCK_SIZE):
+        block = slice(i_start, min(i_start + THOMAS_BLOCK_SIZE, N))
+        m_block = []
+        c_block = []
+        for a_i, b_i, c_i in zip(lower[block].tolist(), diag[block].tolist(),
+                                 upper[block].tolist()):
+            m = 1.0 / (b_i - a_i * c_prev)
+            c_prev = c_i * m
+            m_block.append(m)
+            c_block.append(c_prev)
+        inv_pivots[block] = m_block
+        c_mod[block] = c_block
+
+
+def _solve_factored_numpy(lower, inv_pivots, c_mod, b, x):
+    """Sweeps of the Thomas algorithm on blocks of Python floats"""
+
+    N = len(inv_pivots)
+
+    # FORWARD ELIMINATION
+    d_prev = 0.0
+    for i_start in range(0, N, THOMAS_BLOCK_SIZE):
+        block = slice(i_start, min(i_start + THOMAS_BLOCK_SIZE, N))
+        d_block = []
+        for a_i, m_i, d_i in zip(lower[block].tolist(), inv_pivots[block].tolist(),
+                                 b[block].tolist()):
+            d_prev = (d_i - a_i * d_prev) * m_i
+            d_block.append(d_prev)
+        x[block] = d_block
+
+    # BACK SUBSTITUTION
+    x_next = 0.0
+    for i_end in range(N, 0, -THOMAS_BLOCK_SIZE):
+        block = slice(max(i_end - THOMAS_BLOCK_SIZE, 0), i_end)
+        x_block = []
+        for c_i, d_i in zip(reversed(c_mod[block].tolist()),
+                            reversed(x[block].tolist())):
+            x_next = d_i - c_i * x_next
+            x_block.append(x_next)
+        x_block.reverse()
+        x[block] = x_block
+
+
+
+# NUMBA BACKEND
+def _numba_kernels():
+    """Compile (lazily) the kernels of the 'numba' backend"""
+
+    import numba
+
+    @numba.njit(cache=True, nogil=True)
+    def factor_tridiagonal(lower, diag, upper, inv_pivots, c_mod):
+        c_prev = 0.0
+        for i in range(len(diag)):
+            m = 1.0 / (diag[i] - lower[i] * c_prev)
+            c_prev = upper[i] * m
+            inv_pivots[i] = m
+            c_mod[i] = c_prev
+
+    @numba.njit(cache=True, nogil=True)
+    def solve_factored(lower, inv_pivots, c_mod, b, x):
+        N = len(inv_pivots)
+        d_prev = 0.0
+        for i in range(N):
+            d_prev = (b[i] - lower[i] * d_prev) * inv_pivots[i]
+            x[i] = d_prev
+        x_next = 0.0
+        for i in range(N - 1, -1, -1):
+            x_next = x[i] - c_mod[i] * x_next
+            x[i] = x_next
+
+    return {'factor_tridiagonal': factor_tridiagonal,
+            'solve_factored': solve_factored
+            }
@@ -1,10 +1,95 @@
 #!/usr/bin/env python3
 
+import hashlib
 import numpy as np
 import os
-import matplotlib.pyplot as plt
+import shutil
+import struct
+import sys
+import warnings
+from concurrent.futures import ThreadPoolExecutor
 
+from . import pymeshcache
+from . import pymonitor
+from .pymonitor import logger
 
+
+# default number of values generated/written at once by the streaming mesher
+DEFAULT_CHUNK_SIZE = 2**20
+# clustering laws of the face nodes (see iter_face_nodes())
+SPACINGS = ('uniform', 'geometric', 'double-sided', 'bi-geometric', 'tanh', 'roberts')
+
+
+# FLOATING-POINT PRECISION
+# types available for the coordinates
+PRECISIONS = ('float32', 'float64')
+# the type can't resolve a mesh if its spacing at the largest coordinate is
+# larger than this fraction of the smallest cell (error on the widths)
+RESOLUTION_TOLERANCE = 0.01
+
+
+# TEXT MESH FORMAT
+# size (in bytes) of the chunks read at once when parsing a text mesh file
+TEXT_CHUNK_SIZE = 2**24
+# default significant digits of the coordinates in a text mesh file: all the
+# digits (np.savetxt() default) for double precision, enough to read back the
+# same values for single precision
+TEXT_DIGITS = {'float32': 9,
+               'float64': 19
+               }
+# section headers and corresponding keys of the mesh dictionary
+_MESH_SECTIONS = {b'CENTROID COORDINATES': 'centroids',
+                  b'FACE NODES COORDINATES': 'face_nodes'
+                  }
+
+
+# BINARY MESH FORMAT
+# fixed-size header followed by the contiguous arrays of the centroids and of
+# the face nodes (in this order). Header fields (little-endian):
+#   - magic string identifying the format
+#   - version of the format
+#   - byte order of the arrays ('<' little-endian, '>' big-endian)
+#   - type of the arrays as NumPy type code without byte order (e.g. 'f8')
+#   - number of centroids
+#   - number of face nodes
+BINARY_MESH_MAGIC = b'PYCFDMSH'
+BINARY_MESH_VERSION = 1
+_BINARY_HEADER = struct.Struct('<8sI1s3sQQ')
+# the arrays start after a padded header, so that they are always aligned
+BINARY_HEADER_SIZE = 64
+
+
+# PARAMETRIC MESH FORMAT
+# text file with the geometry (same keywords of the geometry input file), the
+# discretisation method and a checksum of the coordinates, which are
+# generated again when the file is read
+PARAMETRIC_MESH_HEADER = 'PARAMETRIC MESH'
+PARAMETRIC_MESH_VERSION = 1
+
+
+# POINT LOCATION
+# policies for the points outside the mesh (see ``Mesh.locate()``)
+OUTSIDE_POLICIES = ('raise', 'clip', 'mask')
+# buckets with more face nodes than this are searched with a binary search
+# instead of a linear scan
+MAX_BUCKET_SCAN = 4
+
+
+# MESH QUALITY
+# default edges of the bins of the histogram of the size ratios of neighbour
+# cells (see MeshQuality)
+QUALITY_RATIO_BINS = (1.0, 1.05, 1.1, 1.2, 1.5, 2.0, np.inf)
+# number of cells checked at once: the temporary arrays stay in the cache
+QUALITY_CHUNK_SIZE = 2**16
+
+
+# PLOTTING
+# default largest number of visible face nodes drawn as markers: with more,
+# the cells are drawn as a strip coloured by their width (see plot_mesh())
+MAX_PLOT_MARKERS = 2000
+
+
+@pymonitor.monitored
 def read_input_geom(input_file):
     """
     Read geometry from input file
@@ -26,16 +111,18 @@ def read_input_geom(input_file):
                 
                 - ``'uniform'``: uniform spacing :math:`h = (b-a)/N`
                 - ``'geometric'``: spacing follows a geometric series described by :math:`N` and the expansion ratio
+                - ``'double-sided'``, ``'bi-geometric'``, ``'tanh'``, ``'roberts'``: clustering laws described in ``iter_face_nodes()``
             
-            - ``'expansion_ratio'``: ratio of one element length to the next previous element lenght :math:`h_i/h_{i-1}`. Set to ``None`` if a ``'uniform'`` spacing is read, otherwise should be > 1.
+            - ``'expansion_ratio'``: ratio of one element length to the next previous element lenght :math:`h_i/h_{i-1}`. Set to ``None`` if a ``'uniform'`` spacing is read, otherwise should be > 1. For ``'bi-geometric'`` spacing it's a tuple with the ratios of the two sections, for ``'tanh'`` and ``'roberts'`` it's the stretching parameter.
     
     """
 
-    print('Reading geometry from \t' + os.path.abspath(input_file))
+    logger.info('Reading geometry from \t' + os.path.abspath(input_file))
     
     # GET FILE CONTENT
     with open(input_file, 'r') as file:
         lines = file.readlines()
+    pymonitor.current().read(sum(len(line) for line in lines))
 
     # check that the files is not empty and does not contain only whitespaces
     check_empty_input(lines, "ERROR: Empty geometry input file")
@@ -79,8 +166,11 @@ def read_input_geom(input_file):
             # read the line only if the spacing is non-uniform
             # (there's no expansion rate with uniform spacing)
             if spacing != 'uniform':
-                exp_ratio = lines[i+1].strip()
-                exp_ratio = float(exp_ratio)
+                # 'bi-geometric' spacing needs two ratios on the same line
+                exp_ratio = lines[i+1].split()
+                exp_ratio = tuple(float(alpha) for alpha in exp_ratio)
+                if len(exp_ratio) == 1:
+                    exp_ratio = exp_ratio[0]
             i = i + 1
         
         # move "line pointer" to the next line
@@ -140,7 +230,9 @@ def check_empty_input(lines_from_file, error_message):
 
 
 
-def mesher(input_file, mesh_file, discr_method='cellcenter'):
+@pymonitor.monitored
+def mesher(input_file, mesh_file, discr_method='cellcenter', file_format='text', 
+           use_cache=None, cache=None, dtype=float, digits=None):
     """
     Create a 1D mesh and save it to file
 
@@ -155,14 +247,142 @@ def mesher(input_file, mesh_file, discr_method='cellcenter'):
             
             - ``'cellcenter'`` : cell-center
             - ``'cellvertex'``: cell-vertex (NOT implemented) 
+    file_format : string
+        Format of the mesh file (``'text'``, ``'binary'`` or ``'parametric'``,
+        see ``print_mesh()``)
+    use_cache : bool
+        If ``True``, look for the mesh in the mesh cache before generating it
+        (see ``generate_cached_mesh()``). If ``None``, the cache is used only
+        if ``cache`` is given or the environment variable ``PYCFD_CACHE_DIR``
+        is set (see ``pymeshcache.cache_enabled()``)
+    cache : pymeshcache.MeshCache
+        Mesh cache to be used (``None`` for the default one)
+    dtype : data-type
+        Type of the coordinates (``float32`` or ``float64``)
+    digits : int
+        Significant digits of the coordinates in a text file (see 
+        ``print_mesh()``)
 
     Returns
     -------
-    None.
+    mesh : Mesh
+        The mesh saved to file (no need to read it back with ``read_mesh()``)
 
     """
     
     geometry = read_input_geom(input_file)
+    if pymeshcache.cache_enabled(use_cache, cache):
+        mesh, cached_file = generate_cached_mesh(geometry, discr_method, cache, 
+                                                 dtype=dtype)
+        # the cached file is already a binary mesh file (in double precision):
+        # simply copy it
+        if (file_format == 'binary' and mesh.dtype == np.float64 and 
+                os.path.exists(cached_file)):
+            logger.info('Saving mesh to \t\t\t' + os.path.abspath(mesh_file))
+            shutil.copyfile(cached_file, mesh_file)
+            pymonitor.current().written(os.path.getsize(mesh_file))
+            return mesh
+    else:
+        mesh = generate_mesh(geometry, discr_method, dtype)
+    
+    # SAVE MESH TO FILE
+    print_mesh(mesh, mesh_file, file_format, digits)
+    
+    return mesh
+
+
+
+@pymonitor.monitored
+def generate_cached_mesh(geometry, discr_method='cellcenter', cache=None, mmap=False,
+                         dtype=float):
+    """
+    Create a 1D mesh, or read it from the mesh cache if it has already been
+    created
+
+    The mesh is identified by a hash of the geometry, of the discretisation
+    method and of the versions of the library and of the mesh generator (see
+    ``pymeshcache``). Cached meshes are stored in binary format, in double
+    precision.
+
+    Parameters
+    ----------
+    geometry : dictionary
+        Parameters describing the geometry (see ``read_input_geom()``)
+    discr_method : string
+        Type of discretisation used (see ``mesher()``)
+    cache : pymeshcache.MeshCache
+        Mesh cache to be used (``None`` for the default one)
+    mmap : bool
+        If ``True``, the coordinates of a cached mesh are memory-mapped (only
+        in double precision)
+    dtype : data-type
+        Type of the coordinates (``float32`` or ``float64``)
+
+    Returns
+    -------
+    mesh : Mesh
+        1D mesh
+    cached_file : string
+        Path of the cached mesh file
+
+    """
+    
+    if cache is None:
+        cache = pymeshcache.MeshCache()
+    key = pymeshcache.geometry_key(geometry, discr_method)
+    
+    cached_file = cache.lookup(key)
+    mesh = None
+    if cached_file is not None:
+        logger.info('Reading mesh from cache \t' + os.path.abspath(cached_file))
+        try:
+            mesh = Mesh.from_dict(read_binary_mesh(cached_file, mmap))
+            mesh.geometry = dict(geometry)
+        except FileNotFoundError:
+            # evicted by another process in the meantime
+            pass
+    if mesh is None:
+        mesh = generate_mesh(geometry, discr_method)
+        cached_file = cache.store(key, lambda mesh_file: print_binary_mesh(mesh, mesh_file))
+    if np.dtype(dtype) != mesh.dtype:
+        mesh = mesh.astype(dtype)
+    
+    return mesh, cached_file
+
+
+
+@pymonitor.monitored
+def generate_mesh(geometry, discr_method='cellcenter', dtype=float):
+    """
+    Create a 1D mesh in memory
+
+    The coordinates are always computed in double precision and then rounded
+    to the type requested (see ``check_resolution()``).
+
+    Parameters
+    ----------
+    geometry : dictionary
+        Parameters describing the geometry (see ``read_input_geom()``)
+    discr_method : string
+        Type of discretisation used (see ``mesher()``)
+    dtype : data-type
+        Type of the coordinates (``float32`` or ``float64``)
+
+    Raises
+    ------
+    ``NotImplementedError``
+        If the discretisation method is not available
+    ``ValueError``
+        If the type is not available
+
+    Returns
+    -------
+    mesh : Mesh
+        1D mesh
+
+    """
+    
+    dtype = _check_precision(dtype)
     xf_0 = geometry['xf_0']
     xf_N = geometry['xf_N']
     N_fv = geometry['N_fv']
@@ -184,212 +404,2296 @@ def mesher(input_file, mesh_file, discr_method='cellcenter'):
             # face nodes
             xf = np.linspace(xf_0, xf_N, N_fv+1)    # N volumes => N+1 face nodes
             
-        elif spacing == 'geometric':
-            # length of the 1st cell (smallest if exp_ratio > 1, largest if < 1)
-            # sum of the terms alpha^(i-1) for i=1,...,N (geometric series)
-            sum_geom_series = (1 - exp_ratio**N_fv) / (1 - exp_ratio)
-            h_1 = (xf_N - xf_0) / sum_geom_series
-            # centroids
-            xC = np.zeros(N_fv)
-            # face nodes
-            xf = np.zeros(N_fv+1)  # N intervals => N+1 face nodes
-            xf[0] = xf_0
-            xf[-1] = xf_N
-            i = 1
-            while i < N_fv:
-                h_i = h_1 * exp_ratio**(i-1)
-                xf[i] = xf[i-1] + h_i
-                xC[i-1] = (xf[i] + xf[i-1]) / 2     # midpoint of the interval
-                i = i + 1
-        
-        mesh = {'centroids': xC,
-                'face_nodes': xf
-                }
+        else:
+            # graded spacing: all the clustering laws are handled by the same
+            # vectorized engine
+            xf = grade_face_nodes(xf_0, xf_N, N_fv, spacing, exp_ratio)
+            # centroids = midpoints of the intervals
+            xC = (xf[1:] + xf[:-1]) / 2
+    else:
+        raise NotImplementedError("ERROR: Discretisation method '" + 
+                                  str(discr_method) + "' not implemented")
+    if dtype != np.float64:
+        check_resolution(xf, dtype)
+        xC = xC.astype(dtype)
+        xf = xf.astype(dtype)
+    pymonitor.current().allocated(xC, xf)
     
-    # SAVE MESH TO FILE
-    print_mesh(mesh, mesh_file)
+    return Mesh(xC, xf, geometry=dict(geometry))
+
+
 
+class Mesh:
+    r"""
+    1D finite volume mesh
 
+    The coordinates are stored as arrays (without copying them, so they can 
+    be views of the arrays of another mesh), while the derived geometric 
+    quantities are computed only the first time they are accessed 
+    and then cached (as read-only arrays, since they are shared). The same 
+    holds for the index used to locate points in the mesh (see ``locate()``).
+    For compatibility with the mesh dictionaries (e.g. from 
+    ``read_binary_mesh()``), the coordinates can also be accessed as 
+    ``mesh['centroids']`` and ``mesh['face_nodes']``.
 
-def calculate_expansion_ratio(N, xf_0, xf_N, h_1, alpha_0=1.05, tol=1e-8, k_max=200):
+    Parameters
+    ----------
+    centroids : array
+        Centroid coordinates :math:`x_P` (:math:`N` values)
+    face_nodes : array
+        Face node coordinates :math:`x_\mathrm{f}` (:math:`N+1` values)
+    area : float
+        Cross-sectional area of the 1D domain, used for the volumes
+    geometry : dictionary
+        Parameters the mesh was generated from (see ``read_input_geom()``),
+        needed to save it in parametric format. ``None`` for meshes that were
+        read, refined or assembled from explicit coordinates
+
+    """
     
-    # coefficient of the equation (compute once to avoid overhead)
-    K = (xf_N - xf_0) / h_1
-    # fixed point iteration function (fun(alpha) = alpha)
-    fun = lambda alpha: alpha**N + (1-K)*alpha + K - 1
+    __slots__ = ('centroids', 'face_nodes', 'area', 'geometry', 
+                 '_cell_widths', '_face_distances', '_face_interp_weights', 
+                 '_volumes', '_point_index')
     
-    k = 0
-    err = tol + 1
-    alpha_old = alpha_0
-    while k < k_max and err > tol:
-        alpha_new = fun(alpha_old)
-        err = abs(alpha_new - alpha_old) / abs(alpha_old)
-        alpha_old = alpha_new
-        k = k + 1
+    def __init__(self, centroids, face_nodes, area=1.0, geometry=None):
+        self.centroids = np.asarray(centroids)
+        self.face_nodes = np.asarray(face_nodes)
+        self.area = area
+        self.geometry = geometry
+        self._cell_widths = None
+        self._face_distances = None
+        self._face_interp_weights = None
+        self._volumes = None
+        self._point_index = None
     
-    # set the flag to True to notify the user that the maximum number of
-    # iterations have been exceed
-    if k == k_max:
-        max_iteration_reached = True
-    else:
-        max_iteration_reached = False
+    @classmethod
+    def from_dict(cls, mesh, area=1.0):
+        """Create a ``Mesh`` from a dictionary (e.g. from ``read_binary_mesh()``)"""
+        
+        return cls(mesh['centroids'], mesh['face_nodes'], area)
+    
+    def __getitem__(self, key):
+        if key in ('centroids', 'face_nodes'):
+            return getattr(self, key)
+        raise KeyError(key)
+    
+    def __len__(self):
+        return len(self.centroids)
+    
+    @property
+    def dtype(self):
+        """Type of the coordinates"""
+        
+        return self.centroids.dtype
+    
+    def astype(self, dtype):
+        """
+        Copy of the mesh with coordinates of another type
+        
+        Parameters
+        ----------
+        dtype : data-type
+            Type of the coordinates (``float32`` or ``float64``)
+        
+        Returns
+        -------
+        mesh : Mesh
+            Mesh with the same geometry
+        
+        """
+        
+        dtype = _check_precision(dtype)
+        if dtype != np.float64:
+            check_resolution(self.face_nodes, dtype)
+        
+        return Mesh(self.centroids.astype(dtype), self.face_nodes.astype(dtype),
+                    self.area, self.geometry)
+    
+    @property
+    def N_fv(self):
+        """Number :math:`N` of finite volumes"""
+        
+        return len(self.centroids)
+    
+    @property
+    def cell_widths(self):
+        r"""Width :math:`h_i = x_{\mathrm{f},i+1} - x_{\mathrm{f},i}` of every cell"""
+        
+        if self._cell_widths is None:
+            self._cell_widths = _read_only(np.diff(self.face_nodes))
+        
+        return self._cell_widths
+    
+    @property
+    def volumes(self):
+        """Volume of every cell (width times cross-sectional area)"""
+        
+        if self._volumes is None:
+            self._volumes = _read_only(self.cell_widths * self.area)
+        
+        return self._volumes
+    
+    @property
+    def face_distances(self):
+        """
+        Distance between the centroids on the two sides of every face 
+        (:math:`N+1` values). For the boundary faces it's the distance between
+        the face and the centroid of the boundary cell.
+        """
+        
+        if self._face_distances is None:
+            xC = self.centroids
+            xf = self.face_nodes
+            d = np.empty(len(xf), dtype=xf.dtype)
+            d[0] = xC[0] - xf[0]
+            np.subtract(xC[1:], xC[:-1], out=d[1:-1])
+            d[-1] = xf[-1] - xC[-1]
+            self._face_distances = _read_only(d)
+        
+        return self._face_distances
+    
+    @property
+    def face_interp_weights(self):
+        r"""
+        Linear interpolation weights :math:`w_\mathrm{f}` of every face 
+        (:math:`N+1` values), such that :math:`\phi_\mathrm{f} = w_\mathrm{f} 
+        \phi_L + (1 - w_\mathrm{f}) \phi_R`, where :math:`L` and :math:`R` 
+        are the cells on the left and on the right of the face. At the 
+        boundaries only the cell inside the domain contributes.
+        """
+        
+        if self._face_interp_weights is None:
+            xC = self.centroids
+            xf = self.face_nodes
+            w = np.empty(len(xf), dtype=xf.dtype)
+            w[0] = 0.0
+            w[1:-1] = (xC[1:] - xf[1:-1]) / self.face_distances[1:-1]
+            w[-1] = 1.0
+            self._face_interp_weights = _read_only(w)
+        
+        return self._face_interp_weights
+    
+    def locate(self, points, outside='raise'):
+        r"""
+        Index of the cells containing some points
+        
+        The cell :math:`i` contains the points :math:`x_{\mathrm{f},i} \le x < 
+        x_{\mathrm{f},i+1}` (the last cell contains also the last face node).
+        The domain is divided into as many buckets of equal size as cells, and
+        every bucket stores the first cell it overlaps: a point is located by
+        computing its bucket and scanning the few face nodes in it, so that 
+        the cost doesn't depend on the number of cells. Buckets with many face
+        nodes (strongly graded meshes) are searched with a binary search.
+        
+        Parameters
+        ----------
+        points : float or array
+            Coordinates of the points
+        outside : string
+            Treatment of the points outside the mesh (and of NaN): ``'raise'``
+            raises an error, ``'clip'`` assigns them to the closest boundary 
+            cell and ``'mask'`` returns -1 as their index. NaN points are 
+            never clipped: their index is -1 with both ``'clip'`` and 
+            ``'mask'`` (and their probed value is NaN, see ``probe()``)
+        
+        Raises
+        ------
+        ``ValueError``
+            If the policy is unknown or, with ``'raise'``, if a point is 
+            outside the mesh
+        
+        Returns
+        -------
+        cells : array
+            Index of the cell of every point
+        
+        """
+        
+        if outside not in OUTSIDE_POLICIES:
+            raise ValueError("ERROR: Unknown policy '" + str(outside) + 
+                             "' for the points outside the mesh (available: " +
+                             ', '.join(OUTSIDE_POLICIES) + ")")
+        x = np.atleast_1d(np.asarray(points, dtype=float))
+        xf, x_0, scale, bucket_starts, n_scan, dense = self._get_point_index()
+        N_fv = len(xf) - 2
+        
+        buckets = np.multiply(np.subtract(x, x_0), scale)
+        inside = (x >= xf[0]) & (x <= xf[-2])
+        all_inside = inside.all()
+        if not all_inside:
+            if outside == 'raise':
+                raise ValueError("ERROR: " + str(np.count_nonzero(~inside)) + 
+                                 " points outside the mesh [" + str(xf[0]) + 
+                                 ", " + str(xf[-2]) + "]")
+            # NaN are moved to the first cell (and then masked)
+            nan_points = np.isnan(x)
+            np.clip(np.nan_to_num(buckets), 0, N_fv - 1, out=buckets)
+            x = np.clip(np.nan_to_num(x, nan=xf[0]), xf[0], xf[-2])
+        buckets = buckets.astype(np.intp)
+        np.minimum(buckets, N_fv - 1, out=buckets)
+        
+        # LINEAR SCAN of the face nodes in the bucket
+        cells = bucket_starts[buckets]
+        for _ in range(n_scan):
+            cells += xf[cells + 1] <= x
+        # BINARY SEARCH in the buckets with too many face nodes
+        if dense is not None:
+            in_dense = dense[buckets]
+            cells[in_dense] = np.searchsorted(xf, x[in_dense], side='right') - 1
+        # the last face node belongs to the last cell
+        np.minimum(cells, N_fv - 1, out=cells)
+        
+        if not all_inside:
+            cells[~inside if outside == 'mask' else nan_points] = -1
+        
+        return cells
+    
+    def interpolation_weights(self, points, outside='raise'):
+        r"""
+        Linear interpolation between the centroids at some points
+        
+        The value at a point is :math:`\phi(x) = w \phi_i + (1 - w) 
+        \phi_{i+1}`, where :math:`i` and :math:`i+1` are the centroids around
+        the point. Between the boundary and the first (last) centroid the 
+        value is the one of the first (last) cell.
+        
+        Parameters
+        ----------
+        points : float or array
+            Coordinates of the points
+        outside : string
+            Treatment of the points outside the mesh (see ``locate()``). With
+            ``'mask'``, the indices of those points are -1
+        
+        Returns
+        -------
+        cells : array
+            Index :math:`i` of the centroid on the left of every point
+        weights : array
+            Weight :math:`w` of that centroid
+        
+        """
+        
+        x = np.atleast_1d(np.asarray(points, dtype=float))
+        cells = self.locate(x, outside)
+        xC = self.centroids
+        if self.N_fv == 1:
+            return cells, np.ones(cells.shape)
+        
+        # interval between the centroids: the cell or the one on its left
+        masked = cells < 0
+        np.maximum(cells, 0, out=cells)
+        cells -= x < xC[cells]
+        np.clip(cells, 0, self.N_fv - 2, out=cells)
+        x_left = xC[cells]
+        x_right = xC[cells + 1]
+        weights = (x_right - x) / (x_right - x_left)
+        np.clip(weights, 0.0, 1.0, out=weights)
+        if masked.any():
+            cells[masked] = -1
+        
+        return cells, weights
+    
+    def probe(self, values, points, outside='raise'):
+        """
+        Interpolate a cell field at some points
+        
+        Parameters
+        ----------
+        values : array
+            Values of the field at the centroids
+        points : float or array
+            Coordinates of the points
+        outside : string
+            Treatment of the points outside the mesh (see ``locate()``). With
+            ``'mask'``, the values at those points are NaN; with ``'clip'``,
+            the values of the closest boundary cell (NaN for NaN points)
+        
+        Returns
+        -------
+        probed : array
+            Values of the field at the points
+        
+        """
+        
+        values = np.asarray(values)
+        cells, weights = self.interpolation_weights(points, outside)
+        if self.N_fv == 1:
+            probed = np.full(weights.shape, values[0], dtype=float)
+            probed[cells < 0] = np.nan
+        else:
+            masked = cells < 0
+            cells[masked] = 0
+            probed = weights * values[cells] + (1 - weights) * values[cells + 1]
+            probed[masked] = np.nan
+        
+        return probed
     
-    return alpha_new, err, k, max_iteration_reached
+    def _get_point_index(self):
+        """
+        Index used to locate the points: face nodes (followed by infinity, 
+        so that the linear scan never goes beyond the last cell), origin and 
+        inverse size of the buckets, first cell of every bucket, number of 
+        steps of the linear scan and buckets with too many face nodes 
+        (``None`` if there aren't any)
+        """
+        
+        if self._point_index is None:
+            xf = np.asarray(self.face_nodes, dtype=float)
+            if not np.all(xf[1:] > xf[:-1]):
+                raise ValueError("ERROR: The face nodes must be strictly increasing")
+            N_fv = len(xf) - 1
+            x_0 = xf[0]
+            scale = N_fv / (xf[-1] - xf[0])
+            # bucket of every interior face node, computed exactly as for the 
+            # points: a face in a lower bucket is certainly before the point
+            face_buckets = np.minimum(((xf[1:-1] - x_0) * scale).astype(np.intp), 
+                                      N_fv - 1)
+            bucket_starts = np.searchsorted(face_buckets, np.arange(N_fv), 
+                                            side='left')
+            counts = np.bincount(face_buckets, minlength=N_fv)
+            dense = counts > MAX_BUCKET_SCAN
+            n_scan = int(counts[~dense].max(initial=0))
+            self._point_index = (np.append(xf, np.inf), x_0, scale, bucket_starts,
+                                 n_scan, dense if dense.any() else None)
+        
+        return self._point_index
 
 
 
-def print_mesh(mesh, mesh_file):
+def as_mesh(mesh):
     """
-    Print the mesh saving it in a plain text file
-
+    Mesh as a ``Mesh``, also if given as a dictionary
+    
     Parameters
     ----------
-    mesh : dictionary
-        Mesh coordinates:
-            
-            - ``'centroids'``: centroid coordinates :math:`x_P`
-            - ``'face_nodes'``: face centre coordinates :math:`x_\mathrm{f}`
-    mesh_file : string
-        Name of the file where to save the mesh
-
+    mesh : Mesh or dictionary
+        1D mesh (a dictionary with ``'centroids'`` and ``'face_nodes'``)
+    
     Returns
     -------
-    None.
-
+    mesh : Mesh
+        The same mesh (not copied if already a ``Mesh``)
+    
     """
     
-    print('Saving mesh to \t\t\t' + os.path.abspath(mesh_file))
-    with open(mesh_file, 'w') as file:
-        file.write('CENTROID COORDINATES\n')
-        np.savetxt(file, mesh['centroids'], newline='\n')
-        file.write('\n')
+    return mesh if isinstance(mesh, Mesh) else Mesh.from_dict(mesh)
+
+
+
+def _read_only(array):
+    """Flag an array as read-only and return it"""
+    
+    array.setflags(write=False)
     
-    with open(mesh_file, 'a') as file:
-        file.write('FACE NODES COORDINATES\n')
-        np.savetxt(file, mesh['face_nodes'], newline='\n')
+    return array
 
 
 
-def read_mesh(mesh_file):
+def _check_precision(dtype):
+    """Check that a type is available for the coordinates and return it"""
+    
+    dtype = np.dtype(dtype)
+    if dtype.name not in PRECISIONS:
+        raise ValueError("ERROR: Unknown precision '" + str(dtype) + 
+                         "' (available: " + ', '.join(PRECISIONS) + ")")
+    
+    return dtype
+
+
+
+def check_resolution(face_nodes, dtype, min_width=None):
     """
-    Read 1D mesh from plain text file and import it
+    Check whether a type can resolve the cells of a mesh, and warn if not
+
+    Far from the origin, the spacing of the floating-point numbers can be a 
+    significant fraction of the smallest cells (e.g. of a geometric mesh): 
+    their widths would be wrong, or even zero, once the coordinates are 
+    rounded to that type.
 
     Parameters
     ----------
-    mesh_file : string
-        Name of the mesh file
+    face_nodes : array
+        Face nodes of the mesh, in double precision (or just the first and the 
+        last ones, if ``min_width`` is given)
+    dtype : data-type
+        Type of the coordinates
+    min_width : float
+        Width of the smallest cell (``None`` to compute it from the face nodes)
 
     Returns
     -------
-    mesh : dictionary
-        1D mesh
+    bool
+        ``True`` if the type resolves the cells
 
     """
     
-    # GET FILE CONTENT
-    # read all lines at once and close the file 
-    # (avoid corrupting mesh files)
-    with open(mesh_file, 'r') as file:
-        lines = file.readlines()
+    face_nodes = np.asarray(face_nodes, dtype=float)
+    if min_width is None:
+        if len(face_nodes) < 2:
+            return True
+        min_width = np.diff(face_nodes).min()
+    x_max = max(abs(face_nodes[0]), abs(face_nodes[-1]))
+    spacing = float(np.spacing(np.dtype(dtype).type(x_max)))
+    if spacing > RESOLUTION_TOLERANCE * min_width:
+        warnings.warn("WARNING: " + np.dtype(dtype).name + " can't resolve the "
+                      "smallest cell (width " + '{:.3e}'.format(min_width) + 
+                      ") at coordinate " + '{:.3e}'.format(x_max) + 
+                      " (spacing " + '{:.3e}'.format(spacing) + ")", 
+                      RuntimeWarning, stacklevel=2)
+        return False
     
-    # check that the files is not empty and does not contain only whitespaces
-    check_empty_input(lines, "ERROR: Empty mesh file")
+    return True
+
+
+
+class MeshQuality:
+    """
+    Quality report of a 1D mesh, accumulated over chunks of its coordinates
+
+    The chunks of centroids and of face nodes are passed in order with 
+    ``update()`` and don't need to have the same length (e.g. the chunks of
+    ``iter_centroids()`` and ``iter_face_nodes()``): the cells are checked as
+    soon as both their centroid and their face nodes are known, with a few
+    vectorized passes over every chunk, so the memory needed doesn't depend 
+    on the number of finite volumes. ``report()`` returns the result.
+
+    Parameters
+    ----------
+    length : float
+        Expected length of the domain (e.g. ``xf_N - xf_0`` of the geometry),
+        ``None`` not to check it
+    ratio_bins : array
+        Edges of the bins of the histogram of the neighbour size ratios
+    length_tol : float
+        Largest error on the length of the domain (``None`` for 8 times the
+        spacing of the floating-point numbers at the largest coordinate)
+
+    """
     
+    def __init__(self, length=None, ratio_bins=QUALITY_RATIO_BINS, length_tol=None):
+        self.length = length
+        self.ratio_bins = np.asarray(ratio_bins, dtype=np.float64)
+        self.length_tol = length_tol
+        self.ratio_counts = np.zeros(len(self.ratio_bins) - 1, dtype=np.int64)
+        self.dtype = None
+        self.N_fv = 0
+        self.N_faces = 0
+        self.n_nonfinite = 0
+        self.n_non_monotonic = 0
+        self.min_width = np.inf
+        self.max_width = -np.inf
+        self.max_ratio = 1.0
+        self.max_centroid_offset = 0.0
+        self.first_face = None
+        self.last_face = None
+        # coordinates received but not checked yet (the next face node is
+        # missing) and width of the last cell checked
+        self._centroids = None
+        self._face_nodes = None
+        self._last_width = None
     
-    # PARSE FILE CONTENT
-    # remove the empty lines and those containing whitespaces (.strip() converts
-    # them to '', which evaluates to False)
-    # https://stackoverflow.com/a/3845449/17220538
-    lines = [line_i for line_i in lines if line_i.strip()]
-    mesh = {}
-    # "type" of the coordinate, to be used when filling the dictionary
-    coordinate_name = None
-    for line in lines:
-        # remove eventual whitespaces (e.g. the trailing '\n' always present)
-        line = line.strip()
+    def update(self, centroids, face_nodes):
+        """Check the next chunk of centroids and of face nodes"""
         
-        # format of the file:
-        #   KEYWORD
-        #   VALUE
-        # when you find a match for a keyword, this means that the NEXT line(s)
-        # contain the numerical value
-        if line == 'CENTROID COORDINATES':
-            coordinate_name = 'centroids'
-            # initialise the object as an empty list, so that I can append
-            # values afterward
-            mesh[coordinate_name] = []
-        elif line == 'FACE NODES COORDINATES':
-            coordinate_name = 'face_nodes'
-            mesh[coordinate_name] = []
-        # all the lines that are not text are for sure coordinates, since empty
-        # lines have been removed
-        else:
-            # CONVERT COORDINATES INTO FLOATS
-            x_i = float(line)
-            mesh[coordinate_name].append(x_i)
+        centroids = np.asarray(centroids)
+        face_nodes = np.asarray(face_nodes)
+        if self.dtype is None:
+            self.dtype = np.result_type(centroids, face_nodes)
+        self.N_fv += len(centroids)
+        self.N_faces += len(face_nodes)
+        self.n_nonfinite += (len(centroids) - np.count_nonzero(np.isfinite(centroids)) + 
+                             len(face_nodes) - np.count_nonzero(np.isfinite(face_nodes)))
+        if len(face_nodes) > 0:
+            if self.first_face is None:
+                self.first_face = float(face_nodes[0])
+            self.last_face = float(face_nodes[-1])
+        
+        # join the chunks to the coordinates left over by the previous ones
+        if self._centroids is not None:
+            centroids = np.concatenate([self._centroids, centroids])
+            face_nodes = np.concatenate([self._face_nodes, face_nodes])
+        N_cells = max(min(len(centroids), len(face_nodes) - 1), 0)
+        if N_cells > 0:
+            self._check_cells(centroids[:N_cells], face_nodes[:N_cells + 1])
+        # the last face node checked is the first one of the next cell
+        self._centroids = np.array(centroids[N_cells:])
+        self._face_nodes = np.array(face_nodes[N_cells:])
     
-    # turn everything into a NumPy array
-    mesh['centroids'] = np.array(mesh['centroids'])
-    mesh['face_nodes'] = np.array(mesh['face_nodes'])
+    def _check_cells(self, centroids, face_nodes):
+        """Widths, neighbour ratios and centroid offsets of consecutive cells"""
+        
+        widths = np.subtract(face_nodes[1:], face_nodes[:-1], dtype=np.float64)
+        # first width of the pairs of neighbour cells across the chunks
+        previous = widths[:-1] if self._last_width is None else np.concatenate(
+            [[self._last_width], widths[:-1]])
+        self._last_width = widths[-1]
+        positive = widths > 0
+        all_positive = positive.all() and (len(previous) == 0 or previous[0] > 0)
+        if not all_positive:
+            self.n_non_monotonic += len(widths) - np.count_nonzero(positive)
+            # the non-positive widths are left out of the ratios and offsets
+            widths = np.where(positive, widths, np.nan)
+            previous = np.where(previous > 0, previous, np.nan)
+        # fmin/fmax ignore the NaNs (also the non-finite coordinates)
+        self.min_width = min(self.min_width, np.fmin.reduce(widths))
+        self.max_width = max(self.max_width, np.fmax.reduce(widths))
+        
+        # distance of the centroids from the midpoints, w.r.t. the cell width
+        offsets = np.subtract(centroids, face_nodes[:-1], dtype=np.float64)
+        offsets /= widths
+        offsets -= 0.5
+        self.max_centroid_offset = max(self.max_centroid_offset, 
+                                       np.fmax.reduce(np.abs(offsets, out=offsets)))
+        
+        # size ratio (larger/smaller) of every pair of neighbour cells
+        if len(previous) > 0:
+            following = widths[len(widths) - len(previous):]
+            ratios = np.maximum(previous, following)
+            ratios /= np.minimum(previous, following)
+            self.max_ratio = max(self.max_ratio, np.fmax.reduce(ratios))
+            # number of ratios below every edge (the NaNs are never counted):
+            # with a few bins, cheaper than sorting or searching the ratios
+            below = [np.count_nonzero(ratios < edge) for edge in self.ratio_bins]
+            self.ratio_counts += np.diff(below)
     
-    return mesh
+    def report(self):
+        """
+        Quality of the cells checked so far
+
+        Returns
+        -------
+        report : dictionary
+            Quality of the mesh:
+                
+                - ``'N_fv'``, ``'N_faces'``: number of centroids and of face 
+                  nodes
+                - ``'min_width'``, ``'max_width'``: smallest and largest cell
+                - ``'max_ratio'``: largest size ratio of neighbour cells
+                - ``'ratio_bins'``, ``'ratio_counts'``: histogram of the size
+                  ratios of neighbour cells
+                - ``'monotonic'``: ``True`` if the face nodes are strictly
+                  increasing
+                - ``'n_non_monotonic'``: number of cells with non-positive
+                  width
+                - ``'n_nonfinite'``: number of NaN or infinite coordinates
+                - ``'max_centroid_offset'``: largest distance between a 
+                  centroid and the midpoint of its cell, w.r.t. the cell width
+                  (more than 0.5 if the centroid is outside the cell)
+                - ``'length'``: length of the domain
+                - ``'length_error'``: difference from the expected length 
+                  (``None`` if no length is expected)
+                - ``'errors'``: description of the problems found (empty if
+                  the mesh is valid)
+
+        """
+        
+        length = None
+        length_error = None
+        if self.first_face is not None:
+            length = self.last_face - self.first_face
+            if self.length is not None:
+                length_error = length - self.length
+        
+        errors = []
+        if self.N_fv == 0:
+            errors.append('no cells')
+        elif self.N_faces != self.N_fv + 1:
+            errors.append(str(self.N_faces) + ' face nodes for ' + str(self.N_fv) + 
+                          ' cells (expected ' + str(self.N_fv + 1) + ')')
+        if self.n_nonfinite > 0:
+            errors.append(str(self.n_nonfinite) + ' non-finite coordinates')
+        if self.n_non_monotonic > 0:
+            errors.append('face nodes not increasing at ' + str(self.n_non_monotonic) + 
+                          ' cells')
+        if self.max_centroid_offset > 0.5:
+            errors.append('centroids outside their cells (offset ' + 
+                          '{:.3g}'.format(self.max_centroid_offset) + ' cell widths)')
+        if length_error is not None:
+            tol = self.length_tol
+            if tol is None:
+                x_max = max(abs(self.first_face), abs(self.last_face))
+                tol = 8 * float(np.spacing(self.dtype.type(x_max)))
+            if not abs(length_error) <= tol:
+                errors.append('length ' + repr(length) + ' instead of ' + 
+                              repr(self.length))
+        
+        return {'N_fv': self.N_fv,
+                'N_faces': self.N_faces,
+                'min_width': float(self.min_width) if self.N_fv > 0 else None,
+                'max_width': float(self.max_width) if self.N_fv > 0 else None,
+                'max_ratio': float(self.max_ratio),
+                'ratio_bins': self.ratio_bins,
+                'ratio_counts': self.ratio_counts.copy(),
+                'monotonic': bool(self.n_non_monotonic == 0),
+                'n_non_monotonic': int(self.n_non_monotonic),
+                'n_nonfinite': int(self.n_nonfinite),
+                'max_centroid_offset': float(self.max_centroid_offset),
+                'length': length,
+                'length_error': length_error,
+                'errors': errors
+                }
 
 
-def connect_more_meshes(mesh_files):
+
+def mesh_quality(mesh, length=None, chunk_size=QUALITY_CHUNK_SIZE, **kwargs):
     """
-    Connect sequentially more 1D meshes.
+    Quality report of a 1D mesh
+
+    The coordinates are checked in chunks (see ``MeshQuality``), so that the
+    temporary arrays are small also for memory-mapped meshes.
 
     Parameters
     ----------
-    mesh_files : array
-        List of 1D mesh files that will be connected in the SAME ORDER as they  
-        are given (e.g. if the fist mesh is `[a, b, c]` and the second is 
-        `[c, d, e]`, the final mesh will be `[a, b, c, d, e]`)
+    mesh : dictionary
+        1D mesh (e.g. from ``mesher()`` or ``read_mesh()``)
+    length : float
+        Expected length of the domain (``None`` for the length of the 
+        geometry of a ``Mesh``, if any)
+    chunk_size : int
+        Number of cells checked at once
+    **kwargs
+        Further arguments of ``MeshQuality``
 
     Returns
     -------
-    total_mesh : array
-        1D mesh obtained connecting the given meshes one after the other.
+    report : dictionary
+        Quality of the mesh (see ``MeshQuality.report()``)
 
     """
     
+    geometry = getattr(mesh, 'geometry', None)
+    if (length is None) and (geometry is not None):
+        length = geometry['xf_N'] - geometry['xf_0']
+    quality = MeshQuality(length, **kwargs)
+    xC = mesh['centroids']
+    xf = mesh['face_nodes']
+    for start in range(0, max(len(xC), len(xf)), chunk_size):
+        quality.update(xC[start:start + chunk_size], xf[start:start + chunk_size])
+    if len(xf) == 0:
+        quality.update(xC[:0], xf)
+    
+    return quality.report()
+
+
+
+def validate_mesh(mesh, length=None, **kwargs):
+    """
+    Check that a 1D mesh is valid
+
+    A mesh is valid if it has ``N+1`` face nodes for ``N > 0`` centroids, 
+    all the coordinates are finite, the face nodes are strictly increasing, 
+    every centroid is inside its cell and the domain has the expected length 
+    (if given).
+
+    Parameters
+    ----------
+    mesh : dictionary
+        1D mesh (e.g. from ``mesher()`` or ``read_mesh()``)
+    length : float
+        Expected length of the domain (see ``mesh_quality()``)
+    **kwargs
+        Further arguments of ``mesh_quality()``
+
+    Raises
+    ------
+    ``ValueError``
+        If the mesh is not valid
+
+    Returns
+    -------
+    report : dictionary
+        Quality of the mesh (see ``MeshQuality.report()``)
+
+    """
     
-    # you don't know beforehand how many points there will be => use a list and
-    # convert it to a ndarray once you're created the entire mesh
-    total_mesh = []
-    for i, mesh_file_i in enumerate(mesh_files):
-        mesh_i = read_mesh(mesh_file_i)
-        # the meshes are [a, b], [b, c], [c, d], etc.
-        # starting from the second mesh (i == 1), remove the first point so 
-        # that you're not including it twice
-        if i > 0:
-            mesh_i = mesh_i[1:]
-        total_mesh.extend(mesh_i)       # concatenate the meshes
-    total_mesh = np.array(total_mesh)
+    report = mesh_quality(mesh, length, **kwargs)
+    if report['errors']:
+        raise ValueError("ERROR: Invalid mesh: " + '; '.join(report['errors']))
     
-    return total_mesh
+    return report
+
+
+
+def grade_face_nodes(xf_0, xf_N, N_fv, spacing, exp_ratio):
+    r"""
+    Compute the face nodes of a graded (i.e. non-uniform) 1D mesh
+
+    All the face nodes are computed at once with NumPy (see 
+    ``iter_face_nodes()``, of which this is the single-chunk case).
+
+    Parameters
+    ----------
+    xf_0 : float
+        First face node :math:`a`
+    xf_N : float
+        Last face node :math:`b`
+    N_fv : int
+        Number :math:`N` of finite volumes in :math:`[a,b]`
+    spacing : string
+        Clustering law (see ``iter_face_nodes()`` for the available options)
+    exp_ratio : float or tuple
+        Parameter(s) of the clustering law
 
+    Returns
+    -------
+    xf : array
+        Face nodes (:math:`N+1` values)
 
-def plot_mesh(mesh, print_legend=True):
+    """
     
-    # N centroids => N finite volumes => N+1 face nodes
-    N_centroids = len(mesh['centroids'])
-    N_face_nodes = N_centroids + 1
-    # being 1D, the mesh will have y = 0 everywhere
-    x_centroids = np.zeros(N_centroids)
-    x_face_nodes = np.zeros(N_face_nodes)
+    geometry = {'xf_0': xf_0,
+                'xf_N': xf_N,
+                'N_fv': N_fv,
+                'spacing': spacing,
+                'expansion_ratio': exp_ratio
+                }
     
-    x_a = mesh['face_nodes'][0]
-    x_b = mesh['face_nodes'][-1]
+    return next(iter_face_nodes(geometry, chunk_size=N_fv+1))
+
+
+
+def iter_face_nodes(geometry, chunk_size=DEFAULT_CHUNK_SIZE, start=0, stop=None):
+    r"""
+    Generate the face nodes of a 1D mesh in chunks of fixed size
+
+    Every face node is computed in closed form or with a cumulative sum 
+    carried over from one chunk to the next, therefore the face nodes do not
+    depend on the size of the chunks. The first and the last face nodes are
+    always exactly :math:`a` and :math:`b`.
+
+    Parameters
+    ----------
+    geometry : dictionary
+        Parameters describing the geometry (see ``read_input_geom()``). The
+        available spacings are:
+            
+            - ``'uniform'``: :math:`h_i = (b-a)/N`
+            - ``'geometric'``: :math:`h_i = h_1 \alpha^{i-1}`, growing from :math:`a`
+            - ``'double-sided'``: geometric growth with ratio :math:`\alpha` 
+              from both ends towards the middle of the domain (symmetric mesh)
+            - ``'bi-geometric'``: the first :math:`\lceil N/2 \rceil` cells 
+              grow from :math:`a` with ratio :math:`\alpha_a`, the remaining 
+              ones grow from :math:`b` with ratio :math:`\alpha_b`; the two 
+              cells at the interface have the same width
+            - ``'tanh'``: hyperbolic tangent clustering at both ends, 
+              :math:`s(\eta) = \frac{1}{2}\left(1 + \tanh(\delta(\eta - 1/2))/\tanh(\delta/2)\right)` 
+              with stretching factor :math:`\delta > 0`
+            - ``'roberts'``: Roberts' clustering near :math:`a`, with 
+              stretching parameter :math:`\beta > 1` (the closer to 1, the 
+              stronger the clustering)
+        
+        The expansion ratio is the parameter of the law (:math:`\alpha`, 
+        :math:`\delta` or :math:`\beta`); for ``'bi-geometric'`` it's the 
+        couple :math:`(\alpha_a, \alpha_b)`
+    chunk_size : int
+        Number of face nodes of every chunk (the last one may be shorter)
+    start : int
+        Index of the first face node generated
+    stop : int
+        Index after the last face node generated (``None`` for :math:`N+1`).
+        The laws defined in closed form generate only the face nodes in the 
+        range, while those defined by a sequence of widths must still add up
+        all the widths before it (one chunk at a time)
+
+    Raises
+    ------
+    ``ValueError``
+        If the spacing is unknown or its parameter is not valid (a ratio
+        :math:`\alpha \le 0`, :math:`\delta < 0` or :math:`\beta \le 1`).
+        The limits :math:`\alpha = 1` and :math:`\delta = 0` give a
+        uniform mesh
+
+    Yields
+    ------
+    xf : array
+        Consecutive chunks of the face nodes from ``start`` to ``stop``
+
+    """
     
-    plt.figure()
-    plt.plot([x_a, x_b], [0, 0], 'r')                   # physical domain
-    plt.plot(mesh['centroids'], x_centroids, 'o', label='centroids')
-    plt.plot(mesh['face_nodes'], x_face_nodes, '|', label='face nodes', color='g', markersize=20)
-    plt.autoscale(enable=True, axis='x', tight=True)    # MATLAB's xlim tight
-    if print_legend:
-        plt.legend()
-    plt.show()
+    xf_0 = geometry['xf_0']
+    xf_N = geometry['xf_N']
+    N_fv = geometry['N_fv']
+    spacing = geometry['spacing']
+    exp_ratio = geometry['expansion_ratio']
+    L = xf_N - xf_0
+    _check_grading(spacing, exp_ratio)
+    # limit of the hyperbolic tangent for delta -> 0
+    if spacing == 'tanh' and exp_ratio == 0:
+        spacing = 'uniform'
+    
+    if spacing == 'uniform':
+        # same formula of np.linspace(a, b, N+1)
+        step = L / N_fv
+        positions = lambda i0, i1: np.arange(i0, i1, dtype=float) * step + xf_0
+    
+    elif spacing in ('tanh', 'roberts'):
+        # the face nodes are a closed-form function of the uniform 
+        # (computational) coordinate eta = i/N
+        step = 1 / N_fv
+        if spacing == 'tanh':
+            delta = exp_ratio
+            def positions(i0, i1):
+                eta = np.arange(i0, i1, dtype=float) * step
+                s = 0.5 * (1 + np.tanh(delta*(eta - 0.5)) / np.tanh(delta/2))
+                return xf_0 + L*s
+        else:
+            beta = exp_ratio
+            def positions(i0, i1):
+                eta = np.arange(i0, i1, dtype=float) * step
+                g = ((beta + 1) / (beta - 1))**(1 - eta)
+                s = ((beta + 1) - (beta - 1)*g) / (g + 1)
+                return xf_0 + L*s
+    
+    else:
+        # the face nodes are the cumulative sum of the cell widths
+        widths = _width_function(L, N_fv, spacing, exp_ratio)
+        positions = None
+    
+    stop = N_fv+1 if stop is None else min(stop, N_fv+1)
+    if start >= stop:
+        return
+    
+    carry = xf_0
+    # a cumulative sum can't skip the face nodes before the range
+    first = start if positions is not None else 0
+    for i0 in range(first, stop, chunk_size):
+        i1 = min(i0 + chunk_size, stop) if positions is not None else min(i0 + chunk_size, N_fv+1)
+        if positions is not None:
+            xf = positions(i0, i1)
+        else:
+            # face nodes: x_f(i) = x_f(i-1) + h_i
+            # the cumulative sum of [a, h_1, h_2, ..., h_(N-1)] adds the 
+            # widths one after the other (in the same order of a sequential 
+            # loop), in the next chunk the sum starts from the last face node
+            xf = np.empty(i1 - i0)
+            if i0 == 0:
+                xf[0] = xf_0
+                xf[1:] = widths(0, i1-1)
+            else:
+                xf[:] = widths(i0-1, i1-1)
+                xf[0] = carry + xf[0]
+            np.cumsum(xf, out=xf)
+            carry = xf[-1]
+        
+        # avoid round-off errors on the boundaries of the domain
+        if i0 == 0:
+            xf[0] = xf_0
+        if i1 == N_fv+1:
+            xf[-1] = xf_N
+        
+        if i1 <= start:
+            continue
+        if (i0 < start) or (i1 > stop):
+            xf = xf[max(start - i0, 0):stop - i0]
+        yield xf
+        if i1 >= stop:
+            break
+
+
+
+def iter_centroids(geometry, chunk_size=DEFAULT_CHUNK_SIZE, start=0, stop=None):
+    """
+    Generate the centroids of a 1D cell-center mesh in chunks of fixed size
+
+    Parameters
+    ----------
+    geometry : dictionary
+        Parameters describing the geometry (see ``read_input_geom()``)
+    chunk_size : int
+        Number of centroids of every chunk (the last one may be shorter)
+    start : int
+        Index of the first centroid generated
+    stop : int
+        Index after the last centroid generated (``None`` for :math:`N`)
+
+    Yields
+    ------
+    xC : array
+        Consecutive chunks of the centroids from ``start`` to ``stop``
+
+    """
+    
+    xf_0 = geometry['xf_0']
+    xf_N = geometry['xf_N']
+    N_fv = geometry['N_fv']
+    stop = N_fv if stop is None else min(stop, N_fv)
+    
+    if geometry['spacing'] == 'uniform':
+        # same formula of np.linspace(xC_0, xC_N, N) used by generate_mesh()
+        dx = (xf_N - xf_0) / N_fv
+        xC_0 = xf_0 + dx/2
+        xC_N = xf_N - dx/2
+        step = (xC_N - xC_0) / (N_fv - 1) if N_fv > 1 else 0.0
+        for i0 in range(start, stop, chunk_size):
+            i1 = min(i0 + chunk_size, stop)
+            xC = np.arange(i0, i1, dtype=float) * step + xC_0
+            if i1 == N_fv and N_fv > 1:
+                xC[-1] = xC_N
+            yield xC
+    
+    else:
+        # centroids = midpoints of the intervals: the last face node of a 
+        # chunk is needed by the first centroid of the next chunk
+        xf_previous = None
+        for xf in iter_face_nodes(geometry, chunk_size, start, stop+1):
+            if xf_previous is not None:
+                xf = np.concatenate(([xf_previous], xf))
+            if len(xf) > 1:
+                yield (xf[1:] + xf[:-1]) / 2
+            xf_previous = xf[-1]
+
+
+
+def _width_function(L, N_fv, spacing, exp_ratio):
+    """
+    Function computing the widths h_i of the cells i0,...,i1-1 (0-based) for
+    the laws defined by a sequence of widths (see ``iter_face_nodes()``)
+    """
+    
+    if spacing == 'geometric':
+        # h_i = h_1 * alpha^(i-1) for i=1,...,N, normalised w.r.t. the largest
+        # cell (width 1) to avoid overflows: the last one if alpha > 1, the
+        # first one otherwise
+        if exp_ratio > 1:
+            scale = L / _sum_geometric_widths(N_fv, exp_ratio)
+            return lambda i0, i1: scale * exp_ratio**(np.arange(i0, i1, dtype=float) -
+                                                      (N_fv - 1))
+        # sum of the terms alpha^(i-1) for i=1,...,N (geometric series)
+        if exp_ratio == 1:
+            sum_geom_series = float(N_fv)
+        else:
+            sum_geom_series = (1 - exp_ratio**N_fv) / (1 - exp_ratio)
+        h_1 = L / sum_geom_series
+        return lambda i0, i1: h_1 * exp_ratio**np.arange(i0, i1, dtype=float)
+    
+    elif spacing in ('double-sided', 'bi-geometric'):
+        # the first N_a cells grow from a, the other N_b grow from b (with N 
+        # odd the middle cell belongs to the first section)
+        N_a = (N_fv + 1) // 2
+        N_b = N_fv - N_a
+        if spacing == 'double-sided':
+            alpha_a = alpha_b = exp_ratio
+            # the second section is the mirror image of the first one (without
+            # the middle cell, if N is odd)
+            shift = N_a - N_b
+        else:
+            alpha_a, alpha_b = exp_ratio
+            # the two cells next to the interface have the same width
+            shift = 0
+        # both sections are normalised w.r.t. the interface cell (width 1,
+        # which also avoids overflows), then the widths are rescaled so that 
+        # they sum up to the domain length
+        scale = L / (_sum_geometric_widths(N_a, alpha_a) + 
+                     alpha_b**(-shift) * _sum_geometric_widths(N_b, alpha_b))
+        def widths(i0, i1):
+            i = np.arange(i0, i1, dtype=float)
+            w = np.where(i < N_a, 
+                         alpha_a**np.minimum(i + 1 - N_a, 0), 
+                         alpha_b**np.minimum(N_a - shift - i, 0))
+            return scale * w
+        return widths
+    
+    else:
+        raise ValueError("ERROR: Unknown spacing '" + str(spacing) + "'")
+
+
+
+def _check_grading(spacing, exp_ratio):
+    """Check the parameter of a clustering law (see ``iter_face_nodes()``)"""
+    
+    if spacing not in SPACINGS:
+        raise ValueError("ERROR: Unknown spacing '" + str(spacing) + "' (available: " + 
+                         ', '.join(SPACINGS) + ")")
+    if spacing == 'uniform':
+        return
+    if exp_ratio is None:
+        raise ValueError("ERROR: The expansion ratio is required by the '" + 
+                         str(spacing) + "' spacing")
+    if spacing == 'bi-geometric':
+        if np.ndim(exp_ratio) != 1 or len(exp_ratio) != 2:
+            raise ValueError("ERROR: The 'bi-geometric' spacing requires two " + 
+                             "expansion ratios")
+        ratios = exp_ratio
+    elif np.ndim(exp_ratio) != 0:
+        raise ValueError("ERROR: The '" + str(spacing) + "' spacing requires one " + 
+                         "expansion ratio")
+    else:
+        ratios = (exp_ratio,)
+    
+    if spacing in ('geometric', 'double-sided', 'bi-geometric'):
+        if not all(alpha > 0 for alpha in ratios):
+            raise ValueError("ERROR: The expansion ratio of the '" + spacing + 
+                             "' spacing must be > 0 (got " + str(exp_ratio) + ")")
+    elif spacing == 'tanh':
+        if not exp_ratio >= 0:
+            raise ValueError("ERROR: The stretching factor of the 'tanh' spacing " + 
+                             "must be >= 0 (got " + str(exp_ratio) + ")")
+    elif spacing == 'roberts':
+        if not exp_ratio > 1:
+            raise ValueError("ERROR: The stretching parameter of the 'roberts' " + 
+                             "spacing must be > 1 (got " + str(exp_ratio) + ")")
+
+
+
+def _sum_geometric_widths(N, alpha):
+    """Sum of alpha^(i-N) for i=1,...,N (geometric series)"""
+    
+    if alpha == 1:
+        return float(N)
+    
+    return (1 - alpha**(-N)) / (1 - 1/alpha)
+
+
+
+def calculate_expansion_ratio(N, xf_0, xf_N, h_1=None, alpha_0=None, tol=1e-12, 
+                              k_max=100, h_N=None):
+    r"""
+    Compute the expansion ratio of a geometric mesh from the size of its first
+    (or last) cell
+
+    The expansion ratio :math:`\alpha = e^t` is the root of 
+    :math:`G(t) = \ln S(t) - \ln K`, where 
+    :math:`S(t) = \sum_{k=0}^{N-1} e^{kt}` and :math:`K = (b-a)/h_1`. 
+    :math:`G` is increasing and convex and never overflows, since 
+    :math:`\ln S` is evaluated in closed form for large :math:`|Nt|`. The 
+    root is bracketed using :math:`e^{(N-1)t} \le e^{kt} \le 1` (or the 
+    opposite for :math:`t > 0`), then Newton's method is 
+    applied to all the inputs at once, falling back to bisection whenever a 
+    step leaves the bracket.
+
+    Parameters
+    ----------
+    N : int or array
+        Number :math:`N` of finite volumes
+    xf_0 : float or array
+        First face node :math:`a`
+    xf_N : float or array
+        Last face node :math:`b`
+    h_1 : float or array
+        Width of the first cell
+    alpha_0 : float or array
+        Initial guess of the expansion ratio (``None`` to start from the 
+        upper end of the bracket, from where Newton's method converges 
+        monotonically)
+    tol : float
+        Tolerance on the relative change of the expansion ratio
+    k_max : int
+        Maximum number of iterations
+    h_N : float or array
+        Width of the last cell, given INSTEAD of ``h_1`` (inverse mode)
+
+    Returns
+    -------
+    alpha : float or array
+        Expansion ratio :math:`h_i/h_{i-1}` (``NaN`` if there is no solution,
+        i.e. if the cell is larger than the domain or if :math:`N = 1` and 
+        the cell is not the whole domain)
+    err : float or array
+        Relative change of the expansion ratio in the last iteration
+    k : int
+        Number of iterations
+    max_iteration_reached : bool or array
+        ``True`` where the tolerance has not been reached in ``k_max`` 
+        iterations
+
+    """
+    
+    if (h_1 is None) == (h_N is None):
+        raise ValueError("ERROR: Give either the first or the last cell size")
+    
+    # INPUTS AS ARRAYS
+    h = h_1 if h_1 is not None else h_N
+    scalar_input = all(np.ndim(x) == 0 for x in (N, xf_0, xf_N, h, alpha_0))
+    # (at least 1D arrays, so that they can be indexed with masks)
+    N, xf_0, xf_N, h = np.broadcast_arrays(np.atleast_1d(np.asarray(N, dtype=float)), 
+                                           np.asarray(xf_0, dtype=float), 
+                                           np.asarray(xf_N, dtype=float), 
+                                           np.asarray(h, dtype=float))
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        # coefficient of the equation (compute once to avoid overhead)
+        K = (xf_N - xf_0) / h
+        log_K = np.log(K)
+        
+        # BRACKET OF THE ROOT
+        # since e^(kt) lies between e^((N-1)t) and 1:
+        #   t > 0 (K > N):  e^((N-1)t) <= S <= N e^((N-1)t)
+        #   t < 0 (K < N):  N e^((N-1)t) <= S <= 1/(1 - e^t)
+        t_N = np.log(K / N) / (N - 1)
+        t_lo = np.where(K >= N, t_N, np.log1p(-1 / K))
+        t_hi = np.where(K >= N, log_K / (N - 1), t_N)
+        if alpha_0 is None:
+            t = t_hi.copy()
+        else:
+            t = np.clip(np.log(alpha_0), t_lo, t_hi)
+    # cases without a solution: K < 1 (or not finite), or N = 1 with K != 1
+    valid = (K >= 1) & np.isfinite(K) & (N >= 1) & ~((N == 1) & (K != 1))
+    # N = 1 and K = 1: any ratio is fine
+    single = valid & (N == 1)
+    # K = 1 with N > 1: alpha = 0 (the first cell is the whole domain)
+    degenerate = valid & (K == 1) & (N > 1)
+    active = valid & ~single & ~degenerate
+    
+    # SAFEGUARDED NEWTON'S METHOD
+    err = np.zeros_like(K)
+    k = 0
+    while k < k_max and active.any():
+        G, dG = _log_geometric_sum(t[active], N[active])
+        G = G - log_K[active]
+        t_a = t[active]
+        lo = t_lo[active]
+        hi = t_hi[active]
+        # shrink the bracket (G is increasing)
+        hi = np.where(G > 0, np.minimum(hi, t_a), hi)
+        lo = np.where(G < 0, np.maximum(lo, t_a), lo)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t_new = t_a - G / dG
+        # bisection when Newton's step leaves the bracket
+        outside = ~((t_new >= lo) & (t_new <= hi))
+        t_new = np.where(outside, (lo + hi) / 2, t_new)
+        
+        # relative change of alpha = e^t
+        err_a = np.abs(np.expm1(t_new - t_a))
+        t[active] = t_new
+        t_lo[active] = lo
+        t_hi[active] = hi
+        err[active] = err_a
+        converged = (err_a <= tol) | (G == 0)
+        # active & not converged
+        active[np.flatnonzero(active)[converged]] = False
+        k = k + 1
+    
+    alpha = np.exp(t)
+    alpha[single] = 1.0
+    alpha[degenerate] = 0.0
+    alpha[~valid] = np.nan
+    if h_N is not None:
+        # the series read backwards starting from the last cell has ratio 1/alpha
+        with np.errstate(divide='ignore'):
+            alpha = 1 / alpha
+    max_iteration_reached = active
+    
+    if scalar_input:
+        return float(alpha[0]), float(err[0]), k, bool(max_iteration_reached[0])
+    
+    return alpha, err, k, max_iteration_reached
+
+
+
+def _log_geometric_sum(t, N):
+    """
+    Logarithm of S(t) = sum of e^(kt) for k=0,...,N-1 and its derivative, 
+    without overflows
+    """
+    
+    Nt = N * t
+    # series expansion around t = 0, where the closed form cancels out
+    small = np.abs(Nt) < 1e-3
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        # t > 0: S = e^(Nt) (1 - e^(-Nt)) / (e^t - 1)
+        # t < 0: S = (1 - e^(Nt)) / (1 - e^t)
+        log_S = np.where(t > 0, 
+                         Nt + np.log(-np.expm1(-Nt)) - np.log(np.expm1(t)), 
+                         np.log(-np.expm1(Nt)) - np.log(-np.expm1(t)))
+        # d(log S)/dt = N/(1 - e^(-Nt)) - 1/(1 - e^(-t))
+        dlog_S = N / -np.expm1(-Nt) - 1 / -np.expm1(-t)
+    log_S = np.where(small, np.log(N) + (N - 1)/2 * t + (N**2 - 1)/24 * t**2, log_S)
+    dlog_S = np.where(small, (N - 1)/2 + (N**2 - 1)/12 * t, dlog_S)
+    
+    return log_S, dlog_S
+
+
+
+@pymonitor.monitored
+def print_mesh(mesh, mesh_file, file_format='text', digits=None):
+    """
+    Print the mesh saving it in a plain text file or in a binary file
+
+    Parameters
+    ----------
+    mesh : dictionary
+        Mesh coordinates:
+            
+            - ``'centroids'``: centroid coordinates :math:`x_P`
+            - ``'face_nodes'``: face centre coordinates :math:`x_\mathrm{f}`
+    mesh_file : string
+        Name of the file where to save the mesh
+    file_format : string
+        Format of the mesh file:
+            
+            - ``'text'``: plain text file (one coordinate per line)
+            - ``'binary'``: binary file (see ``print_binary_mesh()``)
+            - ``'parametric'``: only the geometry the mesh was generated 
+              from (see ``print_parametric_mesh()``)
+    digits : int
+        Significant digits of the coordinates in a text file (``None`` for 
+        the default of their type, see ``TEXT_DIGITS``). Binary files store
+        the coordinates with their type
+
+    Raises
+    ------
+    ``ValueError``
+        If the file format is unknown
+
+    Returns
+    -------
+    None.
+
+    """
+    
+    if file_format == 'binary':
+        print_binary_mesh(mesh, mesh_file)
+        return
+    elif file_format == 'parametric':
+        print_parametric_mesh(mesh, mesh_file)
+        return
+    elif file_format != 'text':
+        raise ValueError("ERROR: Unknown mesh file format '" + str(file_format) + "'")
+    
+    fmt = _text_format(np.asarray(mesh['centroids']).dtype, digits)
+    logger.info('Saving mesh to \t\t\t' + os.path.abspath(mesh_file))
+    with open(mesh_file, 'w') as file:
+        _write_text_mesh(file, [mesh['centroids']], [mesh['face_nodes']], fmt)
+
+
+
+def _text_format(dtype, digits=None):
+    """Format of the coordinates in a text mesh file"""
+    
+    if digits is None:
+        digits = TEXT_DIGITS.get(np.dtype(dtype).name, TEXT_DIGITS['float64'])
+    if digits < 1:
+        raise ValueError("ERROR: The number of significant digits must be positive")
+    
+    return '%.' + str(int(digits) - 1) + 'e'
+
+
+
+def _write_text_mesh(file, centroid_chunks, face_chunks, fmt='%.18e'):
+    """Write the sections of a text mesh file, one chunk of values at a time"""
+    
+    file.write('CENTROID COORDINATES\n')
+    for xC in centroid_chunks:
+        np.savetxt(file, xC, fmt=fmt, newline='\n')
+    file.write('\n')
+    
+    file.write('FACE NODES COORDINATES\n')
+    for xf in face_chunks:
+        np.savetxt(file, xf, fmt=fmt, newline='\n')
+    # the position is the size of the file
+    pymonitor.current().written(file.tell())
+
+
+
+@pymonitor.monitored
+def print_binary_mesh(mesh, mesh_file):
+    """
+    Print the mesh saving it in a binary file
+
+    The file starts with a fixed-size header (``BINARY_HEADER_SIZE`` bytes) 
+    containing the number of centroids and of face nodes, the type of the 
+    coordinates and their byte order. The header is followed by the centroid
+    coordinates and then by the face node coordinates, both stored as 
+    contiguous arrays, so that the file can be memory-mapped when read.
+
+    Parameters
+    ----------
+    mesh : dictionary
+        Mesh coordinates (same keys used by ``print_mesh()``)
+    mesh_file : string
+        Name of the file where to save the mesh
+
+    Returns
+    -------
+    None.
+
+    """
+    
+    logger.info('Saving mesh to \t\t\t' + os.path.abspath(mesh_file))
+    xC = np.ascontiguousarray(mesh['centroids'])
+    # both arrays must have the same type, since only one type is stored
+    xf = np.ascontiguousarray(mesh['face_nodes'], dtype=xC.dtype)
+    
+    with open(mesh_file, 'wb') as file:
+        _write_binary_mesh(file, xC.dtype, xC.size, xf.size, [xC], [xf])
+
+
+
+def _write_binary_mesh(file, dtype, N_centroids, N_faces, centroid_chunks, face_chunks):
+    """
+    Write a binary mesh file, one chunk of values at a time (the chunks must
+    have the type given and contain exactly the number of values declared)
+    """
+    
+    # type code without byte order (e.g. '<f8' => 'f8')
+    type_code = dtype.str[1:]
+    # '|' (not applicable) and '=' (native) are saved as the native byte order
+    byte_order = dtype.str[0]
+    if byte_order not in '<>':
+        byte_order = '<' if sys.byteorder == 'little' else '>'
+    
+    header = _BINARY_HEADER.pack(BINARY_MESH_MAGIC, BINARY_MESH_VERSION, 
+                                 byte_order.encode('ascii'), 
+                                 type_code.encode('ascii'), 
+                                 N_centroids, N_faces)
+    
+    # pad the header with zeros
+    file.write(header.ljust(BINARY_HEADER_SIZE, b'\0'))
+    # write the raw content of the arrays (no copies)
+    for chunk in centroid_chunks:
+        file.write(memoryview(np.ascontiguousarray(chunk, dtype=dtype)).cast('B'))
+    for chunk in face_chunks:
+        file.write(memoryview(np.ascontiguousarray(chunk, dtype=dtype)).cast('B'))
+    pymonitor.current().written(BINARY_HEADER_SIZE + (N_centroids + N_faces) * dtype.itemsize)
+
+
+
+@pymonitor.monitored
+def print_parametric_mesh(mesh, mesh_file):
+    """
+    Print the parameters a mesh was generated from, instead of its coordinates
+
+    The file contains the geometry (with the same keywords of the geometry
+    input file), the discretisation method, the type of the coordinates and
+    the SHA-256 checksum of the coordinates (see ``mesh_checksum()``): its
+    size doesn't depend on the number of finite volumes. Only meshes
+    generated from a geometry can be saved in this format, the meshes
+    refined or assembled from other meshes must be saved with their
+    coordinates.
+
+    Parameters
+    ----------
+    mesh : Mesh
+        Mesh generated by ``generate_mesh()`` or ``mesher()``
+    mesh_file : string
+        Name of the file where to save the mesh
+
+    Raises
+    ------
+    ``ValueError``
+        If the mesh has no geometry
+
+    Returns
+    -------
+    None.
+
+    """
+    
+    geometry = getattr(mesh, 'geometry', None)
+    if geometry is None:
+        raise ValueError("ERROR: Only meshes generated from a geometry can be "
+                         "saved in parametric format")
+    checksum = mesh_checksum([mesh.centroids], [mesh.face_nodes])
+    
+    logger.info('Saving mesh to \t\t\t' + os.path.abspath(mesh_file))
+    _write_parametric_mesh(mesh_file, geometry, 'cellcenter', mesh.dtype, checksum)
+
+
+
+def _write_parametric_mesh(mesh_file, geometry, discr_method, dtype, checksum):
+    """Write a parametric mesh file (see ``print_parametric_mesh()``)"""
+    
+    exp_ratio = geometry['expansion_ratio']
+    with open(mesh_file, 'w') as file:
+        file.write(PARAMETRIC_MESH_HEADER + '\n\n')
+        file.write('VERSION\n' + str(PARAMETRIC_MESH_VERSION) + '\n\n')
+        # repr() writes all the digits of the floats
+        file.write('X0\n' + repr(float(geometry['xf_0'])) + '\n\n')
+        file.write('XL\n' + repr(float(geometry['xf_N'])) + '\n\n')
+        file.write('N\n' + str(int(geometry['N_fv'])) + '\n\n')
+        file.write('SPACING\n' + geometry['spacing'] + '\n\n')
+        if exp_ratio is not None:
+            file.write('EXPANSION RATIO\n' + 
+                       ' '.join(repr(float(alpha)) for alpha in np.atleast_1d(exp_ratio)) + 
+                       '\n\n')
+        file.write('DISCRETISATION\n' + discr_method + '\n\n')
+        file.write('PRECISION\n' + np.dtype(dtype).name + '\n\n')
+        file.write('CHECKSUM\n' + checksum + '\n')
+        pymonitor.current().written(file.tell())
+
+
+
+def mesh_checksum(centroid_chunks, face_chunks):
+    """
+    SHA-256 checksum of the coordinates of a mesh
+
+    The coordinates are hashed as little-endian double precision floats, one
+    chunk at a time (the checksum doesn't depend on the chunks).
+
+    Parameters
+    ----------
+    centroid_chunks : iterable
+        Consecutive chunks of the centroids
+    face_chunks : iterable
+        Consecutive chunks of the face nodes
+
+    Returns
+    -------
+    checksum : string
+        Hexadecimal checksum
+
+    """
+    
+    checksum = hashlib.sha256()
+    for chunks in (centroid_chunks, face_chunks):
+        for chunk in chunks:
+            chunk = np.ascontiguousarray(chunk, dtype='<f8')
+            checksum.update(memoryview(chunk).cast('B'))
+    
+    return checksum.hexdigest()
+
+
+
+@pymonitor.monitored
+def stream_mesher(input_file, mesh_file, discr_method='cellcenter', 
+                  file_format='text', chunk_size=DEFAULT_CHUNK_SIZE, dtype=float,
+                  digits=None):
+    """
+    Create a 1D mesh and save it to file without keeping it in memory
+
+    The centroids and the face nodes are generated and written in chunks of
+    ``chunk_size`` values, therefore the memory needed does not depend on the
+    number of finite volumes. The file is identical to the one written by 
+    ``mesher()``.
+
+    Parameters
+    ----------
+    input_file : string
+        Name of the input file required to generate the mesh
+    mesh_file : string
+        Mesh filename
+    discr_method : string
+        Type of discretisation used (see ``mesher()``)
+    file_format : string
+        Format of the mesh file (``'text'``, ``'binary'`` or ``'parametric'``,
+        see ``print_mesh()``)
+    chunk_size : int
+        Number of values generated and written at once
+    dtype : data-type
+        Type of the coordinates (``float32`` or ``float64``)
+    digits : int
+        Significant digits of the coordinates in a text file (see 
+        ``print_mesh()``)
+
+    Returns
+    -------
+    None.
+
+    """
+    
+    geometry = read_input_geom(input_file)
+    print_mesh_stream(geometry, mesh_file, discr_method, file_format, chunk_size,
+                      dtype, digits)
+
+
+
+@pymonitor.monitored
+def print_mesh_stream(geometry, mesh_file, discr_method='cellcenter', 
+                      file_format='text', chunk_size=DEFAULT_CHUNK_SIZE, dtype=float,
+                      digits=None):
+    """
+    Generate a 1D mesh in chunks and stream it to file
+
+    Parameters
+    ----------
+    geometry : dictionary
+        Parameters describing the geometry (see ``read_input_geom()``)
+    mesh_file : string
+        Name of the file where to save the mesh
+    discr_method : string
+        Type of discretisation used (see ``mesher()``)
+    file_format : string
+        Format of the mesh file (``'text'``, ``'binary'`` or ``'parametric'``,
+        see ``print_mesh()``)
+    chunk_size : int
+        Number of values generated and written at once (for the parametric
+        format, they are only hashed)
+    dtype : data-type
+        Type of the coordinates (``float32`` or ``float64``): they are 
+        generated in double precision and rounded chunk by chunk
+    digits : int
+        Significant digits of the coordinates in a text file (see 
+        ``print_mesh()``)
+
+    Raises
+    ------
+    ``NotImplementedError``
+        If the discretisation method is not available
+    ``ValueError``
+        If the file format is unknown
+
+    Returns
+    -------
+    None.
+
+    """
+    
+    if discr_method != 'cellcenter':
+        raise NotImplementedError("ERROR: Discretisation method '" + 
+                                  str(discr_method) + "' not implemented")
+    if file_format not in ('text', 'binary', 'parametric'):
+        raise ValueError("ERROR: Unknown mesh file format '" + str(file_format) + "'")
+    
+    dtype = _check_precision(dtype)
+    fmt = _text_format(dtype, digits)
+    
+    # the generators are consumed while writing: only one chunk at a time is
+    # in memory
+    centroid_chunks = (xC.astype(dtype, copy=False) 
+                       for xC in iter_centroids(geometry, chunk_size))
+    face_chunks = iter_face_nodes(geometry, chunk_size)
+    if dtype != np.float64:
+        face_chunks = _rounded_face_chunks(face_chunks, dtype)
+    
+    logger.info('Saving mesh to \t\t\t' + os.path.abspath(mesh_file))
+    if file_format == 'text':
+        with open(mesh_file, 'w') as file:
+            _write_text_mesh(file, centroid_chunks, face_chunks, fmt)
+    elif file_format == 'parametric':
+        checksum = mesh_checksum(centroid_chunks, face_chunks)
+        _write_parametric_mesh(mesh_file, geometry, discr_method, dtype, checksum)
+    else:
+        N_fv = geometry['N_fv']
+        with open(mesh_file, 'wb') as file:
+            _write_binary_mesh(file, dtype, N_fv, N_fv+1, 
+                               centroid_chunks, face_chunks)
+
+
+
+def _rounded_face_chunks(face_chunks, dtype):
+    """
+    Round the chunks of face nodes to another type, checking at the end that
+    the type resolves the smallest cell (see ``check_resolution()``)
+    """
+    
+    min_width = np.inf
+    x_first = x_last = None
+    for xf in face_chunks:
+        if x_last is not None:
+            min_width = min(min_width, xf[0] - x_last)
+        else:
+            x_first = xf[0]
+        if len(xf) > 1:
+            min_width = min(min_width, np.diff(xf).min())
+        x_last = xf[-1]
+        yield xf.astype(dtype)
+    if x_first is not None:
+        check_resolution([x_first, x_last], dtype, min_width)
+
+
+
+@pymonitor.monitored
+def read_mesh(mesh_file, mmap=False, dtype=None, validate=None):
+    """
+    Read 1D mesh from file and import it
+    
+    The format of the file (plain text, binary or parametric) is detected 
+    automatically.
+
+    Parameters
+    ----------
+    mesh_file : string
+        Name of the mesh file
+    mmap : bool
+        Only for binary files: if ``True``, the coordinates are memory-mapped
+        (``np.memmap``, read-only) instead of being loaded in memory, so that 
+        only the slices actually used are read from disk
+    dtype : data-type
+        Type of the coordinates (``float32`` or ``float64``). ``None`` for the
+        type stored in binary and parametric files, or double precision for 
+        text files. Binary files of another type are loaded in memory even 
+        if ``mmap`` is ``True``
+    validate : bool
+        If ``True``, check that the coordinates of text and binary files form
+        a valid mesh (see ``validate_mesh()``; a memory-mapped file is read 
+        entirely). ``None`` to check the files loaded in memory but not the 
+        memory-mapped ones, so that only the slices actually used are read.
+        Parametric files are checked with their checksum
+
+    Raises
+    ------
+    ``ValueError``
+        If the mesh is not valid
+
+    Returns
+    -------
+    mesh : Mesh
+        1D mesh, for every format (the coordinates can also be accessed as 
+        ``mesh['centroids']`` and ``mesh['face_nodes']``)
+
+    """
+    
+    if dtype is not None:
+        dtype = _check_precision(dtype)
+    if is_binary_mesh(mesh_file):
+        mesh = read_binary_mesh(mesh_file, mmap)
+        mapped = mmap
+        if (dtype is not None) and (mesh['centroids'].dtype != dtype):
+            for coordinate_name in ['centroids', 'face_nodes']:
+                mesh[coordinate_name] = mesh[coordinate_name].astype(dtype)
+            mapped = False
+        mesh = Mesh.from_dict(mesh)
+        if validate or ((validate is None) and not mapped):
+            _validate_mesh_file(mesh, mesh_file)
+        return mesh
+    if is_parametric_mesh(mesh_file):
+        return read_parametric_mesh(mesh_file, dtype=dtype)
+    
+    # GET FILE CONTENT
+    # the file is read in chunks: each chunk is cut at its last newline (the
+    # rest is carried over to the next chunk), so that neither a coordinate 
+    # nor a section header is ever split between two chunks
+    # "type" of the coordinate, to be used when filling the dictionary
+    coordinate_name = None
+    # converted blocks of coordinates, concatenated at the end
+    blocks = {}
+    # flag to detect empty files and whitespace-only files
+    only_whitespaces = True
+    leftover = b''
+    phase_record = pymonitor.current()
+    # don't allocate a whole chunk for small files
+    chunk_size = min(TEXT_CHUNK_SIZE, os.path.getsize(mesh_file) + 1)
+    with open(mesh_file, 'rb') as file:
+        while True:
+            chunk = file.read(chunk_size)
+            phase_record.read(len(chunk))
+            if chunk:
+                data = leftover + chunk
+                i_cut = data.rfind(b'\n') + 1
+                data, leftover = data[:i_cut], data[i_cut:]
+            else:
+                # EOF: parse what remains (a last line without '\n')
+                data, leftover = leftover, b''
+            
+            if only_whitespaces and data and not data.isspace():
+                only_whitespaces = False
+            coordinate_name = _parse_mesh_text(data, coordinate_name, blocks)
+            
+            if not chunk:
+                break
+    
+    # check that the files is not empty and does not contain only whitespaces
+    if only_whitespaces:
+        raise EOFError("ERROR: Empty mesh file")
+    
+    # turn everything into a NumPy array (rounded to the type requested while
+    # the blocks are joined)
+    if dtype is None:
+        dtype = np.dtype(float)
+    mesh = {}
+    for coordinate_name in ['centroids', 'face_nodes']:
+        if coordinate_name not in blocks:
+            raise ValueError("ERROR: Missing '" + coordinate_name + "' section in mesh file")
+        mesh[coordinate_name] = np.concatenate(blocks[coordinate_name], dtype=dtype)
+    phase_record.allocated(mesh['centroids'], mesh['face_nodes'])
+    mesh = Mesh.from_dict(mesh)
+    if validate or (validate is None):
+        _validate_mesh_file(mesh, mesh_file)
+    
+    return mesh
+
+
+
+def _validate_mesh_file(mesh, mesh_file):
+    """Check the mesh read from a file (see ``validate_mesh()``)"""
+    
+    errors = mesh_quality(mesh)['errors']
+    if errors:
+        raise ValueError("ERROR: Invalid mesh in '" + str(mesh_file) + "': " + 
+                         '; '.join(errors))
+
+
+
+def _parse_mesh_text(data, coordinate_name, blocks):
+    """
+    Parse a block of whole lines of a text mesh file
+
+    Parameters
+    ----------
+    data : bytes
+        Whole lines of the mesh file
+    coordinate_name : string
+        Section the first line belongs to (``None`` if no header has been 
+        found yet)
+    blocks : dictionary
+        Lists of arrays of coordinates for every section, updated in place
+
+    Raises
+    ------
+    ``ValueError``
+        If a line is neither a number nor a section header
+
+    Returns
+    -------
+    coordinate_name : string
+        Section the last line belongs to
+
+    """
+    
+    # format of the file:
+    #   KEYWORD
+    #   VALUES
+    # the text between two keywords is a block of numbers (one per line),
+    # converted at once
+    i_start = 0
+    while True:
+        # look for the next header (bytes.find() is much faster than a regex)
+        i_header = len(data)
+        for header in _MESH_SECTIONS:
+            i = data.find(header, i_start, i_header)
+            if i >= 0:
+                i_header = i
+        if i_header == len(data):
+            break
+        # the header must be alone on its line (apart from whitespaces)
+        i_line = data.rfind(b'\n', i_start, i_header) + 1
+        i_end = data.find(b'\n', i_header)
+        if i_end < 0:
+            i_end = len(data)
+        header = data[i_line:i_end].strip()
+        if header not in _MESH_SECTIONS:
+            raise ValueError("ERROR: Invalid section header in mesh file")
+        
+        _convert_mesh_block(data[i_start:i_line], coordinate_name, blocks)
+        coordinate_name = _MESH_SECTIONS[header]
+        # initialise the list, so that I can append blocks afterward
+        blocks[coordinate_name] = [np.empty(0)]
+        i_start = i_end
+    _convert_mesh_block(data[i_start:], coordinate_name, blocks)
+    
+    return coordinate_name
+
+
+
+def _convert_mesh_block(block, coordinate_name, blocks):
+    """Convert a block of coordinates (one per line) into a NumPy array"""
+    
+    # skip empty lines and lines containing only whitespaces
+    if not block or block.isspace():
+        return
+    if coordinate_name is None:
+        raise ValueError("ERROR: Coordinates found before any section header")
+    
+    # NumPy only warns (DeprecationWarning) when a string can't be converted:
+    # turn the warning into an error
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', DeprecationWarning)
+        try:
+            x = np.fromstring(block, dtype=float, sep=' ')
+        except (ValueError, DeprecationWarning):
+            raise ValueError("ERROR: Invalid coordinates in mesh file") from None
+    blocks[coordinate_name].append(x)
+
+
+
+def is_binary_mesh(mesh_file):
+    """
+    Check whether a mesh file is in binary format
+
+    Parameters
+    ----------
+    mesh_file : string
+        Name of the mesh file
+
+    Returns
+    -------
+    bool
+        ``True`` if the file starts with the binary mesh magic string
+
+    """
+    
+    with open(mesh_file, 'rb') as file:
+        magic = file.read(len(BINARY_MESH_MAGIC))
+    
+    return magic == BINARY_MESH_MAGIC
+
+
+
+def is_parametric_mesh(mesh_file):
+    """
+    Check whether a mesh file is in parametric format
+
+    Parameters
+    ----------
+    mesh_file : string
+        Name of the mesh file
+
+    Returns
+    -------
+    bool
+        ``True`` if the file starts with the parametric mesh header
+
+    """
+    
+    header = PARAMETRIC_MESH_HEADER.encode('ascii')
+    with open(mesh_file, 'rb') as file:
+        first_line = file.read(len(header) + 2)
+    
+    return first_line.rstrip(b'\r\n') == header
+
+
+
+@pymonitor.monitored
+def read_parametric_mesh(mesh_file, verify=True, dtype=None):
+    """
+    Read a parametric mesh file and generate its coordinates again
+
+    Parameters
+    ----------
+    mesh_file : string
+        Name of the mesh file (see ``print_parametric_mesh()``)
+    verify : bool
+        If ``True``, check that the coordinates generated have the checksum 
+        saved in the file
+    dtype : data-type
+        Type of the coordinates (``None`` for the type saved in the file). The
+        checksum is verified on the coordinates rounded to the type saved in
+        the file
+
+    Raises
+    ------
+    ``ValueError``
+        If the file is not a parametric mesh file, or the checksum doesn't 
+        match (e.g. the mesher changed since the file was written)
+
+    Returns
+    -------
+    mesh : Mesh
+        1D mesh, with its geometry
+
+    """
+    
+    geometry, discr_method, dtype_file, checksum = read_parametric_header(mesh_file)
+    dtype = dtype_file if dtype is None else _check_precision(dtype)
+    # the coordinates are computed in double precision and then rounded, so
+    # the mesh is generated once in the wider type and rounded to the other
+    mesh = generate_mesh(geometry, discr_method, np.promote_types(dtype, dtype_file))
+    if verify:
+        saved_mesh = mesh if mesh.dtype == dtype_file else mesh.astype(dtype_file)
+        if mesh_checksum([saved_mesh.centroids], [saved_mesh.face_nodes]) != checksum:
+            raise ValueError("ERROR: The coordinates generated from '" + 
+                             str(mesh_file) + "' don't match its checksum")
+    if mesh.dtype != dtype:
+        mesh = mesh.astype(dtype)
+    
+    return mesh
+
+
+
+def read_parametric_header(mesh_file):
+    """
+    Read the content of a parametric mesh file
+
+    Parameters
+    ----------
+    mesh_file : string
+        Name of the mesh file (see ``print_parametric_mesh()``)
+
+    Raises
+    ------
+    ``ValueError``
+        If the file is not a parametric mesh file, or its version is not
+        supported
+
+    Returns
+    -------
+    geometry : dictionary
+        Parameters describing the geometry (see ``read_input_geom()``)
+    discr_method : string
+        Type of discretisation used (see ``mesher()``)
+    dtype : data-type
+        Type of the coordinates
+    checksum : string
+        Checksum of the coordinates (see ``mesh_checksum()``)
+
+    """
+    
+    if not is_parametric_mesh(mesh_file):
+        raise ValueError("ERROR: '" + str(mesh_file) + "' is not a parametric mesh file")
+    # the geometry has the same keywords of the geometry input file
+    geometry = read_input_geom(mesh_file)
+    
+    with open(mesh_file, 'r') as file:
+        lines = [line.strip() for line in file]
+    values = {}
+    for keyword in ('VERSION', 'DISCRETISATION', 'PRECISION', 'CHECKSUM'):
+        if keyword in lines[:-1]:
+            values[keyword] = lines[lines.index(keyword) + 1]
+    if int(values.get('VERSION', 0)) != PARAMETRIC_MESH_VERSION:
+        raise ValueError("ERROR: Unsupported parametric mesh version '" + 
+                         values.get('VERSION', '') + "'")
+    
+    return (geometry, values.get('DISCRETISATION', 'cellcenter'), 
+            _check_precision(values.get('PRECISION', 'float64')), values.get('CHECKSUM'))
+
+
+
+@pymonitor.monitored
+def read_mesh_range(mesh_file, start, stop):
+    """
+    Read the coordinates of a range of cells of a mesh file
+
+    Parametric files generate only the coordinates needed (the laws defined
+    by a sequence of widths still add up the widths before the range, see 
+    ``iter_face_nodes()``), binary files are memory-mapped and only the range
+    is read from disk, while text files are read whole.
+
+    Parameters
+    ----------
+    mesh_file : string
+        Name of the mesh file
+    start : int
+        Index of the first cell
+    stop : int
+        Index after the last cell
+
+    Returns
+    -------
+    centroids : array
+        Centroids of the cells ``start, ..., stop-1``
+    face_nodes : array
+        Face nodes of the cells (``stop - start + 1`` values)
+
+    """
+    
+    if is_parametric_mesh(mesh_file):
+        geometry, _, dtype, _ = read_parametric_header(mesh_file)
+        start = max(start, 0)
+        stop = min(stop, geometry['N_fv'])
+        chunks = list(iter_centroids(geometry, start=start, stop=stop))
+        xC = np.concatenate(chunks, dtype=dtype) if chunks else np.empty(0, dtype)
+        chunks = list(iter_face_nodes(geometry, start=start, stop=max(stop, start) + 1))
+        xf = np.concatenate(chunks, dtype=dtype) if chunks else np.empty(0, dtype)
+        return xC, xf
+    
+    # only the range is read: the whole mesh can't be validated
+    mesh = read_mesh(mesh_file, mmap=True, validate=False)
+    
+    return (np.array(mesh['centroids'][start:stop]), 
+            np.array(mesh['face_nodes'][start:max(stop, start) + 1]))
+
+
+
+@pymonitor.monitored
+def read_binary_mesh(mesh_file, mmap=False):
+    """
+    Read 1D mesh from binary file (see ``print_binary_mesh()``)
+
+    Parameters
+    ----------
+    mesh_file : string
+        Name of the mesh file
+    mmap : bool
+        If ``True``, return read-only memory-mapped arrays
+
+    Raises
+    ------
+    ``EOFError``
+        If the file is shorter than what is declared in its header
+    ``ValueError``
+        If the file is not a binary mesh file or its version is not supported
+
+    Returns
+    -------
+    mesh : dictionary
+        1D mesh
+
+    """
+    
+    with open(mesh_file, 'rb') as file:
+        header = file.read(BINARY_HEADER_SIZE)
+    
+    if len(header) < BINARY_HEADER_SIZE:
+        raise EOFError("ERROR: Truncated binary mesh header")
+    magic, version, byte_order, type_code, N_centroids, N_faces = \
+        _BINARY_HEADER.unpack_from(header)
+    if magic != BINARY_MESH_MAGIC:
+        raise ValueError("ERROR: Not a binary mesh file")
+    if version != BINARY_MESH_VERSION:
+        raise ValueError("ERROR: Unsupported binary mesh version " + str(version))
+    
+    # e.g. '<' + 'f8' => little-endian float64 (the type code is zero-padded)
+    dtype = np.dtype(byte_order.decode('ascii') + 
+                     type_code.rstrip(b'\0').decode('ascii'))
+    offset_centroids = BINARY_HEADER_SIZE
+    offset_faces = offset_centroids + N_centroids * dtype.itemsize
+    size_file = offset_faces + N_faces * dtype.itemsize
+    if os.path.getsize(mesh_file) < size_file:
+        raise EOFError("ERROR: Truncated binary mesh file")
+    
+    mesh = {}
+    if mmap:
+        # nothing is read now: the OS loads the pages when they are accessed
+        mesh['centroids'] = np.memmap(mesh_file, dtype=dtype, mode='r', 
+                                      offset=offset_centroids, 
+                                      shape=(N_centroids,))
+        mesh['face_nodes'] = np.memmap(mesh_file, dtype=dtype, mode='r', 
+                                       offset=offset_faces, shape=(N_faces,))
+    else:
+        with open(mesh_file, 'rb') as file:
+            file.seek(offset_centroids)
+            mesh['centroids'] = np.fromfile(file, dtype=dtype, count=N_centroids)
+            mesh['face_nodes'] = np.fromfile(file, dtype=dtype, count=N_faces)
+        pymonitor.current().allocated(mesh['centroids'], mesh['face_nodes'])
+    pymonitor.current().read(size_file if not mmap else BINARY_HEADER_SIZE)
+    
+    return mesh
+
+
+
+@pymonitor.monitored
+def connect_more_meshes(mesh_files, tol=1e-10, max_workers=None):
+    """
+    Connect sequentially more 1D meshes.
+    
+    The mesh files are read concurrently on a pool of threads (binary files
+    are memory-mapped), then every block is copied (again concurrently) into 
+    its slice of the preallocated arrays of the final mesh.
+
+    Parameters
+    ----------
+    mesh_files : array
+        List of 1D mesh files that will be connected in the SAME ORDER as they  
+        are given (e.g. if the fist mesh is `[a, b, c]` and the second is 
+        `[c, d, e]`, the final mesh will be `[a, b, c, d, e]`)
+    tol : float
+        Maximum distance between the last face node of a mesh and the first 
+        face node of the next one (the interface face they share)
+    max_workers : int
+        Maximum number of threads (``None`` to use the default of 
+        ``concurrent.futures.ThreadPoolExecutor``)
+
+    Raises
+    ------
+    ``ValueError``
+        If no mesh file is given or two adjacent meshes do not share their 
+        interface face
+
+    Returns
+    -------
+    total_mesh : Mesh
+        1D mesh obtained connecting the given meshes one after the other.
+
+    """
+    
+    if len(mesh_files) == 0:
+        raise ValueError("ERROR: No mesh to connect")
+    
+    # READ ALL THE BLOCKS
+    # reading is I/O bound, therefore threads are enough
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        blocks = list(executor.map(lambda mesh_file: read_mesh(mesh_file, mmap=True), 
+                                   mesh_files))
+    
+    # CHECK THE INTERFACES
+    for i in range(1, len(blocks)):
+        xf_end = blocks[i-1]['face_nodes'][-1]
+        xf_start = blocks[i]['face_nodes'][0]
+        if abs(xf_end - xf_start) > tol:
+            raise ValueError("ERROR: Meshes " + str(i-1) + " and " + str(i) + 
+                             " do not share their interface face (" + 
+                             str(xf_end) + " != " + str(xf_start) + ")")
+    
+    # PREALLOCATE THE FINAL MESH
+    # the meshes are [a, b], [b, c], [c, d], etc. => the interface face nodes 
+    # are included only once
+    N_blocks = np.array([len(block['centroids']) for block in blocks])
+    # index of the first cell of every block in the final mesh
+    offsets = np.concatenate(([0], np.cumsum(N_blocks)))
+    dtype = np.result_type(*[block['centroids'] for block in blocks])
+    xC = np.empty(offsets[-1], dtype=dtype)
+    xf = np.empty(offsets[-1] + 1, dtype=dtype)
+    
+    def copy_block(i):
+        # the last face node of a block is the first one of the next block,
+        # therefore the last face node is copied only for the last block
+        xC[offsets[i]:offsets[i+1]] = blocks[i]['centroids']
+        xf[offsets[i]:offsets[i+1]] = blocks[i]['face_nodes'][:-1]
+    
+    # copy the blocks into the final mesh (the copies are done by NumPy, which 
+    # releases the GIL; for binary files they also do the actual reading, since
+    # the memory-mapped blocks are not validated when they are opened)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(copy_block, range(len(blocks))))
+    xf[-1] = blocks[-1]['face_nodes'][-1]
+    pymonitor.current().allocated(xC, xf)
+    
+    return Mesh(xC, xf)
+
+
+def plot_mesh(mesh, print_legend=True, max_markers=MAX_PLOT_MARKERS, output_file=None,
+              ax=None):
+    """
+    Plot the centroids and the face nodes of a 1D mesh
+
+    Every centroid and face node is drawn as a marker only when the visible
+    part of the mesh has at most ``max_markers`` face nodes. Otherwise the
+    mesh is drawn as a strip coloured by the average cell width in every 
+    pixel (see ``cell_density()``), computed again whenever the x-axis limits
+    change (e.g. when zooming), so that the markers appear when zooming in 
+    enough. The cost of a redraw depends on the number of pixels and of 
+    visible markers, not on the size of the mesh.
+
+    Matplotlib is imported only here, so that the rest of the module (and the
+    command-line interface) starts without it.
+
+    Parameters
+    ----------
+    mesh : dictionary
+        1D mesh (e.g. from ``mesher()`` or ``read_mesh()``)
+    print_legend : bool
+        If ``True``, show the legend
+    max_markers : int
+        Largest number of visible face nodes drawn as markers
+    output_file : string
+        Name of the image file where to save the plot (the format is given by
+        the extension), without showing it: no display is needed. ``None`` to
+        show the plot
+    ax : matplotlib.axes.Axes
+        Axes where to plot the mesh (``None`` for a new figure). The plot is
+        neither shown nor saved unless ``output_file`` is given
+
+    Returns
+    -------
+    ax : matplotlib.axes.Axes
+        Axes of the plot
+
+    """
+    
+    show = (ax is None) and (output_file is None)
+    if ax is None:
+        if output_file is None:
+            import matplotlib.pyplot as plt
+            ax = plt.figure().subplots()
+        else:
+            # a figure not managed by pyplot: no GUI backend, nothing to close
+            from matplotlib.figure import Figure
+            ax = Figure().subplots()
+    
+    _MeshPlot(ax, mesh['centroids'], mesh['face_nodes'], max_markers, print_legend)
+    if output_file is not None:
+        ax.figure.savefig(output_file)
+    if show:
+        plt.show()
+    
+    return ax
+
+
+
+def cell_density(face_nodes, bin_edges):
+    """
+    Number of cells of a 1D mesh in every bin of the domain
+
+    The cells crossing the edges of a bin are counted in proportion to the
+    part inside it. Only the cells containing the edges are searched for 
+    (with a binary search), so the cost depends on the number of bins, not 
+    on the number of cells.
+
+    Parameters
+    ----------
+    face_nodes : array
+        Face node coordinates :math:`x_\\mathrm{f}` (sorted)
+    bin_edges : array
+        Edges of the bins (sorted)
+
+    Returns
+    -------
+    density : array
+        Number of cells in every bin (0 outside the mesh)
+
+    """
+    
+    xf = np.asarray(face_nodes)
+    edges = np.asarray(bin_edges, dtype=np.float64)
+    if len(xf) < 2:
+        return np.zeros(max(len(edges) - 1, 0))
+    
+    edges = np.clip(edges, xf[0], xf[-1])
+    cells = np.clip(np.searchsorted(xf, edges, side='right') - 1, 0, len(xf) - 2)
+    x_left = xf[cells].astype(np.float64)
+    # fractional index of the position of the edges (linear inside every cell)
+    index = cells + (edges - x_left) / (xf[cells + 1] - x_left)
+    
+    return np.diff(index)
+
+
+
+class _MeshPlot:
+    """Mesh drawn on Matplotlib axes with a level of detail (see ``plot_mesh()``)"""
+    
+    def __init__(self, ax, centroids, face_nodes, max_markers, print_legend):
+        from matplotlib.colors import LogNorm
+        
+        self.ax = ax
+        self.centroids = centroids
+        self.face_nodes = face_nodes
+        self.max_markers = max_markers
+        self.print_legend = print_legend
+        self.colorbar = None
+        
+        x_a = float(face_nodes[0])
+        x_b = float(face_nodes[-1])
+        # being 1D, the mesh will have y = 0 everywhere
+        self.domain, = ax.plot([x_a, x_b], [0, 0], 'r', label='domain')
+        self.centroid_markers, = ax.plot([], [], 'o', label='centroids')
+        self.face_markers, = ax.plot([], [], '|', label='face nodes', color='g', 
+                                     markersize=20)
+        self.strip = ax.imshow(np.ones((1, 1)), extent=(x_a, x_b, -0.5, 0.5), 
+                               aspect='auto', origin='lower', interpolation='nearest', 
+                               norm=LogNorm())
+        ax.set_xlim(x_a, x_b)                           # MATLAB's xlim tight
+        ax.set_ylim(-1, 1)
+        ax.set_yticks([])
+        # the artists are updated by the plot: the limits are set by the user
+        ax.set_autoscale_on(False)
+        
+        self.update()
+        # a lambda is stored with a strong reference (a bound method wouldn't)
+        ax.callbacks.connect('xlim_changed', lambda ax: self.update())
+    
+    def update(self):
+        """Draw the visible part of the mesh with markers or as a strip"""
+        
+        xf = self.face_nodes
+        x_min, x_max = sorted(self.ax.get_xlim())
+        # visible face nodes, with one more on every side
+        i_start = max(int(np.searchsorted(xf, x_min)) - 1, 0)
+        i_stop = min(int(np.searchsorted(xf, x_max, side='right')) + 1, len(xf))
+        detailed = (i_stop - i_start) <= self.max_markers
+        
+        if detailed:
+            xC = self.centroids[i_start:max(i_stop - 1, i_start)]
+            self.centroid_markers.set_data(xC, np.zeros(len(xC)))
+            self.face_markers.set_data(xf[i_start:i_stop], np.zeros(i_stop - i_start))
+        else:
+            # one bin per pixel
+            edges = np.linspace(x_min, x_max, max(int(self.ax.bbox.width), 1) + 1)
+            density = cell_density(xf, edges)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                widths = np.where(density > 0, np.diff(edges) / density, np.nan)
+            self.strip.set_data(np.ma.masked_invalid(widths[np.newaxis, :]))
+            self.strip.set_extent((x_min, x_max, -0.5, 0.5))
+            if density.any():
+                w_min = np.nanmin(widths)
+                w_max = np.nanmax(widths)
+                # a uniform mesh has a single colour
+                if w_max <= w_min * (1 + 1e-6):
+                    w_min, w_max = w_min / 1.1, w_max * 1.1
+                self.strip.set_clim(w_min, w_max)
+            if self.colorbar is None:
+                self.colorbar = self.ax.figure.colorbar(self.strip, ax=self.ax,
+                                                        label='cell width')
+        
+        self.centroid_markers.set_visible(detailed)
+        self.face_markers.set_visible(detailed)
+        self.strip.set_visible(not detailed)
+        if self.colorbar is not None:
+            self.colorbar.ax.set_visible(not detailed)
+        if self.print_legend:
+            handles = [self.domain]
+            if detailed:
+                handles += [self.centroid_markers, self.face_markers]
+            self.ax.legend(handles=handles, loc='upper right')
     
 
 # =============================================================================
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+
+"""
+On-disk cache of the meshes, indexed by the content of the geometry
+
+Every mesh is stored as a binary mesh file named after a hash of the 
+geometry, of the discretisation method, of the version of the library and of
+the version of the mesh generator. When the total size of the cache exceeds
+its limit, the least recently used meshes are removed.
+
+The cache is opt-in: the library writes to it only when asked to (with
+``use_cache=True`` or a ``MeshCache`` object) or when the environment
+variable ``PYCFD_CACHE_DIR`` is set (see ``cache_enabled()``).
+"""
+
+import hashlib
+import json
+import os
+
+from . import __version__
+
+
+# the cache directory can be changed with this environment variable
+CACHE_DIR_VARIABLE = 'PYCFD_CACHE_DIR'
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'pycfd', 'meshes')
+# maximum size (in bytes) of the cache
+DEFAULT_MAX_SIZE = 2**30
+# extension of the cached mesh files
+CACHE_EXTENSION = '.mesh'
+# version of the mesh generator and of the cached files: increase it whenever
+# the face nodes generated from the same geometry change (e.g. a new grading
+# law), so that the meshes cached by older versions are not used anymore
+GENERATOR_VERSION = 3
+
+
+
+def geometry_key(geometry, discr_method):
+    """
+    Key identifying a mesh in the cache
+
+    Parameters
+    ----------
+    geometry : dictionary
+        Parameters describing the geometry (see ``pymesh.read_input_geom()``)
+    discr_method : string
+        Type of discretisation used (see ``pymesh.mesher()``)
+
+    Returns
+    -------
+    key : string
+        SHA-256 hash (hexadecimal) of the geometry, of the discretisation 
+        method, of the version of the library and of ``GENERATOR_VERSION``
+
+    """
+    
+    # the keys are sorted and the floats are written with all their digits,
+    # therefore equal geometries always give the same string
+    content = json.dumps({'geometry': geometry, 
+                          'discr_method': discr_method, 
+                          'version': __version__,
+                          'generator_version': GENERATOR_VERSION
+                          }, sort_keys=True)
+    
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+
+def cache_enabled(use_cache=None, cache=None):
+    """
+    Whether the mesh cache is used
+
+    Parameters
+    ----------
+    use_cache : bool
+        ``True`` or ``False`` to use the cache or not. If ``None``, the cache 
+        is used only if a cache is given or the environment variable 
+        ``PYCFD_CACHE_DIR`` is set
+    cache : MeshCache
+        Mesh cache given by the caller
+
+    Returns
+    -------
+    enabled : bool
+        ``True`` if the cache is used
+
+    """
+    
+    if use_cache is None:
+        return (cache is not None) or bool(os.environ.get(CACHE_DIR_VARIABLE))
+    
+    return bool(use_cache)
+
+
+
+class MeshCache:
+    """
+    On-disk cache of mesh files with least-recently-used eviction
+
+    Parameters
+    ----------
+    cache_dir : string
+        Directory of the cache. If ``None``, the value of the environment 
+        variable ``PYCFD_CACHE_DIR`` is used or, if it's not set, 
+        ``~/.cache/pycfd/meshes``
+    max_size : int
+        Maximum total size (in bytes) of the cached files
+
+    """
+    
+    def __init__(self, cache_dir=None, max_size=DEFAULT_MAX_SIZE):
+        if cache_dir is None:
+            cache_dir = os.environ.get(CACHE_DIR_VARIABLE, DEFAULT_CACHE_DIR)
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+    
+    def path(self, key):
+        """Path of the cached mesh file corresponding to a key"""
+        
+        return os.path.join(self.cache_dir, key + CACHE_EXTENSION)
+    
+    def lookup(self, key):
+        """
+        Look for a mesh in the cache
+
+        Parameters
+        ----------
+        key : string
+            Key of the mesh (see ``geometry_key()``)
+
+        Returns
+        -------
+        mesh_file : string
+            Path of the cached mesh file, ``None`` if the mesh is not cached
+
+        """
+        
+        mesh_file = self.path(key)
+        try:
+            # the modification time is used as the time of the last access
+            os.utime(mesh_file)
+        except FileNotFoundError:
+            return None
+        
+        return mesh_file
+    
+    def store(self, key, write_mesh):
+        """
+        Add a mesh to the cache
+
+        Parameters
+        ----------
+        key : string
+            Key of the mesh (see ``geometry_key()``)
+        write_mesh : callable
+            Function writing the mesh file, called as ``write_mesh(mesh_file)``
+
+        Returns
+        -------
+        mesh_file : string
+            Path of the cached mesh file
+
+        """
+        
+        os.makedirs(self.cache_dir, exist_ok=True)
+        mesh_file = self.path(key)
+        # write to a temporary file and then rename it (atomic operation), so 
+        # that other processes never read a partially written mesh
+        tmp_file = mesh_file + '.' + str(os.getpid()) + '.tmp'
+        try:
+            write_mesh(tmp_file)
+            os.replace(tmp_file, mesh_file)
+        finally:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+        
+        self.evict()
+        
+        return mesh_file
+    
+    def evict(self):
+        """Remove the least recently used meshes until the size limit is met"""
+        
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(CACHE_EXTENSION):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        
+        total_size = sum(size for _, size, _ in entries)
+        # oldest first
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # already removed by another process
+                pass
+            total_size = total_size - size
+    
+    def clear(self):
+        """Remove all the cached meshes"""
+        
+        if not os.path.isdir(self.cache_dir):
+            return
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(CACHE_EXTENSION):
+                    os.remove(entry.path)
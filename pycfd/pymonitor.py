@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+
+"""
+Monitoring of the mesh operations: messages and phase-level instrumentation
+
+The messages of the library are sent to the ``'pycfd'`` logger. As in any
+library, importing it doesn't configure logging: the records propagate to
+the handlers of the application (the logger only has a ``NullHandler``).
+Scripts and the command-line interface call ``setup_logging()`` to print
+the messages on the standard output, and ``set_quiet()`` to silence them.
+
+The functions decorated with ``monitored`` are phases: when at least one
+callback is registered (see ``add_callback()`` and ``record()``), every call
+creates a ``PhaseRecord`` with its wall time, the bytes read and written and
+the size of the arrays allocated, and passes it to the callbacks when the
+phase ends. With no callbacks registered, the only overhead is a check of
+the registry.
+"""
+
+import functools
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+# LOGGING
+class _StdoutHandler(logging.StreamHandler):
+    """Handler writing on the current ``sys.stdout``, exactly like print()"""
+
+    def __init__(self):
+        super().__init__(sys.stdout)
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        # sys.stdout is looked up every time: nothing to store
+        pass
+
+
+logger = logging.getLogger('pycfd')
+# the application decides where the records go (see setup_logging())
+logger.addHandler(logging.NullHandler())
+# plain messages on the standard output, as the original print() calls
+_handler = _StdoutHandler()
+_handler.setFormatter(logging.Formatter('%(message)s'))
+
+
+
+def setup_logging(quiet=False):
+    """
+    Print the messages of the library on the standard output
+
+    To be called by scripts and command-line entry points, not by the
+    library: the messages are not propagated to the root logger anymore.
+
+    Parameters
+    ----------
+    quiet : bool
+        If ``True``, only warnings and errors are printed
+
+    Returns
+    -------
+    None.
+
+    """
+
+    if _handler not in logger.handlers:
+        logger.addHandler(_handler)
+    # don't print the messages twice if the application configures the root logger
+    logger.propagate = False
+    set_quiet(quiet)
+
+
+
+def set_quiet(quiet=True):
+    """
+    Silence (or restore) the informative messages of the library
+
+    Parameters
+    ----------
+    quiet : bool
+        If ``True``, only warnings and errors are printed
+
+    Returns
+    -------
+    None.
+
+    """
+
+    logger.setLevel(logging.WARNING if quiet else logging.INFO)
+
+
+
+# INSTRUMENTATION
+# functions called with every PhaseRecord when a phase ends
+_callbacks = []
+# stack of the active phases (one for every thread)
+_active = threading.local()
+
+
+
+class PhaseRecord:
+    """
+    Measurements of a phase of a mesh operation
+
+    Attributes
+    ----------
+    name : string
+        Name of the phase, preceded by the names of the phases containing it
+        (e.g. ``'mesher/print_mesh'``)
+    wall_time : float
+        Wall time (in seconds)
+    bytes_read : int
+        Bytes read from file
+    bytes_written : int
+        Bytes written to file
+    bytes_allocated : int
+        Size of the arrays allocated
+
+    """
+
+    __slots__ = ('name', 'wall_time', 'bytes_read', 'bytes_written',
+                 'bytes_allocated')
+
+    def __init__(self, name):
+        self.name = name
+        self.wall_time = 0.0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.bytes_allocated = 0
+
+    def read(self, n_bytes):
+        """Account for bytes read from file"""
+
+        self.bytes_read += n_bytes
+
+    def written(self, n_bytes):
+        """Account for bytes written to file"""
+
+        self.bytes_written += n_bytes
+
+    def allocated(self, *arrays):
+        """Account for the size of arrays allocated"""
+
+        self.bytes_allocated += sum(array.nbytes for array in arrays)
+
+    def __repr__(self):
+        return ('PhaseRecord(' + repr(self.name) + ', wall_time=' +
+                repr(self.wall_time) + ', bytes_read=' + repr(self.bytes_read) +
+                ', bytes_written=' + repr(self.bytes_written) +
+                ', bytes_allocated=' + repr(self.bytes_allocated) + ')')
+
+
+
+class _NullRecord:
+    """Record used when the instrumentation is disabled (does nothing)"""
+
+    __slots__ = ()
+
+    def read(self, n_bytes):
+        pass
+
+    def written(self, n_bytes):
+        pass
+
+    def allocated(self, *arrays):
+        pass
+
+
+_NULL_RECORD = _NullRecord()
+
+
+
+def add_callback(callback):
+    """
+    Register a function called with the ``PhaseRecord`` of every phase
+
+    Parameters
+    ----------
+    callback : callable
+        Function called as ``callback(record)`` at the end of every phase
+
+    Returns
+    -------
+    None.
+
+    """
+
+    _callbacks.append(callback)
+
+
+
+def remove_callback(callback):
+    """Remove a function registered with ``add_callback()``"""
+
+    _callbacks.remove(callback)
+
+
+
+@contextmanager
+def record():
+    """
+    Collect the records of all the phases executed inside a ``with`` block
+
+    Yields
+    ------
+    records : list
+        ``PhaseRecord`` of every phase, in the order they end (inner phases
+        come before the phases containing them)
+
+    Examples
+    --------
+    >>> with pymonitor.record() as records:
+    ...     pymesh.mesher('geometry.input', 'geometry.mesh')
+    >>> [(r.name, r.wall_time) for r in records]
+
+    """
+
+    records = []
+    add_callback(records.append)
+    try:
+        yield records
+    finally:
+        remove_callback(records.append)
+
+
+
+def current():
+    """
+    Record of the innermost active phase, where the functions being
+    monitored account for the bytes read, written and allocated
+    (when the instrumentation is disabled, a record that ignores them)
+    """
+
+    stack = getattr(_active, 'stack', None)
+    if not stack:
+        return _NULL_RECORD
+
+    return stack[-1]
+
+
+
+def monitored(fun):
+    """
+    Decorator turning a function into a monitored phase, named after the
+    function
+    """
+
+    @functools.wraps(fun)
+    def wrapper(*args, **kwargs):
+        # fast path: instrumentation disabled
+        if not _callbacks:
+            return fun(*args, **kwargs)
+
+        stack = getattr(_active, 'stack', None)
+        if stack is None:
+            stack = _active.stack = []
+        name = fun.__name__
+        if stack:
+            name = stack[-1].name + '/' + name
+        phase_record = PhaseRecord(name)
+        stack.append(phase_record)
+        t_start = time.perf_counter()
+        try:
+            return fun(*args, **kwargs)
+        finally:
+            phase_record.wall_time = time.perf_counter() - t_start
+            stack.pop()
+            for callback in list(_callbacks):
+                callback(phase_record)
+
+    return wrapper
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+
+"""
+Geometric multigrid for the diffusion equation on a 1D mesh
+
+The hierarchy of meshes is built by agglomerating pairs of neighbour cells,
+so the face nodes of every coarse mesh are a subset of those of the finer
+one. They are a (zero-copy) strided view of the face nodes of the finest
+mesh only as long as the number of cells stays even: a level with an odd
+number of cells keeps its last cell, so the face nodes of the next level are
+copied (and the levels after it are views of that copy). On every level the
+diffusion operator is discretised again (see ``pysolver.assemble_diffusion()``)
+with the conductivity of the cells in series.
+
+A cycle smooths the error with red-black Gauss-Seidel (vectorized: the cells
+of each colour only depend on the cells of the other colour), corrects it
+with the error computed on the coarser mesh (interpolated linearly between
+the centroids) and smooths again in the opposite colour order. The residual
+is restricted with the transpose of the interpolation, which conserves its
+sum (the equations are integrated over the cells), so that the cycle is
+symmetric and can be used as a preconditioner of the conjugate gradient
+(see ``pysolver.conjugate_gradient()``). The convergence rate doesn't
+depend on the number of cells nor on the grading of the mesh.
+"""
+
+import numpy as np
+
+from . import pymesh
+from . import pymonitor
+from . import pysolver
+from .pymonitor import logger
+
+
+# number of recursive calls on the coarser level of every cycle
+CYCLES = {'V': 1,
+          'W': 2
+          }
+
+
+
+def coarsen_mesh(mesh):
+    """
+    Agglomerate pairs of neighbour cells of a mesh
+
+    With an odd number of cells, the last cell is not agglomerated, and the
+    face nodes of the coarse mesh are a new array (its last face node is not
+    on the stride of the others).
+
+    Parameters
+    ----------
+    mesh : Mesh
+        Fine mesh
+
+    Returns
+    -------
+    coarse_mesh : Mesh
+        Coarse mesh. If the fine mesh has an even number of cells, its face
+        nodes are a view of the face nodes of the fine mesh, otherwise a copy
+
+    """
+
+    xf = mesh.face_nodes
+    if mesh.N_fv % 2 == 0:
+        xf_coarse = xf[::2]
+    else:
+        xf_coarse = np.concatenate([xf[::2], xf[-1:]])
+    xC_coarse = 0.5 * (xf_coarse[1:] + xf_coarse[:-1])
+
+    return pymesh.Mesh(xC_coarse, xf_coarse, mesh.area)
+
+
+
+def build_hierarchy(mesh, coarsest_size=8):
+    """
+    Hierarchy of meshes, from the given one to the coarsest
+
+    Parameters
+    ----------
+    mesh : Mesh or dictionary
+        Finest mesh
+    coarsest_size : int
+        The coarsening stops when a mesh has at most this number of cells
+
+    Returns
+    -------
+    meshes : list
+        Meshes from the finest to the coarsest
+
+    """
+
+    mesh = pymesh.as_mesh(mesh)
+    meshes = [mesh]
+    while meshes[-1].N_fv > max(coarsest_size, 1):
+        meshes.append(coarsen_mesh(meshes[-1]))
+
+    return meshes
+
+
+
+class MultigridSolver:
+    """
+    Geometric multigrid solver of the steady diffusion equation
+
+    Parameters
+    ----------
+    mesh : Mesh or dictionary
+        Mesh (e.g. from ``pymesh.mesher()`` or ``pymesh.read_mesh()``)
+    conductivity : float or array
+        Diffusion coefficient, uniform or of every cell
+    bc_left : tuple
+        Boundary condition on the first face (see ``pysolver``)
+    bc_right : tuple
+        Boundary condition on the last face
+    cycle : string
+        ``'V'`` or ``'W'``
+    n_pre : int
+        Number of smoothing sweeps before the coarse-grid correction
+    n_post : int
+        Number of smoothing sweeps after the coarse-grid correction
+    coarsest_size : int
+        Maximum number of cells of the coarsest mesh, where the system is
+        solved directly
+
+    Raises
+    ------
+    ``ValueError``
+        If the cycle or a boundary condition is unknown
+
+    """
+
+    def __init__(self, mesh, conductivity=1.0, bc_left=('dirichlet', 0.0),
+                 bc_right=('dirichlet', 0.0), cycle='V', n_pre=2, n_post=2,
+                 coarsest_size=8):
+        cycle = cycle.upper()
+        if cycle not in CYCLES:
+            raise ValueError("ERROR: Unknown cycle '" + cycle +
+                             "' (available: " + ', '.join(CYCLES) + ")")
+        self.bc_left = pysolver._check_boundary_condition(bc_left)
+        self.bc_right = pysolver._check_boundary_condition(bc_right)
+        self.cycle = cycle
+        self.n_pre = n_pre
+        self.n_post = n_post
+
+        # HIERARCHY
+        self.meshes = build_hierarchy(mesh, coarsest_size)
+        self.mesh = self.meshes[0]
+        gamma = np.broadcast_to(np.asarray(conductivity, dtype=float),
+                                (self.mesh.N_fv,))
+        self.conductivity = gamma
+        # operators: the boundary values only matter on the finest mesh, since
+        # the coarse meshes solve for the error
+        homogeneous = [(self.bc_left[0], 0.0), (self.bc_right[0], 0.0)]
+        self.operators = []
+        self._boundary_diag = []
+        for level, level_mesh in enumerate(self.meshes):
+            if level > 0:
+                gamma = _series_conductivity(self.meshes[level - 1], gamma)
+            bcs = (self.bc_left, self.bc_right) if level == 0 else homogeneous
+            A, _ = pysolver.assemble_diffusion(level_mesh, gamma, 0.0, *bcs)
+            self.operators.append(A)
+            # conductance of the Dirichlet boundary faces (the only part of
+            # the diagonal not balanced by the internal faces)
+            boundary_diag = np.zeros(level_mesh.N_fv)
+            if self.bc_left[0] == 'dirichlet':
+                boundary_diag[0] = A[1, 0] + A[2, 0]
+            if self.bc_right[0] == 'dirichlet':
+                boundary_diag[-1] = A[1, -1] + A[0, -1]
+            self._boundary_diag.append(boundary_diag)
+        self._smoothers = [_smoother_coefficients(A) for A in self.operators]
+        self._coarsest_factors = pysolver.factor_tridiagonal(self.operators[-1])
+        # linear interpolation from every mesh to the finer one
+        self._interpolations = [self._interpolation(self.meshes[level + 1],
+                                                    self.meshes[level])
+                                for level in range(len(self.meshes) - 1)]
+
+    def __repr__(self):
+        return ('MultigridSolver(N_fv=' + str(self.mesh.N_fv) + ', levels=' +
+                str(len(self.meshes)) + ', cycle=' + repr(self.cycle) + ')')
+
+    @pymonitor.monitored
+    def solve(self, source=0.0, phi0=None, tol=1e-10, max_cycles=100):
+        r"""
+        Solve the diffusion equation with multigrid cycles
+
+        The cycles stop when the largest change of the solution in a cycle is
+        at most ``tol`` times the largest value of the solution. This is not
+        a bound on the error: the remaining error (w.r.t. the exact solution
+        of the discrete system) is estimated from the contraction of the last
+        two cycles, :math:`\rho = \Delta_n / \Delta_{n-1}`, as
+        :math:`\Delta_n \rho / (1 - \rho)` and returned in ``info['error']``
+        (about ``tol / 10``, since every cycle reduces the error by about a
+        factor 10). The residual is only reported: on strongly graded meshes
+        the round-off limits it even for the exact solution (to about 1e-8
+        relative with a grading of 1e8), so it can't be the stopping test.
+        For the same reason, a direct solve (``pysolver.solve_diffusion()``)
+        may differ from the converged solution by more than ``tol``.
+
+        Parameters
+        ----------
+        source : float or array
+            Source term per unit volume, uniform or of every cell
+        phi0 : array
+            Initial guess (``None`` for zero)
+        tol : float
+            Tolerance on the change of the solution in a cycle, relative to the
+            solution
+        max_cycles : int
+            Maximum number of cycles
+
+        Returns
+        -------
+        phi : array
+            Solution at the centroids
+        info : dictionary
+            ``'n_cycles'``, ``'change'`` (relative change of the solution in
+            the last cycle), ``'changes'`` (in every cycle), ``'error'``
+            (estimate of the relative error, see above), ``'residual'``
+            (:math:`\|b - A \phi\| / \|b\|`) and ``'converged'``
+
+        """
+
+        b = self.rhs(source)
+        phi = np.zeros(len(b)) if phi0 is None else np.array(phi0, dtype=float)
+        phi_old = np.empty(len(b))
+
+        changes = []
+        while len(changes) < max_cycles:
+            phi_old[:] = phi
+            self._cycle(0, phi, b)
+            phi_old -= phi
+            phi_max = np.abs(phi).max()
+            change = np.abs(phi_old).max()
+            changes.append(change / phi_max if phi_max > 0 else change)
+            if changes[-1] <= tol:
+                break
+        n_cycles = len(changes)
+        # ERROR ESTIMATE from the contraction of the last two cycles
+        error = changes[-1] if changes else 0.0
+        if n_cycles > 1 and 0 < changes[-1] < changes[-2]:
+            contraction = changes[-1] / changes[-2]
+            error *= contraction / (1 - contraction)
+        b_norm = np.linalg.norm(b)
+        residual = np.linalg.norm(self._residual(0, phi, b))
+
+        info = {'n_cycles': n_cycles,
+                'change': changes[-1] if changes else 0.0,
+                'changes': changes,
+                'error': error,
+                'residual': residual / b_norm if b_norm > 0 else residual,
+                'converged': bool(changes) and changes[-1] <= tol
+                }
+        if not info['converged']:
+            logger.warning('WARNING: multigrid not converged after ' + str(n_cycles) +
+                           ' cycles (change ' + '{:.3e}'.format(info['change']) + ')')
+
+        return phi, info
+
+    def rhs(self, source=0.0):
+        """Right-hand side of the system on the finest mesh"""
+
+        _, b = pysolver.assemble_diffusion(self.mesh, self.conductivity, source,
+                                           self.bc_left, self.bc_right)
+
+        return b
+
+    def precondition(self, r):
+        """
+        One cycle with zero initial guess: approximate solution of
+        :math:`A z = r`, to be used as preconditioner
+        """
+
+        z = np.zeros(len(r))
+        self._cycle(0, z, r)
+
+        return z
+
+    def _cycle(self, level, x, b):
+        """Cycle on a level, improving ``x`` (in place)"""
+
+        A = self.operators[level]
+        if level == len(self.operators) - 1:
+            pysolver.solve_factored(A[0], self._coarsest_factors, b, out=x)
+            return x
+
+        for _ in range(self.n_pre):
+            _red_black_sweep(self._smoothers[level], b, x, (0, 1))
+
+        # COARSE-GRID CORRECTION
+        r = self._residual(level, x, b)
+        r_coarse = self._restrict(level, r)
+        e_coarse = np.zeros(len(r_coarse))
+        for _ in range(CYCLES[self.cycle]):
+            self._cycle(level + 1, e_coarse, r_coarse)
+        x += self._prolong(level, e_coarse)
+
+        for _ in range(self.n_post):
+            _red_black_sweep(self._smoothers[level], b, x, (1, 0))
+
+        return x
+
+    def _residual(self, level, x, b):
+        r"""
+        Residual :math:`b - A x` on a level, computed from the fluxes
+        :math:`D_\mathrm{f} (x_R - x_L)` through the faces: on strongly
+        graded meshes the terms :math:`a_P x_P` are huge and cancel out,
+        leaving only round-off, while the differences between neighbour
+        cells are exact
+        """
+
+        A = self.operators[level]
+        flux = np.subtract(x[1:], x[:-1])
+        flux *= A[2, :-1]
+        r = b - self._boundary_diag[level] * x
+        r[1:] += flux
+        r[:-1] -= flux
+
+        return r
+
+    def _interpolation(self, coarse_mesh, fine_mesh):
+        """
+        Indices and weights of the linear interpolation from the coarse
+        centroids (and boundary faces) to the fine centroids
+        """
+
+        # nodes: first face, coarse centroids, last face
+        x_nodes = np.concatenate([coarse_mesh.face_nodes[:1], coarse_mesh.centroids,
+                                  coarse_mesh.face_nodes[-1:]])
+        xC = fine_mesh.centroids
+        i_right = np.searchsorted(x_nodes, xC, side='right')
+        i_right = np.clip(i_right, 1, len(x_nodes) - 1)
+        weights = (xC - x_nodes[i_right - 1]) / (x_nodes[i_right] - x_nodes[i_right - 1])
+
+        return i_right, weights
+
+    def _restrict(self, level, r):
+        """
+        Residual of a level on the coarser level (transpose of the
+        interpolation in ``_prolong()``)
+        """
+
+        i_right, weights = self._interpolations[level]
+        n_nodes = len(self.meshes[level + 1].centroids) + 2
+        r_nodes = np.bincount(i_right - 1, r - weights * r, minlength=n_nodes)
+        r_nodes += np.bincount(i_right, weights * r, minlength=n_nodes)
+        r_coarse = r_nodes[1:-1]
+        # the error on a Neumann boundary face is the error of the first cell
+        if self.bc_left[0] != 'dirichlet':
+            r_coarse[0] += r_nodes[0]
+        if self.bc_right[0] != 'dirichlet':
+            r_coarse[-1] += r_nodes[-1]
+
+        return r_coarse
+
+    def _prolong(self, level, e_coarse):
+        """Interpolate the error of the coarser level on a level"""
+
+        # error on the boundary faces: 0 for Dirichlet, zero gradient for
+        # Neumann
+        e_nodes = np.empty(len(e_coarse) + 2)
+        e_nodes[1:-1] = e_coarse
+        e_nodes[0] = 0.0 if self.bc_left[0] == 'dirichlet' else e_coarse[0]
+        e_nodes[-1] = 0.0 if self.bc_right[0] == 'dirichlet' else e_coarse[-1]
+        i_right, weights = self._interpolations[level]
+        e_left = e_nodes[i_right - 1]
+
+        return e_left + weights * (e_nodes[i_right] - e_left)
+
+
+
+@pymonitor.monitored
+def solve_diffusion_multigrid(mesh, conductivity=1.0, source=0.0,
+                              bc_left=('dirichlet', 0.0), bc_right=('dirichlet', 0.0),
+                              cycle='V', tol=1e-10, max_cycles=100):
+    """
+    Solve the steady diffusion equation with geometric multigrid
+
+    Parameters
+    ----------
+    See ``pysolver.solve_diffusion()`` and ``MultigridSolver``.
+
+    Returns
+    -------
+    phi : array
+        Solution at the centroids
+    info : dictionary
+        Convergence information (see ``MultigridSolver.solve()``)
+
+    """
+
+    solver = MultigridSolver(mesh, conductivity, bc_left, bc_right, cycle)
+
+    return solver.solve(source, tol=tol, max_cycles=max_cycles)
+
+
+
+def _series_conductivity(fine_mesh, gamma):
+    """Conductivity of the coarse cells (fine cells in series)"""
+
+    h = fine_mesh.cell_widths
+    resistance = h / gamma
+    if fine_mesh.N_fv % 2 == 0:
+        return (h[::2] + h[1::2]) / (resistance[::2] + resistance[1::2])
+
+    gamma_coarse = np.empty(fine_mesh.N_fv // 2 + 1)
+    gamma_coarse[:-1] = ((h[:-1:2] + h[1::2]) /
+                         (resistance[:-1:2] + resistance[1::2]))
+    gamma_coarse[-1] = gamma[-1]
+
+    return gamma_coarse
+
+
+
+def _smoother_coefficients(A):
+    """
+    Coefficients of the red-black Gauss-Seidel sweep, for the cells of each
+    colour: weights of the neighbours on the left and on the right, and
+    inverse of the diagonal (stored contiguously, so that the sweeps read
+    them without strides)
+    """
+
+    lower, diag, upper = A
+    coefficients = []
+    for start in (0, 1):
+        inv_diag = 1.0 / diag[start::2]
+        coefficients.append((-lower[start::2] * inv_diag,
+                             -upper[start::2] * inv_diag,
+                             inv_diag))
+
+    return coefficients
+
+
+
+def _red_black_sweep(coefficients, b, x, colours):
+    """
+    Gauss-Seidel sweep on the cells of one colour (even or odd cells), then
+    on the cells of the other colour
+    """
+
+    for start in colours:
+        weight_left, weight_right, inv_diag = coefficients[start]
+        n = len(inv_diag)
+        # cells of this colour and neighbours (of the other colour) on their
+        # left and on their right. The boundary cells miss a neighbour, but
+        # their weights are 0 anyway
+        x_cells = x[start::2]
+        x_other = x[1 - start::2]
+        x_new = b[start::2] * inv_diag
+        if start == 0:
+            x_new[1:] += weight_left[1:] * x_other[:n - 1]
+            n_right = len(x_other)
+            x_new[:n_right] += weight_right[:n_right] * x_other
+        else:
+            x_new += weight_left * x_other[:n]
+            x_new[:n - 1] += weight_right[:n - 1] * x_other[1:n]
+            if len(x_other) > n:
+                x_new[n - 1] += weight_right[n - 1] * x_other[n]
+        x_cells[...] = x_new
+
+    return x
@@ -0,0 +1,484 @@
+#!/usr/bin/env python3
+
+"""
+Domain decomposition of 1D meshes and shared-memory parallel execution
+
+A mesh is split into contiguous subdomains, balanced by number of cells or
+by a weight of every cell (e.g. the cost of the source term). Every
+subdomain stores its cells with some ghost (halo) cells on both sides, and
+the arrays of all the subdomains live in the same block of
+``multiprocessing.shared_memory``: the worker processes attach to it by
+name, so the arrays are never pickled, and every worker fills its own ghost
+cells by copying them from the arrays of its neighbours.
+
+A time step of a worker is: wait for the neighbours (barrier), copy the
+ghost cells, wait again, update its own cells. Between the two barriers
+nobody writes, so the copies are always consistent. The workers (one per
+subdomain) are started by the first parallel run and kept by the
+decomposition until it is closed, so repeated short runs (e.g. one per outer
+iteration) don't pay the start-up of the processes every time.
+"""
+
+import multiprocessing as mp
+import os
+import pickle
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from . import pymesh
+from . import pymonitor
+from .pymonitor import logger
+
+
+# status of a run in a worker: completed, failed, or stopped because another
+# worker failed
+_DONE = 0
+_FAILED = 1
+_STOPPED = 2
+
+
+
+def partition_mesh(N_fv, n_parts, weights=None, min_size=1):
+    """
+    Split the cells of a mesh into contiguous balanced subdomains
+
+    Parameters
+    ----------
+    N_fv : int
+        Number of cells
+    n_parts : int
+        Number of subdomains
+    weights : array
+        Cost of every cell (``None`` for the same cost): the subdomains have
+        about the same total weight
+    min_size : int
+        Minimum number of cells of a subdomain
+
+    Raises
+    ------
+    ``ValueError``
+        If the cells are not enough for the subdomains or the weights are
+        negative
+
+    Returns
+    -------
+    offsets : array
+        Index of the first cell of every subdomain, followed by ``N_fv``
+        (``n_parts + 1`` values)
+
+    """
+
+    if (n_parts < 1) or (N_fv < n_parts * max(min_size, 1)):
+        raise ValueError("ERROR: " + str(N_fv) + " cells can't be split into " +
+                         str(n_parts) + " subdomains of at least " +
+                         str(max(min_size, 1)) + " cells")
+    if weights is None:
+        offsets = (np.arange(n_parts + 1) * N_fv) // n_parts
+    else:
+        weights = np.asarray(weights, dtype=float)
+        if (len(weights) != N_fv) or (weights < 0).any():
+            raise ValueError("ERROR: The weights must be one non-negative value "
+                             "per cell")
+        cumulative = np.cumsum(weights)
+        targets = np.arange(1, n_parts) * (cumulative[-1] / n_parts)
+        offsets = np.concatenate([[0], np.searchsorted(cumulative, targets) + 1,
+                                  [N_fv]])
+
+    # enforce the minimum size: without the minimum size of the previous
+    # subdomains, the offsets must only be non-decreasing
+    min_size = max(min_size, 1)
+    index = np.arange(n_parts + 1)
+    shifted = np.maximum.accumulate(offsets - index*min_size)
+    np.clip(shifted, 0, N_fv - n_parts*min_size, out=shifted)
+
+    return (shifted + index*min_size).astype(np.intp)
+
+
+
+class Subdomain:
+    """
+    Contiguous part of a mesh
+
+    Attributes
+    ----------
+    index : int
+        Index of the subdomain (from 0 on the left)
+    start : int
+        Global index of the first cell of the subdomain
+    stop : int
+        Global index of the cell after the last one of the subdomain
+    n_ghost : int
+        Number of ghost cells on every side
+    is_first : bool
+        ``True`` if the subdomain touches the left boundary of the mesh
+    is_last : bool
+        ``True`` if the subdomain touches the right boundary of the mesh
+
+    """
+
+    __slots__ = ('index', 'start', 'stop', 'n_ghost', 'is_first', 'is_last')
+
+    def __init__(self, index, start, stop, n_ghost, is_first, is_last):
+        self.index = index
+        self.start = start
+        self.stop = stop
+        self.n_ghost = n_ghost
+        self.is_first = is_first
+        self.is_last = is_last
+
+    def __repr__(self):
+        return ('Subdomain(index=' + str(self.index) + ', start=' + str(self.start) +
+                ', stop=' + str(self.stop) + ', n_ghost=' + str(self.n_ghost) + ')')
+
+    @property
+    def N_fv(self):
+        """Number of cells of the subdomain (without ghost cells)"""
+
+        return self.stop - self.start
+
+    @property
+    def interior(self):
+        """Slice of the cells of the subdomain in its local array"""
+
+        return slice(self.n_ghost, self.n_ghost + self.N_fv)
+
+
+
+class DomainDecomposition:
+    """
+    Decomposition of a mesh into contiguous subdomains with ghost cells
+
+    Parameters
+    ----------
+    mesh : Mesh or dictionary
+        Mesh to decompose
+    n_parts : int
+        Number of subdomains (``None`` for the number of cores)
+    n_ghost : int
+        Number of ghost cells on every side of the subdomains (at least the
+        half-width of the stencil)
+    weights : array
+        Cost of every cell, used to balance the subdomains (see
+        ``partition_mesh()``)
+
+    Raises
+    ------
+    ``ValueError``
+        If a subdomain would be smaller than the number of ghost cells
+
+    Notes
+    -----
+    The worker processes started by ``run()`` are reused by the following
+    runs: stop them with ``close()``, or use the decomposition in a ``with``
+    statement.
+
+    """
+
+    def __init__(self, mesh, n_parts=None, n_ghost=1, weights=None):
+        mesh = pymesh.as_mesh(mesh)
+        if n_parts is None:
+            n_parts = os.cpu_count() or 1
+        self.mesh = mesh
+        self.n_ghost = n_ghost
+        # the ghost cells of a subdomain are copied from its neighbours only
+        self.offsets = partition_mesh(mesh.N_fv, n_parts, weights, min_size=n_ghost)
+        self.subdomains = [Subdomain(k, int(self.offsets[k]), int(self.offsets[k+1]),
+                                     n_ghost, k == 0, k == n_parts - 1)
+                           for k in range(n_parts)]
+        # position of the local array of every subdomain in the shared block
+        sizes = np.diff(self.offsets) + 2*n_ghost
+        self.local_offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.intp)
+        # persistent workers (started by the first parallel run)
+        self._workers = None
+        self._connections = None
+        self._barrier = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Stop the worker processes (started again by the next parallel run)"""
+
+        if self._workers is None:
+            return
+        for connection in self._connections:
+            try:
+                connection.send_bytes(b'')
+            except OSError:
+                # the worker has already ended
+                pass
+        for worker, connection in zip(self._workers, self._connections):
+            worker.join()
+            connection.close()
+        self._workers = None
+        self._connections = None
+        self._barrier = None
+
+    @property
+    def n_parts(self):
+        """Number of subdomains"""
+
+        return len(self.subdomains)
+
+    def local_mesh(self, k):
+        """Mesh of the cells of subdomain ``k`` (views of the global arrays)"""
+
+        subdomain = self.subdomains[k]
+
+        return pymesh.Mesh(self.mesh.centroids[subdomain.start:subdomain.stop],
+                           self.mesh.face_nodes[subdomain.start:subdomain.stop + 1],
+                           self.mesh.area)
+
+    def create_field(self, values=0.0, dtype=float):
+        """
+        Create a cell field in shared memory
+
+        Parameters
+        ----------
+        values : float or array
+            Initial values, uniform or of every cell of the mesh
+        dtype : data-type
+            Type of the values
+
+        Returns
+        -------
+        field : SharedField
+            Field split into the subdomains (release it with ``close()``, or
+            use it in a ``with`` statement)
+
+        """
+
+        field = SharedField(self.local_offsets, dtype)
+        field.scatter(self, values)
+
+        return field
+
+    @pymonitor.monitored
+    def run(self, kernel, field, n_steps, args=(), parallel=True):
+        """
+        Advance a field with a kernel in parallel, one process per subdomain
+
+        Before every step the ghost cells of all the subdomains are updated,
+        then ``kernel(u, subdomain, *args)`` is called on the local array
+        ``u`` of every subdomain and must update in place the cells of the
+        subdomain (``u[subdomain.interior]``), reading the ghost cells. The
+        ghost cells on the boundaries of the mesh are not updated: the kernel
+        can use them for the boundary conditions.
+
+        The worker processes are started by the first call and reused by the
+        following ones (until ``close()``): every call only sends them the
+        kernel, its arguments and the name of the shared memory block of the
+        field. If a worker fails, all of them are stopped.
+
+        Parameters
+        ----------
+        kernel : function
+            Function updating the local array of a subdomain. It is pickled
+            (with its arguments) to be sent to the workers, so it must be
+            defined at module level
+        field : SharedField
+            Field created by ``create_field()``
+        n_steps : int
+            Number of steps
+        args : tuple
+            Further arguments of the kernel
+        parallel : bool
+            If ``False``, run all the subdomains in the current process
+
+        Raises
+        ------
+        ``RuntimeError``
+            If a worker process fails
+
+        """
+
+        if not parallel or (self.n_parts == 1):
+            for _ in range(n_steps):
+                for subdomain in self.subdomains:
+                    field.exchange_halos(subdomain)
+                for subdomain in self.subdomains:
+                    kernel(field.local(subdomain), subdomain, *args)
+            return
+
+        # pickled once, before any worker starts waiting at the barrier
+        task = pickle.dumps((field.name, field.local_offsets, field.dtype.str,
+                             kernel, n_steps, args))
+        if self._workers is None:
+            self._start_workers()
+        for connection in self._connections:
+            connection.send_bytes(task)
+        statuses = []
+        for connection in self._connections:
+            try:
+                statuses.append(connection.recv())
+            except EOFError:
+                # the worker process has ended
+                statuses.append(_FAILED)
+        failed = [k for k, status in enumerate(statuses) if status == _FAILED]
+        if failed:
+            # the barrier is broken: new workers for the next run
+            self.close()
+            raise RuntimeError("ERROR: Worker process of subdomains " +
+                               ', '.join(str(k) for k in failed) + " failed")
+        logger.debug('Run ' + str(n_steps) + ' steps on ' + str(self.n_parts) +
+                     ' subdomains')
+
+    def _start_workers(self):
+        """Start one worker process per subdomain"""
+
+        self._barrier = mp.Barrier(self.n_parts)
+        self._workers = []
+        self._connections = []
+        for subdomain in self.subdomains:
+            connection, worker_connection = mp.Pipe()
+            worker = mp.Process(target=_worker,
+                                args=(subdomain, worker_connection, self._barrier),
+                                daemon=True)
+            worker.start()
+            # only the worker keeps its end, so that recv() fails if it ends
+            worker_connection.close()
+            self._workers.append(worker)
+            self._connections.append(connection)
+        logger.debug('Started ' + str(self.n_parts) + ' worker processes')
+
+
+
+class SharedField:
+    """
+    Cell field split into subdomains, stored in a shared memory block
+
+    The local arrays of the subdomains (with their ghost cells) are
+    consecutive in the block. The process that creates the field owns the
+    block and frees it with ``close()``; the other processes attach to it
+    with ``SharedField(local_offsets, dtype, name)``.
+
+    Parameters
+    ----------
+    local_offsets : array
+        Position of the local array of every subdomain in the block, followed
+        by the total size (see ``DomainDecomposition.local_offsets``)
+    dtype : data-type
+        Type of the values
+    name : string
+        Name of an existing block (``None`` to create a new one)
+
+    """
+
+    def __init__(self, local_offsets, dtype=float, name=None):
+        self.local_offsets = np.asarray(local_offsets, dtype=np.intp)
+        self.dtype = np.dtype(dtype)
+        size = max(int(self.local_offsets[-1]) * self.dtype.itemsize, 1)
+        self.owner = name is None
+        if self.owner:
+            self._shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            # the workers started by multiprocessing share the resource
+            # tracker of the owner, which unlinks the block only if the owner
+            # doesn't
+            self._shm = shared_memory.SharedMemory(name=name)
+        self.name = self._shm.name
+        self.data = np.ndarray(int(self.local_offsets[-1]), dtype=self.dtype,
+                               buffer=self._shm.buf)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Detach from the shared memory (and free it, if owned)"""
+
+        if self._shm is None:
+            return
+        # the views must be released before the block is closed
+        self.data = None
+        self._shm.close()
+        if self.owner:
+            self._shm.unlink()
+        self._shm = None
+
+    def local(self, subdomain):
+        """Local array of a subdomain, with its ghost cells (a view)"""
+
+        k = subdomain.index
+
+        return self.data[self.local_offsets[k]:self.local_offsets[k+1]]
+
+    def exchange_halos(self, subdomain):
+        """Copy the ghost cells of a subdomain from its neighbours"""
+
+        n_ghost = subdomain.n_ghost
+        if n_ghost == 0:
+            return
+        k = subdomain.index
+        u = self.local(subdomain)
+        if not subdomain.is_first:
+            # last cells of the neighbour on the left, before its right ghosts
+            end = self.local_offsets[k] - n_ghost
+            u[:n_ghost] = self.data[end - n_ghost:end]
+        if not subdomain.is_last:
+            # first cells of the neighbour on the right, after its left ghosts
+            start = self.local_offsets[k+1] + n_ghost
+            u[-n_ghost:] = self.data[start:start + n_ghost]
+
+    def scatter(self, decomposition, values):
+        """Copy the values of all the cells of the mesh into the subdomains"""
+
+        values = np.broadcast_to(np.asarray(values, dtype=self.dtype),
+                                 (decomposition.mesh.N_fv,))
+        for subdomain in decomposition.subdomains:
+            u = self.local(subdomain)
+            u[subdomain.interior] = values[subdomain.start:subdomain.stop]
+        for subdomain in decomposition.subdomains:
+            self.exchange_halos(subdomain)
+
+    def gather(self, decomposition):
+        """Values of all the cells of the mesh (a new array)"""
+
+        values = np.empty(decomposition.mesh.N_fv, dtype=self.dtype)
+        for subdomain in decomposition.subdomains:
+            values[subdomain.start:subdomain.stop] = self.local(subdomain)[subdomain.interior]
+
+        return values
+
+
+
+def _worker(subdomain, connection, barrier):
+    """Advance one subdomain in a worker process (see ``DomainDecomposition.run()``)"""
+
+    while True:
+        try:
+            task = connection.recv_bytes()
+        except EOFError:
+            # the decomposition is gone
+            break
+        if not task:
+            break
+        name, local_offsets, dtype, kernel, n_steps, args = pickle.loads(task)
+        # attached only during the run, so that a closed block can be freed
+        field = SharedField(local_offsets, dtype, name)
+        try:
+            for _ in range(n_steps):
+                barrier.wait()
+                field.exchange_halos(subdomain)
+                barrier.wait()
+                kernel(field.local(subdomain), subdomain, *args)
+        except threading.BrokenBarrierError:
+            # another worker failed
+            status = _STOPPED
+        except BaseException:
+            # don't leave the other workers waiting forever (the block is
+            # released when the process ends)
+            barrier.abort()
+            connection.send(_FAILED)
+            raise
+        else:
+            status = _DONE
+        field.close()
+        connection.send(status)
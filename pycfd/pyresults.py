@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+
+"""
+Append-only binary store of the solution fields computed on a mesh
+
+A results file contains the cell values of some fields (e.g. temperature and
+velocity) at every saved time step. It starts with a header with the number
+of cells, the names of the fields, the type of the values and the checksum of
+the coordinates of the mesh (see ``pymesh.mesh_checksum()``), so that the
+results can't be read with another mesh. The header is followed by one
+record per time step, appended at the end of the file:
+
+    - record header (``RECORD_HEADER_SIZE`` bytes): magic string, step number
+      and time
+    - values of the fields, one contiguous array of ``N_fv`` values per field
+      (in the order of the names in the header)
+
+All the records have the same size, so the position of a record is known
+from its index and the file can be memory-mapped as an array of records: a
+time step is a slice of the file, and the time history of a cell is a
+strided view (one value per record). The index of the steps and of the times
+is rebuilt when the file is opened, from the headers of the records.
+
+A record is written with sequential writes, so an interrupted write (e.g.
+the solver is killed) only leaves an incomplete record at the end of the
+file: it's ignored when the file is read, and removed when the file is
+opened again to append more steps.
+"""
+
+import bisect
+import os
+import struct
+
+import numpy as np
+
+from . import pymesh
+from . import pymonitor
+from .pymonitor import logger
+
+
+# RESULTS FILE FORMAT
+# fixed-size header followed by the names of the fields (one per line) and by
+# the records. Header fields (little-endian):
+#   - magic string identifying the format
+#   - version of the format
+#   - byte order of the values ('<' little-endian, '>' big-endian)
+#   - type of the values as NumPy type code without byte order (e.g. 'f8')
+#   - number of cells
+#   - number of fields
+#   - checksum of the mesh (hexadecimal SHA-256, see pymesh.mesh_checksum())
+#   - size (in bytes) of the names of the fields
+RESULTS_MAGIC = b'PYCFDRES'
+RESULTS_VERSION = 1
+_RESULTS_HEADER = struct.Struct('<8sI1s3sQI64sI')
+# the records start at a multiple of this offset, and their size is a
+# multiple of RECORD_ALIGNMENT, so that the values are always aligned
+RESULTS_ALIGNMENT = 64
+RECORD_ALIGNMENT = 8
+# header of every record: magic string, step number and time (padded)
+RECORD_MAGIC = b'STEP'
+_RECORD_HEADER = struct.Struct('<4s4xqd')
+RECORD_HEADER_SIZE = 32
+
+
+
+class ResultsStore:
+    """
+    Results file opened for reading or for appending time steps
+
+    Create a new file with ``ResultsStore.create()``. The store can be used
+    in a ``with`` statement, which closes it at the end.
+
+    Parameters
+    ----------
+    results_file : string
+        Name of the results file
+    mode : string
+        ``'r'`` to read the file, ``'a'`` to read it and append new steps
+    mesh : dictionary
+        Mesh the results are checked against (``None`` not to check them)
+    durable : bool
+        If ``True``, every appended step is flushed to the disk
+        (``os.fsync()``), so that it survives a crash of the system and not
+        only of the process (much slower for small records)
+
+    Raises
+    ------
+    ``ValueError``
+        If the file is not a results file, its version is not supported or
+        the results were computed on another mesh
+    ``EOFError``
+        If the header of the file is truncated
+
+    Attributes
+    ----------
+    N_fv : int
+        Number of cells
+    field_names : tuple
+        Names of the fields
+    dtype : numpy.dtype
+        Type of the values
+    mesh_checksum : string
+        Checksum of the coordinates of the mesh (see ``pymesh.mesh_checksum()``)
+
+    """
+
+    def __init__(self, results_file, mode='r', mesh=None, durable=False):
+        if mode not in ('r', 'a'):
+            raise ValueError("ERROR: Unknown mode '" + str(mode) + "' (use 'r' or 'a')")
+        self.results_file = results_file
+        self.durable = durable
+        self._read_header()
+        if (mesh is not None) and (_checksum(mesh) != self.mesh_checksum):
+            raise ValueError("ERROR: The results in '" + str(results_file) +
+                             "' were computed on another mesh")
+
+        # step numbers and times of the records, and index of the steps (step
+        # number => index of the record)
+        self._steps = []
+        self._times = []
+        self._index = {}
+        self._records = None
+        self.refresh()
+
+        self._file = None
+        if mode == 'a':
+            # remove the incomplete record left by an interrupted write
+            size = self.data_offset + len(self) * self.record_size
+            if os.path.getsize(results_file) > size:
+                logger.warning('WARNING: Removing an incomplete record from ' +
+                               os.path.abspath(results_file))
+                os.truncate(results_file, size)
+            # unbuffered: a record is written with a single system call
+            self._file = open(results_file, 'r+b', buffering=0)
+            self._file.seek(size)
+
+    @classmethod
+    def create(cls, results_file, mesh, field_names, dtype=float, durable=False):
+        """
+        Create a new results file (overwriting an existing one) for a mesh
+
+        Parameters
+        ----------
+        results_file : string
+            Name of the results file
+        mesh : dictionary
+            Mesh the fields are computed on
+        field_names : list
+            Names of the fields saved at every step
+        dtype : data-type
+            Type of the values (``float32`` or ``float64``)
+        durable : bool
+            See ``ResultsStore``
+
+        Raises
+        ------
+        ``ValueError``
+            If the names of the fields are not unique or contain newlines, or
+            the type is not supported
+
+        Returns
+        -------
+        store : ResultsStore
+            Results file opened to append the steps
+
+        """
+
+        field_names = [str(name) for name in field_names]
+        if ((len(field_names) == 0) or (len(set(field_names)) != len(field_names)) or
+                any(('\n' in name) or (name == '') for name in field_names)):
+            raise ValueError("ERROR: The names of the fields must be unique, "
+                             "non-empty and without newlines")
+        dtype = np.dtype(dtype)
+        if dtype.name not in pymesh.PRECISIONS:
+            raise ValueError("ERROR: Unknown precision '" + str(dtype) +
+                             "' (use " + ' or '.join(pymesh.PRECISIONS) + ")")
+        names = '\n'.join(field_names).encode('utf-8')
+        header = _RESULTS_HEADER.pack(RESULTS_MAGIC, RESULTS_VERSION, b'<',
+                                      dtype.str[1:].encode('ascii'),
+                                      len(mesh['centroids']), len(field_names),
+                                      _checksum(mesh).encode('ascii'), len(names))
+
+        logger.info('Saving results to \t\t' + os.path.abspath(results_file))
+        with open(results_file, 'wb') as file:
+            file.write(_pad(header + names, RESULTS_ALIGNMENT))
+
+        return cls(results_file, 'a', durable=durable)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self._steps)
+
+    def close(self):
+        """Close the file (the arrays already read stay valid)"""
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._records = None
+
+    @property
+    def steps(self):
+        """Step numbers of the records"""
+
+        return np.array(self._steps, dtype=np.int64)
+
+    @property
+    def times(self):
+        """Times of the records"""
+
+        return np.array(self._times, dtype=np.float64)
+
+    def _read_header(self):
+        """Read the header of the file and set the layout of the records"""
+
+        with open(self.results_file, 'rb') as file:
+            header = file.read(_RESULTS_HEADER.size)
+            if not header.startswith(RESULTS_MAGIC):
+                raise ValueError("ERROR: Not a results file")
+            if len(header) < _RESULTS_HEADER.size:
+                raise EOFError("ERROR: Truncated results header")
+            (_, version, byte_order, type_code, N_fv, N_fields, checksum,
+             names_size) = _RESULTS_HEADER.unpack(header)
+            if version != RESULTS_VERSION:
+                raise ValueError("ERROR: Unsupported results version " + str(version))
+            names = file.read(names_size)
+            if len(names) < names_size:
+                raise EOFError("ERROR: Truncated results header")
+
+        self.N_fv = N_fv
+        self.field_names = tuple(names.decode('utf-8').split('\n'))
+        self.dtype = np.dtype(byte_order.decode('ascii') +
+                              type_code.rstrip(b'\0').decode('ascii'))
+        self.mesh_checksum = checksum.decode('ascii')
+        self.data_offset = _aligned(_RESULTS_HEADER.size + names_size, RESULTS_ALIGNMENT)
+        self.record_size = _aligned(RECORD_HEADER_SIZE +
+                                    N_fields * N_fv * self.dtype.itemsize,
+                                    RECORD_ALIGNMENT)
+        # a record seen as a NumPy structured type, to memory-map the file
+        self._record_dtype = np.dtype({'names': ['magic', 'step', 'time', 'values'],
+                                       'formats': ['S4', '<i8', '<f8',
+                                                   (self.dtype, (N_fields, N_fv))],
+                                       'offsets': [0, 8, 16, RECORD_HEADER_SIZE],
+                                       'itemsize': self.record_size})
+
+    def refresh(self):
+        """
+        Add to the index the records appended since the file was opened
+
+        Only the headers of the new records are read. The scan stops at the
+        first incomplete or invalid record.
+
+        Returns
+        -------
+        N_new : int
+            Number of new records
+
+        """
+
+        N_old = len(self)
+        N_complete = (os.path.getsize(self.results_file) -
+                      self.data_offset) // self.record_size
+        if N_complete <= N_old:
+            return 0
+        records = np.memmap(self.results_file, dtype=self._record_dtype, mode='r',
+                            offset=self.data_offset + N_old * self.record_size,
+                            shape=(N_complete - N_old,))
+        invalid = np.flatnonzero(records['magic'] != RECORD_MAGIC)
+        N_new = invalid[0] if len(invalid) > 0 else len(records)
+        steps = records['step'][:N_new].tolist()
+        times = records['time'][:N_new].tolist()
+        del records
+
+        self._steps += steps
+        self._times += times
+        self._index.update(zip(steps, range(N_old, N_old + N_new)))
+        self._records = None
+
+        return N_new
+
+    @pymonitor.monitored
+    def append(self, step, time, fields):
+        """
+        Append the fields at a new time step
+
+        Parameters
+        ----------
+        step : int
+            Step number (larger than the ones already saved)
+        time : float
+            Time (not smaller than the ones already saved)
+        fields : dictionary
+            Values of every field at the cells (an array if there is only one
+            field)
+
+        Raises
+        ------
+        ``ValueError``
+            If the store is not open for appending, the step or the time are
+            not increasing, a field is missing or hasn't one value per cell
+
+        Returns
+        -------
+        None.
+
+        """
+
+        if self._file is None:
+            raise ValueError("ERROR: The results store is not open for appending")
+        step = int(step)
+        time = float(time)
+        if (len(self) > 0) and ((step <= self._steps[-1]) or (time < self._times[-1])):
+            raise ValueError("ERROR: Step " + str(step) + " at time " + str(time) +
+                             " is not after the last saved step " +
+                             str(self._steps[-1]) + " at time " + str(self._times[-1]))
+        if not isinstance(fields, dict):
+            if len(self.field_names) != 1:
+                raise ValueError("ERROR: The values of " + str(len(self.field_names)) +
+                                 " fields are needed")
+            fields = {self.field_names[0]: fields}
+        arrays = []
+        for name in self.field_names:
+            if name not in fields:
+                raise ValueError("ERROR: Missing field '" + name + "'")
+            values = np.ascontiguousarray(fields[name], dtype=self.dtype)
+            if values.shape != (self.N_fv,):
+                raise ValueError("ERROR: Field '" + name + "' doesn't have one value "
+                                 "per cell")
+            arrays.append(values)
+
+        # the raw content of the arrays is written (no copies), then the padding
+        header = _RECORD_HEADER.pack(RECORD_MAGIC, step, time)
+        N_bytes = RECORD_HEADER_SIZE + sum(values.nbytes for values in arrays)
+        _write_buffers(self._file, [header.ljust(RECORD_HEADER_SIZE, b'\0')] + arrays +
+                       [b'\0' * (self.record_size - N_bytes)])
+        if self.durable:
+            os.fsync(self._file.fileno())
+        pymonitor.current().written(self.record_size)
+
+        self._steps.append(step)
+        self._times.append(time)
+        self._index[step] = len(self) - 1
+
+    def _get_records(self):
+        """All the records, memory-mapped (mapped again after new records)"""
+
+        if (self._records is None) or (len(self._records) != len(self)):
+            if len(self) == 0:
+                raise ValueError("ERROR: No steps in '" + str(self.results_file) + "'")
+            self._records = np.memmap(self.results_file, dtype=self._record_dtype,
+                                      mode='r', offset=self.data_offset,
+                                      shape=(len(self),))
+
+        return self._records
+
+    def read_record(self, index, mmap=True):
+        """
+        Fields of a record
+
+        Parameters
+        ----------
+        index : int
+            Index of the record (negative from the end, e.g. -1 for the last)
+        mmap : bool
+            If ``True``, the arrays are read-only views of the memory-mapped
+            file (only the values used are read from disk), otherwise they
+            are loaded in memory
+
+        Returns
+        -------
+        fields : dictionary
+            Values of every field at the cells
+
+        """
+
+        values = self._get_records()['values'][index]
+        if not mmap:
+            values = np.array(values)
+            pymonitor.current().read(values.nbytes)
+
+        return {name: values[k] for k, name in enumerate(self.field_names)}
+
+    def read_step(self, step, mmap=True):
+        """
+        Fields at a step
+
+        Parameters
+        ----------
+        step : int
+            Step number
+        mmap : bool
+            See ``read_record()``
+
+        Raises
+        ------
+        ``KeyError``
+            If the step wasn't saved
+
+        Returns
+        -------
+        fields : dictionary
+            Values of every field at the cells
+
+        """
+
+        return self.read_record(self._index[step], mmap)
+
+    def read_time(self, time, mmap=True):
+        """
+        Fields at the last step saved at or before a time
+
+        Parameters
+        ----------
+        time : float
+            Time
+        mmap : bool
+            See ``read_record()``
+
+        Raises
+        ------
+        ``ValueError``
+            If no step was saved at or before the time
+
+        Returns
+        -------
+        step : int
+            Step number
+        fields : dictionary
+            Values of every field at the cells
+
+        """
+
+        index = bisect.bisect_right(self._times, time) - 1
+        if index < 0:
+            raise ValueError("ERROR: No step saved at or before time " + str(time))
+
+        return self._steps[index], self.read_record(index, mmap)
+
+    @pymonitor.monitored
+    def history(self, field, cells):
+        """
+        Time history of a field at some cells
+
+        Only the values of the cells are read, one block per record.
+
+        Parameters
+        ----------
+        field : string
+            Name of the field
+        cells : int or array
+            Index of a cell or of more cells
+
+        Returns
+        -------
+        values : array
+            Values at every record (an array with a column for every cell, if
+            more cells are given)
+
+        """
+
+        k = self.field_names.index(field)
+        values = np.array(self._get_records()['values'][:, k, cells])
+        pymonitor.current().read(values.nbytes)
+
+        return values
+
+
+
+def _checksum(mesh):
+    """Checksum of the coordinates of a mesh (see ``pymesh.mesh_checksum()``)"""
+
+    return pymesh.mesh_checksum([mesh['centroids']], [mesh['face_nodes']])
+
+
+
+def _write_buffers(file, buffers):
+    """
+    Write buffers one after the other in an unbuffered file, with a single
+    system call if possible (``os.writev()``, not available on Windows)
+    """
+
+    buffers = [memoryview(buffer).cast('B') for buffer in buffers]
+    if hasattr(os, 'writev'):
+        N_written = os.writev(file.fileno(), buffers)
+        # skip what was written: a short write is completed below
+        while buffers and (N_written >= len(buffers[0])):
+            N_written -= len(buffers.pop(0))
+        if buffers:
+            buffers[0] = buffers[0][N_written:]
+    for buffer in buffers:
+        while len(buffer) > 0:
+            buffer = buffer[file.write(buffer):]
+
+
+
+def _aligned(size, alignment):
+    """Smallest multiple of the alignment not smaller than the size"""
+
+    return -(-size // alignment) * alignment
+
+
+
+def _pad(data, alignment):
+    """Pad bytes with zeros to a multiple of the alignment"""
+
+    return data.ljust(_aligned(len(data), alignment), b'\0')
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+
+r"""
+Steady diffusion (heat conduction) on a 1D cell-centred finite volume mesh
+
+The equation solved is
+
+.. math::
+    -\frac{\mathrm{d}}{\mathrm{d}x} \left( \Gamma \frac{\mathrm{d}\phi}
+    {\mathrm{d}x} \right) = S
+
+Every cell :math:`P` gives the equation :math:`a_P \phi_P - a_W \phi_W -
+a_E \phi_E = b_P`, so the matrix of the system is tridiagonal. It is stored
+in banded form, as an array of shape ``(3, N)`` whose rows are the lower
+diagonal, the main diagonal and the upper diagonal aligned with the
+equations (i.e. ``A[0, i]`` multiplies :math:`\phi_{i-1}` and ``A[2, i]``
+multiplies :math:`\phi_{i+1}` in the equation of the cell :math:`i`;
+``A[0, 0]`` and ``A[2, -1]`` are always 0), and it is solved with the
+Thomas algorithm in :math:`O(N)` time and memory. The elimination of the
+matrix and the sweeps of the right-hand side are separate steps
+(``factor_tridiagonal()`` and ``solve_factored()``), so that many systems
+with the same matrix are solved without repeating the elimination. The
+sweeps are kernels of ``pykernels``, compiled with Numba when it's installed.
+
+The boundary conditions are tuples ``(type, value)``:
+
+    - ``('dirichlet', phi_b)``: value of :math:`\phi` on the boundary face
+    - ``('neumann', grad_b)``: gradient :math:`\mathrm{d}\phi/\mathrm{d}x`
+      on the boundary face (along :math:`x`, not along the outward normal)
+
+"""
+
+import numpy as np
+
+from . import pykernels
+from . import pymesh
+from . import pymonitor
+
+
+BOUNDARY_CONDITIONS = ('dirichlet', 'neumann')
+
+
+
+@pymonitor.monitored
+def solve_diffusion(mesh, conductivity=1.0, source=0.0,
+                    bc_left=('dirichlet', 0.0), bc_right=('dirichlet', 0.0)):
+    r"""
+    Solve the steady diffusion equation on a 1D mesh
+
+    Parameters
+    ----------
+    mesh : Mesh or dictionary
+        Mesh (e.g. from ``pymesh.mesher()`` or ``pymesh.read_mesh()``)
+    conductivity : float or array
+        Diffusion coefficient :math:`\Gamma`, uniform or of every cell
+    source : float or array
+        Source term :math:`S` per unit volume, uniform or of every cell
+    bc_left : tuple
+        Boundary condition on the first face (see the module documentation)
+    bc_right : tuple
+        Boundary condition on the last face
+
+    Returns
+    -------
+    phi : array
+        Solution at the centroids
+
+    """
+
+    A, b = assemble_diffusion(mesh, conductivity, source, bc_left, bc_right)
+    phi = solve_tridiagonal(A, b)
+
+    return phi
+
+
+
+def assemble_diffusion(mesh, conductivity=1.0, source=0.0,
+                       bc_left=('dirichlet', 0.0), bc_right=('dirichlet', 0.0)):
+    """
+    Finite volume coefficients of the steady diffusion equation
+
+    Parameters
+    ----------
+    See ``solve_diffusion()``.
+
+    Raises
+    ------
+    ``ValueError``
+        If a boundary condition is unknown, if both boundary conditions are of
+        Neumann type (the solution is not unique) or if the conductivity is
+        not positive
+
+    Returns
+    -------
+    A : array
+        Matrix of the system in banded form, of shape ``(3, N)`` (see the
+        module documentation)
+    b : array
+        Right-hand side of the system
+
+    """
+
+    mesh = pymesh.as_mesh(mesh)
+    bc_left = _check_boundary_condition(bc_left)
+    bc_right = _check_boundary_condition(bc_right)
+    if bc_left[0] == 'neumann' and bc_right[0] == 'neumann':
+        raise ValueError("ERROR: At least one Dirichlet boundary condition is needed")
+
+    N_fv = mesh.N_fv
+    gamma = np.broadcast_to(np.asarray(conductivity, dtype=float), (N_fv,))
+    D = face_conductances(mesh, gamma)
+
+    # DIFFUSION BETWEEN NEIGHBOUR CELLS
+    A = np.empty((3, N_fv))
+    np.negative(D[:-1], out=A[0])
+    np.add(D[:-1], D[1:], out=A[1])
+    np.negative(D[1:], out=A[2])
+    A[0, 0] = 0.0
+    A[2, -1] = 0.0
+    b = np.asarray(source, dtype=float) * mesh.volumes
+    b = np.array(np.broadcast_to(b, (N_fv,)))
+
+    # BOUNDARY CONDITIONS
+    # Dirichlet: the conductance between the boundary face and the centroid
+    # stays in the diagonal. Neumann: it is replaced by the given flux
+    bc_type, bc_value = bc_left
+    if bc_type == 'dirichlet':
+        b[0] += D[0] * bc_value
+    else:
+        A[1, 0] -= D[0]
+        b[0] -= mesh.area * gamma[0] * bc_value
+    bc_type, bc_value = bc_right
+    if bc_type == 'dirichlet':
+        b[-1] += D[-1] * bc_value
+    else:
+        A[1, -1] -= D[-1]
+        b[-1] += mesh.area * gamma[-1] * bc_value
+    pymonitor.current().allocated(A, b)
+
+    return A, b
+
+
+
+def face_conductances(mesh, conductivity=1.0):
+    r"""
+    Diffusive conductance of every face of the mesh
+
+    The conductance of a face is :math:`D_\mathrm{f} = A / (\delta_L/
+    \Gamma_L + \delta_R/\Gamma_R)`, where :math:`\delta_L` and
+    :math:`\delta_R` are the distances of the face from the centroids on its
+    left and on its right (i.e. the conductivity on the face is the harmonic
+    mean, which is exact for cells made of different materials). For the
+    boundary faces only the cell inside the domain contributes.
+
+    Parameters
+    ----------
+    mesh : Mesh
+        Mesh
+    conductivity : float or array
+        Diffusion coefficient :math:`\Gamma`, uniform or of every cell
+
+    Raises
+    ------
+    ``ValueError``
+        If the conductivity is not positive
+
+    Returns
+    -------
+    D : array
+        Conductance of every face (:math:`N+1` values)
+
+    """
+
+    gamma = np.broadcast_to(np.asarray(conductivity, dtype=float), (mesh.N_fv,))
+    if not (gamma > 0).all():
+        raise ValueError("ERROR: The conductivity must be positive")
+
+    xC = mesh.centroids
+    xf = mesh.face_nodes
+    # thermal resistance (per unit area) of every face
+    R = np.zeros(len(xf))
+    R[:-1] += (xC - xf[:-1]) / gamma
+    R[1:] += (xf[1:] - xC) / gamma
+    D = np.divide(mesh.area, R, out=R)
+
+    return D
+
+
+
+def solve_tridiagonal(A, b):
+    """
+    Solve a tridiagonal system with the Thomas algorithm
+
+    No pivoting is done, so the matrix must be diagonally dominant (as the
+    matrices of the finite volume diffusion are).
+
+    Parameters
+    ----------
+    A : array
+        Matrix in banded form, of shape ``(3, N)`` (see the module
+        documentation)
+    b : array
+        Right-hand side
+
+    Returns
+    -------
+    x : array
+        Solution of the system
+
+    """
+
+    return solve_factored(A[0], factor_tridiagonal(A), b)
+
+
+
+def factor_tridiagonal(A, out=None):
+    """
+    Forward elimination of the Thomas algorithm on the matrix alone
+
+    Many systems with the same matrix (e.g. the time steps of an implicit
+    scheme) can then be solved with ``solve_factored()``, which only sweeps
+    the right-hand side.
+
+    Parameters
+    ----------
+    A : array
+        Matrix in banded form, of shape ``(3, N)``
+    out : array
+        Array of shape ``(2, N)`` where the factors are stored (``None`` to
+        allocate a new one)
+
+    Returns
+    -------
+    factors : array
+        Inverse of the pivots (first row) and modified upper diagonal (second
+        row)
+
+    """
+
+    lower, diag, upper = A
+    factors = np.empty((2, len(diag))) if out is None else out
+    pykernels.get_kernel('factor_tridiagonal')(lower, diag, upper, *factors)
+
+    return factors
+
+
+
+def solve_factored(lower, factors, b, out=None):
+    """
+    Solve a tridiagonal system factored by ``factor_tridiagonal()``
+
+    Parameters
+    ----------
+    lower : array
+        Lower diagonal of the matrix (first row of the banded form)
+    factors : array
+        Factors returned by ``factor_tridiagonal()``
+    b : array
+        Right-hand side
+    out : array
+        Array where the solution is stored (``None`` to allocate a new one).
+        It can be ``b`` itself
+
+    Returns
+    -------
+    x : array
+        Solution of the system
+
+    """
+
+    inv_pivots, c_mod = factors
+    x = np.empty(len(inv_pivots)) if out is None else out
+    pykernels.get_kernel('solve_factored')(lower, inv_pivots, c_mod, b, x)
+
+    return x
+
+
+
+def banded_matvec(A, x, out=None, work=None):
+    """
+    Product of a tridiagonal matrix in banded form and a vector
+
+    Parameters
+    ----------
+    A : array
+        Matrix in banded form, of shape ``(3, N)``
+    x : array
+        Vector
+    out : array
+        Array where the product is stored (``None`` to allocate a new one)
+    work : array
+        Work array of :math:`N` values (``None`` to allocate a new one)
+
+    Returns
+    -------
+    y : array
+        Product :math:`A x`
+
+    """
+
+    lower, diag, upper = A
+    y = np.empty(len(diag)) if out is None else out
+    if work is None:
+        work = np.empty(len(diag))
+    np.multiply(diag, x, out=y)
+    np.multiply(lower[1:], x[:-1], out=work[1:])
+    np.add(y[1:], work[1:], out=y[1:])
+    np.multiply(upper[:-1], x[1:], out=work[:-1])
+    np.add(y[:-1], work[:-1], out=y[:-1])
+
+    return y
+
+
+
+@pymonitor.monitored
+def conjugate_gradient(A, b, preconditioner=None, x0=None, tol=1e-10,
+                       max_iterations=1000):
+    r"""
+    Solve a symmetric positive definite tridiagonal system with the
+    (preconditioned) conjugate gradient method
+
+    Parameters
+    ----------
+    A : array
+        Matrix in banded form, of shape ``(3, N)``
+    b : array
+        Right-hand side
+    preconditioner : callable
+        Function returning the approximate solution :math:`z \approx A^{-1}
+        r` for a residual :math:`r` (e.g. a multigrid cycle, see
+        ``pymultigrid.MultigridSolver.precondition()``). ``None`` for no
+        preconditioning
+    x0 : array
+        Initial guess (``None`` for zero)
+    tol : float
+        Tolerance on the residual, relative to the norm of ``b``
+    max_iterations : int
+        Maximum number of iterations
+
+    Returns
+    -------
+    x : array
+        Solution of the system
+    info : dictionary
+        ``'n_iterations'``, ``'residual'`` (relative residual reached) and
+        ``'converged'``
+
+    """
+
+    x = np.zeros(len(b)) if x0 is None else np.array(x0, dtype=float)
+    work = np.empty(len(b))
+    r = b - banded_matvec(A, x, work=work)
+    b_norm = np.linalg.norm(b)
+    if b_norm == 0:
+        b_norm = 1.0
+
+    residual = np.linalg.norm(r) / b_norm
+    k = 0
+    if residual > tol:
+        z = r if preconditioner is None else preconditioner(r)
+        p = z.copy()
+        rz = np.dot(r, z)
+        Ap = np.empty(len(b))
+        while k < max_iterations:
+            banded_matvec(A, p, out=Ap, work=work)
+            alpha = rz / np.dot(p, Ap)
+            x += alpha * p
+            r -= alpha * Ap
+            k = k + 1
+            residual = np.linalg.norm(r) / b_norm
+            if residual <= tol:
+                break
+            z = r if preconditioner is None else preconditioner(r)
+            rz_new = np.dot(r, z)
+            p *= rz_new / rz
+            p += z
+            rz = rz_new
+
+    info = {'n_iterations': k,
+            'residual': residual,
+            'converged': residual <= tol
+            }
+
+    return x, info
+
+
+
+def banded_to_dense(A):
+    """Dense matrix of a tridiagonal matrix in banded form"""
+
+    N = A.shape[1]
+    M = np.zeros((N, N))
+    i = np.arange(N)
+    M[i, i] = A[1]
+    M[i[1:], i[:-1]] = A[0, 1:]
+    M[i[:-1], i[1:]] = A[2, :-1]
+
+    return M
+
+
+
+def _check_boundary_condition(bc):
+    """Check a boundary condition and return it as ``(type, value)``"""
+
+    bc_type, bc_value = bc
+    bc_type = bc_type.lower()
+    if bc_type not in BOUNDARY_CONDITIONS:
+        raise ValueError("ERROR: Unknown boundary condition '" + str(bc_type) +
+                         "' (available: " + ', '.join(BOUNDARY_CONDITIONS) + ")")
+
+    return bc_type, float(bc_value)
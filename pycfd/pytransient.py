@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+
+r"""
+Transient convection-diffusion on a 1D cell-centred finite volume mesh
+
+The equation solved is
+
+.. math::
+    \frac{\partial \phi}{\partial t} + \frac{\partial (u \phi)}{\partial x}
+    = \frac{\partial}{\partial x} \left( \Gamma \frac{\partial \phi}
+    {\partial x} \right) + S
+
+Integrated over the cells, it becomes :math:`V \mathrm{d}\phi/\mathrm{d}t =
+c - M \phi + C(\phi)`, where the tridiagonal matrix :math:`M` (stored in
+banded form, see ``pysolver``) contains the diffusion and the linear part of
+the convection (upwind or central), :math:`c` contains the source and the
+boundary conditions, and :math:`C(\phi)` is the non-linear correction of the
+TVD scheme. Time is discretised with the :math:`\theta`-method
+
+.. math::
+    \left( \frac{V}{\Delta t} + \theta M \right) \phi^{n+1} =
+    \left( \frac{V}{\Delta t} - (1 - \theta) M \right) \phi^n + c +
+    C(\phi^n)
+
+with :math:`\theta = 0` (explicit Euler), 1 (implicit Euler) or 1/2
+(Crank-Nicolson); the TVD correction is always explicit (deferred
+correction).
+
+Everything that depends only on the mesh (the matrix :math:`M`, the vector
+:math:`c`, the interpolation weights...) is computed once when the solver is
+created, together with the work arrays used by the time steps, so that the
+time loop doesn't allocate any NumPy array.
+"""
+
+import time
+
+import numpy as np
+
+from . import pymesh
+from . import pysolver
+from .pymonitor import logger
+
+
+# value of theta of every time scheme
+TIME_SCHEMES = {'explicit': 0.0,
+                'implicit': 1.0,
+                'crank-nicolson': 0.5
+                }
+
+CONVECTION_SCHEMES = ('upwind', 'central', 'tvd')
+
+LIMITERS = ('minmod', 'van leer', 'superbee')
+
+# added to the denominators of the limiters (avoid 0/0 in smooth regions)
+_TINY = 1e-300
+
+
+
+class ConvectionDiffusion:
+    r"""
+    Time stepper of the 1D convection-diffusion equation
+
+    Parameters
+    ----------
+    mesh : Mesh or dictionary
+        Mesh (e.g. from ``pymesh.mesher()`` or ``pymesh.read_mesh()``)
+    velocity : float or array
+        Velocity :math:`u`, uniform or on every face (:math:`N+1` values)
+    diffusivity : float or array
+        Diffusion coefficient :math:`\Gamma` (zero or positive), uniform or
+        of every cell
+    source : float or array
+        Source term :math:`S` per unit volume, uniform or of every cell
+    bc_left : tuple
+        Boundary condition on the first face, ``('dirichlet', phi_b)`` or
+        ``('neumann', grad_b)`` (see ``pysolver``)
+    bc_right : tuple
+        Boundary condition on the last face
+    time_scheme : string
+        ``'explicit'`` (Euler), ``'implicit'`` (Euler) or ``'crank-nicolson'``
+    convection_scheme : string
+        ``'upwind'``, ``'central'`` or ``'tvd'``
+    limiter : string
+        Flux limiter of the TVD scheme: ``'minmod'``, ``'van leer'`` or
+        ``'superbee'``
+
+    Raises
+    ------
+    ``ValueError``
+        If a scheme, a limiter or a boundary condition is unknown, or if the
+        diffusivity is negative
+
+    """
+
+    def __init__(self, mesh, velocity=0.0, diffusivity=0.0, source=0.0,
+                 bc_left=('dirichlet', 0.0), bc_right=('dirichlet', 0.0),
+                 time_scheme='crank-nicolson', convection_scheme='upwind',
+                 limiter='van leer'):
+        mesh = pymesh.as_mesh(mesh)
+        time_scheme = time_scheme.lower()
+        convection_scheme = convection_scheme.lower()
+        limiter = limiter.lower()
+        if time_scheme not in TIME_SCHEMES:
+            raise ValueError("ERROR: Unknown time scheme '" + time_scheme +
+                             "' (available: " + ', '.join(TIME_SCHEMES) + ")")
+        if convection_scheme not in CONVECTION_SCHEMES:
+            raise ValueError("ERROR: Unknown convection scheme '" + convection_scheme +
+                             "' (available: " + ', '.join(CONVECTION_SCHEMES) + ")")
+        if limiter not in LIMITERS:
+            raise ValueError("ERROR: Unknown limiter '" + limiter +
+                             "' (available: " + ', '.join(LIMITERS) + ")")
+        bc_left = pysolver._check_boundary_condition(bc_left)
+        bc_right = pysolver._check_boundary_condition(bc_right)
+
+        self.mesh = mesh
+        self.time_scheme = time_scheme
+        self.convection_scheme = convection_scheme
+        self.limiter = limiter
+        self.theta = TIME_SCHEMES[time_scheme]
+        N_fv = mesh.N_fv
+
+        # FACE FLUXES AND CONDUCTANCES
+        # convective flux F = u A and diffusive conductance D of every face
+        F = np.array(np.broadcast_to(np.asarray(velocity, dtype=float) * mesh.area,
+                                     (N_fv + 1,)))
+        gamma = np.broadcast_to(np.asarray(diffusivity, dtype=float), (N_fv,))
+        if (gamma < 0).any():
+            raise ValueError("ERROR: The diffusivity must be zero or positive")
+        no_diffusion = gamma == 0
+        D = pysolver.face_conductances(mesh, np.where(no_diffusion, 1.0, gamma))
+        # no diffusion across the faces of the cells without diffusivity
+        D[:-1][no_diffusion] = 0.0
+        D[1:][no_diffusion] = 0.0
+        self.fluxes = F
+        self.conductances = D
+
+        # LINEAR OPERATOR
+        M = np.zeros((3, N_fv))
+        c = np.array(np.broadcast_to(np.asarray(source, dtype=float) * mesh.volumes,
+                                     (N_fv,)))
+        # diffusion through the internal faces
+        M[0, 1:] -= D[1:-1]
+        M[1, 1:] += D[1:-1]
+        M[1, :-1] += D[1:-1]
+        M[2, :-1] -= D[1:-1]
+        # convection through the internal faces: the flux F phi_f leaves the
+        # cell on the left and enters the cell on the right
+        F_int = F[1:-1]
+        if convection_scheme == 'central':
+            w = mesh.face_interp_weights[1:-1]
+            weight_left = F_int * w
+            weight_right = F_int * (1 - w)
+        else:
+            # upwind (also the implicit part of the TVD scheme)
+            weight_left = np.maximum(F_int, 0.0)
+            weight_right = np.minimum(F_int, 0.0)
+        M[1, :-1] += weight_left
+        M[2, :-1] += weight_right
+        M[0, 1:] -= weight_left
+        M[1, 1:] -= weight_right
+        # boundary faces
+        area = mesh.area
+        d = mesh.face_distances
+        bc_type, bc_value = bc_left
+        if bc_type == 'dirichlet':
+            M[1, 0] += D[0]
+            c[0] += (D[0] + F[0]) * bc_value
+        else:
+            # the convected value is extrapolated from the centroid
+            c[0] -= area * gamma[0] * bc_value + F[0] * bc_value * d[0]
+            M[1, 0] -= F[0]
+        bc_type, bc_value = bc_right
+        if bc_type == 'dirichlet':
+            M[1, -1] += D[-1]
+            c[-1] += (D[-1] - F[-1]) * bc_value
+        else:
+            c[-1] += area * gamma[-1] * bc_value - F[-1] * bc_value * d[-1]
+            M[1, -1] += F[-1]
+        self.operator = M
+        self.constant = c
+        self.volumes = mesh.volumes
+        self._inv_volumes = 1.0 / mesh.volumes
+
+        # rate of change of every cell, for the CFL time step
+        rate = np.maximum(np.abs(F[:-1]), np.abs(F[1:]))
+        rate += D[:-1]
+        rate += D[1:]
+        rate *= self._inv_volumes
+        self._max_rate = rate.max()
+
+        # TVD SCHEME
+        if convection_scheme == 'tvd':
+            # positive and negative part of the fluxes of the internal faces
+            self._F_pos = np.maximum(F_int, 0.0)
+            self._F_neg = np.minimum(F_int, 0.0)
+            self._has_pos = bool(self._F_pos.any())
+            self._has_neg = bool(self._F_neg.any())
+            w = mesh.face_interp_weights[1:-1]
+            # fraction of the distance between the centroids covered going
+            # from the upwind centroid to the face
+            self._frac_pos = 1 - w
+            self._frac_neg = w
+            # distance of the centroids of the internal faces, and ratio
+            # between the distances of two consecutive faces
+            d_int = d[1:-1]
+            self._ratio_pos = np.zeros(N_fv - 1)
+            self._ratio_pos[1:] = d_int[1:] / d_int[:-1]
+            self._ratio_neg = np.zeros(N_fv - 1)
+            self._ratio_neg[:-1] = d_int[:-1] / d_int[1:]
+            self._delta = np.empty(N_fv - 1)
+            self._upwind_delta = np.empty(N_fv - 1)
+            self._work_face = np.empty(N_fv - 1)
+            self._work_face_2 = np.empty(N_fv - 1)
+            self._work_face_3 = np.empty(N_fv - 1)
+            self._corrections = np.zeros(N_fv + 1)
+
+        # WORK ARRAYS
+        self._rhs = np.empty(N_fv)
+        self._work = np.empty(N_fv)
+        self._system = self.theta * M
+        self._factors = np.empty((2, N_fv))
+        self._dt = None
+        self.n_steps = 0
+
+    def __repr__(self):
+        return ('ConvectionDiffusion(N_fv=' + str(self.mesh.N_fv) +
+                ', time_scheme=' + repr(self.time_scheme) +
+                ', convection_scheme=' + repr(self.convection_scheme) + ')')
+
+    def cfl_time_step(self, cfl=1.0):
+        r"""
+        Time step with the given CFL number
+
+        The CFL number is computed for every cell as :math:`\Delta t
+        (\max(|F_w|, |F_e|) + D_w + D_e) / V`, which combines the Courant
+        number of the convection and the diffusion number. With the explicit
+        scheme and the upwind (or TVD) convection, the solution is stable and
+        bounded for CFL numbers up to 1 (up to 1/2 with the ``'superbee'``
+        limiter).
+
+        Parameters
+        ----------
+        cfl : float
+            Largest CFL number of the cells
+
+        Returns
+        -------
+        dt : float
+            Time step (``inf`` if nothing changes in time)
+
+        """
+
+        if self._max_rate == 0:
+            return np.inf
+
+        return cfl / self._max_rate
+
+    def apply_operator(self, phi, out):
+        r"""Matrix-vector product :math:`M \phi` (stored in ``out``)"""
+
+        return pysolver.banded_matvec(self.operator, phi, out=out, work=self._work)
+
+    def tvd_correction(self, phi, out):
+        r"""
+        Add the TVD correction :math:`C(\phi)` to ``out``
+
+        The value on every face is corrected w.r.t. the upwind value by the
+        limited difference between the two cells of the face, where the
+        limiter is a function of the ratio between the differences on the
+        upwind face and on the face itself (both divided by the distance of
+        the centroids, so that the scheme is TVD also on graded meshes).
+        """
+
+        delta = self._delta
+        upwind = self._upwind_delta
+        corrections = self._corrections
+        flux = corrections[1:-1]
+        np.subtract(phi[1:], phi[:-1], out=delta)
+
+        flux.fill(0.0)
+        if self._has_pos:
+            # flow from left to right: the upwind face is the one on the left
+            # (no correction next to the boundary, where it doesn't exist)
+            upwind[0] = 0.0
+            np.multiply(delta[:-1], self._ratio_pos[1:], out=upwind[1:])
+            self._limit(upwind, delta, self._work_face)
+            self._work_face *= self._frac_pos
+            self._work_face *= self._F_pos
+            flux += self._work_face
+        if self._has_neg:
+            upwind[-1] = 0.0
+            np.multiply(delta[1:], self._ratio_neg[:-1], out=upwind[:-1])
+            self._limit(upwind, delta, self._work_face)
+            self._work_face *= self._frac_neg
+            self._work_face *= self._F_neg
+            flux -= self._work_face
+
+        # the corrected flux leaves the cell on the left and enters the cell
+        # on the right
+        out += corrections[:-1]
+        out -= corrections[1:]
+
+        return out
+
+    def _limit(self, a, b, out):
+        r"""
+        Limited difference :math:`\psi(a/b) b` (stored in ``out``), written
+        without the ratio :math:`a/b` so that :math:`b = 0` is not a problem
+        """
+
+        work = self._work_face_2
+        work_2 = self._work_face_3
+        if self.limiter == 'van leer':
+            # (a |b| + |a| b) / (|a| + |b|)
+            np.abs(b, out=out)
+            out *= a
+            np.abs(a, out=work)
+            work *= b
+            out += work
+            np.abs(a, out=work)
+            np.abs(b, out=work_2)
+            work += work_2
+            work += _TINY
+            out /= work
+            return out
+
+        # minmod and superbee: (sign(a) + sign(b))/2 times a magnitude
+        np.abs(a, out=out)
+        np.abs(b, out=work)
+        if self.limiter == 'minmod':
+            # min(|a|, |b|)
+            np.minimum(out, work, out=out)
+        else:
+            # max(min(2|a|, |b|), min(|a|, 2|b|))
+            out *= 2
+            np.minimum(out, work, out=out)
+            work *= 2
+            np.abs(a, out=work_2)
+            np.minimum(work, work_2, out=work)
+            np.maximum(out, work, out=out)
+        np.sign(a, out=work)
+        np.sign(b, out=work_2)
+        work += work_2
+        work *= 0.5
+        out *= work
+
+        return out
+
+    def step(self, phi, dt):
+        """
+        Advance the solution by a time step (in place)
+
+        Parameters
+        ----------
+        phi : array
+            Solution at the centroids, overwritten by the new solution
+        dt : float
+            Time step
+
+        Returns
+        -------
+        phi : array
+            New solution (the same array given as input)
+
+        """
+
+        rhs = self._rhs
+        theta = self.theta
+        if theta < 1:
+            self.apply_operator(phi, rhs)
+            rhs *= theta - 1
+        else:
+            rhs.fill(0.0)
+        rhs += self.constant
+        if self.convection_scheme == 'tvd':
+            self.tvd_correction(phi, rhs)
+
+        if theta == 0:
+            # explicit: phi += dt/V * rhs
+            rhs *= self._inv_volumes
+            rhs *= dt
+            phi += rhs
+        else:
+            if dt != self._dt:
+                # the diagonal of the system changes with the time step
+                diag = self._system[1]
+                np.divide(self.volumes, dt, out=diag)
+                diag += theta * self.operator[1]
+                pysolver.factor_tridiagonal(self._system, out=self._factors)
+                self._dt = dt
+            np.multiply(self.volumes, phi, out=self._work)
+            self._work /= dt
+            rhs += self._work
+            pysolver.solve_factored(self._system[0], self._factors, rhs, out=phi)
+        self.n_steps += 1
+
+        return phi
+
+    def run(self, phi, t_end, dt=None, cfl=None, max_steps=None):
+        """
+        Advance the solution up to a given time
+
+        The time step is either fixed or computed from the CFL number (see
+        ``cfl_time_step()``); in both cases the last step is shortened to end
+        exactly at ``t_end``.
+
+        Parameters
+        ----------
+        phi : array
+            Initial solution at the centroids, overwritten by the final one
+        t_end : float
+            Final time (the initial time is 0)
+        dt : float
+            Time step
+        cfl : float
+            CFL number, used when the time step is not given (default 1 for
+            the explicit scheme, 10 for the implicit ones)
+        max_steps : int
+            Maximum number of time steps (``None`` for no limit)
+
+        Returns
+        -------
+        phi : array
+            Final solution (the same array given as input)
+        stats : dictionary
+            ``'t'`` (time reached), ``'n_steps'``, ``'wall_time'`` and
+            ``'steps_per_second'``
+
+        """
+
+        if dt is None:
+            if cfl is None:
+                cfl = 1.0 if self.theta == 0 else 10.0
+            dt = self.cfl_time_step(cfl)
+        if not np.isfinite(dt):
+            dt = t_end
+
+        t = 0.0
+        n_steps = 0
+        t_start = time.perf_counter()
+        while t < t_end and (max_steps is None or n_steps < max_steps):
+            dt_step = min(dt, t_end - t)
+            self.step(phi, dt_step)
+            # the last step lands exactly on t_end
+            t = t_end if dt_step == t_end - t else t + dt_step
+            n_steps += 1
+        wall_time = time.perf_counter() - t_start
+
+        stats = {'t': t,
+                 'n_steps': n_steps,
+                 'wall_time': wall_time,
+                 'steps_per_second': n_steps / wall_time if wall_time > 0 else np.inf
+                 }
+        logger.info(str(n_steps) + ' time steps (' + self.time_scheme + ', ' +
+                    self.convection_scheme + ') in ' +
+                    '{:.3f} s: {:.1f} steps/s'.format(wall_time, stats['steps_per_second']))
+
+        return phi, stats
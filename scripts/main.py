@@ -6,18 +6,22 @@ import context
 # submodules are NOT imported by default, you have to import them explicitly
 # (https://stackoverflow.com/a/8899345/17220538)
 import pycfd.pymesh as pmsh
+import pycfd.pymonitor as pymonitor
 import matplotlib.pyplot as plt
 import numpy as np
 
 
 #%% PROVA
 
+# print the messages of the library
+pymonitor.setup_logging()
+
 sample_folder = '../samplerun/'
 geo_file = sample_folder + '/geometry.input'
 mesh_file = sample_folder + 'sample.mesh'
 
-pmsh.mesher(geo_file, mesh_file)
-mesh = pmsh.read_mesh(mesh_file)
+# the mesh is saved to file and returned, no need to read it back
+mesh = pmsh.mesher(geo_file, mesh_file)
 
 
 #%% VISUALISATION
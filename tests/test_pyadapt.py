@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+
+"""
+Unit tests for the adaptive refinement of 1D meshes
+
+To run all tests: navigate to the top-level directory and execute:
+pytest
+
+To run tests for just one file:
+pytest file_to_test.py
+
+"""
+
+import numpy as np
+import pytest
+from pycfd import pymesh, pyadapt
+
+# parent directory used for data files, w.r.t. to the MAIN project directory
+parent_dir = 'tests/data/'
+# directory used for junk data created by tests
+junk_dir = 'tests/junk/'
+
+
+def uniform_mesh(N_fv):
+    """Uniform mesh in [0, 1]"""
+    
+    geometry = {'xf_0': 0.0, 'xf_N': 1.0, 'N_fv': N_fv, 'spacing': 'uniform',
+                'expansion_ratio': 1.0}
+    
+    return pymesh.generate_mesh(geometry)
+
+
+def max_neighbour_ratio(mesh):
+    """Largest width ratio between neighbour cells"""
+    
+    h = mesh.cell_widths
+    
+    return np.maximum(h[1:] / h[:-1], h[:-1] / h[1:]).max()
+
+
+
+def test_split_and_merge():
+    """Test: split and merged cells, untouched cells keep their coordinates"""
+    
+    mesh = uniform_mesh(8)
+    refine = np.zeros(8, dtype=bool)
+    refine[2] = True
+    coarsen = np.zeros(8, dtype=bool)
+    # cells 5-7: only 5 and 6 are merged
+    coarsen[5:] = True
+    new_mesh, _ = pyadapt.adapt_mesh(mesh, refine, coarsen)
+    xf = mesh.face_nodes
+    xf_exact = np.concatenate([xf[:3], [0.3125], xf[3:6], xf[7:]])
+    
+    success = (np.allclose(new_mesh.face_nodes, xf_exact, rtol=0, atol=1e-15) and
+               np.allclose(new_mesh.centroids,
+                           0.5*(new_mesh.face_nodes[1:] + new_mesh.face_nodes[:-1]),
+                           rtol=0, atol=1e-15) and
+               np.array_equal(new_mesh.centroids[:2], mesh.centroids[:2]) and
+               np.array_equal(new_mesh.centroids[4:6], mesh.centroids[3:5]) and
+               (new_mesh.centroids[-1] == mesh.centroids[-1]))
+    
+    assert success
+
+
+def test_conservative_transfer():
+    """Test: the integral of the fields doesn't change"""
+    
+    geometry = {'xf_0': 0.0, 'xf_N': 1.0, 'N_fv': 200, 'spacing': 'geometric',
+                'expansion_ratio': 1.01}
+    mesh = pymesh.generate_mesh(geometry)
+    rng = np.random.default_rng(0)
+    phi = rng.random(mesh.N_fv)
+    refine = rng.random(mesh.N_fv) < 0.2
+    coarsen = rng.random(mesh.N_fv) < 0.5
+    new_mesh, fields = pyadapt.adapt_mesh(mesh, refine, coarsen,
+                                          {'phi': phi, 'one': np.ones(mesh.N_fv)})
+    
+    success = ((new_mesh.N_fv != mesh.N_fv) and
+               np.isclose(np.dot(fields['phi'], new_mesh.volumes),
+                          np.dot(phi, mesh.volumes), rtol=1e-14) and
+               np.allclose(fields['one'], 1.0) and
+               np.isclose(new_mesh.volumes.sum(), mesh.volumes.sum(), rtol=1e-14))
+    
+    assert success
+
+
+def test_max_neighbour_ratio():
+    """Test: refinement and coarsening respect the maximum ratio"""
+    
+    mesh = uniform_mesh(64)
+    # refine the same cell many times: the neighbours are refined as well
+    for _ in range(6):
+        refine = np.zeros(mesh.N_fv, dtype=bool)
+        refine[np.argmin(np.abs(mesh.centroids - 0.5))] = True
+        mesh, _ = pyadapt.adapt_mesh(mesh, refine, max_ratio=2.0)
+    
+        success = max_neighbour_ratio(mesh) <= 2.0 + 1e-12
+    
+        assert success
+    
+    # coarsening everything but the finest cell: the coarsening stops near it
+    refine = np.zeros(mesh.N_fv, dtype=bool)
+    coarsen = mesh.cell_widths > mesh.cell_widths.min()
+    coarse_mesh, _ = pyadapt.adapt_mesh(mesh, refine, coarsen, max_ratio=2.0)
+    
+    success = ((coarse_mesh.N_fv < mesh.N_fv) and
+               (max_neighbour_ratio(coarse_mesh) <= 2.0 + 1e-12) and
+               (coarse_mesh.cell_widths.min() == mesh.cell_widths.min()))
+    
+    assert success
+
+
+def test_adapt_to_solution():
+    """Test: cells clustered at a steep front, where the error decreases"""
+    
+    front = lambda x: np.tanh((x - 0.6) / 0.005)
+    mesh = uniform_mesh(20)
+    for _ in range(6):
+        mesh, _ = pyadapt.adapt_to_solution(mesh, front(mesh.centroids))
+    h = mesh.cell_widths
+    xC = mesh.centroids
+    
+    success = ((h[np.abs(xC - 0.6) < 0.005].max() < 0.01 * h.max()) and
+               (mesh.N_fv < 100) and
+               (max_neighbour_ratio(mesh) <= 2.0 + 1e-12) and
+               (pyadapt.gradient_indicator(mesh, front(xC)).max() < 0.2))
+    
+    assert success
+
+
+def test_adapt_errors():
+    """Test: wrong number of flags, of field values and too small ratio"""
+    
+    mesh = uniform_mesh(10)
+    with pytest.raises(ValueError):
+        pyadapt.adapt_mesh(mesh, np.zeros(9, dtype=bool))
+    with pytest.raises(ValueError):
+        pyadapt.adapt_mesh(mesh, np.zeros(10, dtype=bool), max_ratio=1.5)
+    with pytest.raises(ValueError):
+        pyadapt.adapt_mesh(mesh, np.zeros(10, dtype=bool), fields={'phi': np.ones(9)})
+    with pytest.raises(ValueError):
+        pyadapt.flag_cells(np.ones(10), refine_threshold=0.1, coarsen_threshold=0.2)
+
+
+
+if __name__ == '__main__':
+    import context
+    
+    parent_dir = './data/'
+    junk_dir = './junk/'
+    
+    test_split_and_merge()
+    test_conservative_transfer()
+    test_max_neighbour_ratio()
+    test_adapt_to_solution()
+    test_adapt_errors()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+"""
+Unit tests for the batch mesher
+
+To run all tests: navigate to the top-level directory and execute:
+pytest
+
+To run tests for just one file:
+pytest file_to_test.py
+
+"""
+
+import os
+import shutil
+import numpy as np
+import pytest
+from pycfd import pybatch, pymesh
+
+# parent directory used for data files, w.r.t. to the MAIN project directory
+parent_dir = 'tests/data/'
+# directory used for junk data created by tests
+junk_dir = 'tests/junk/'
+
+
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_batch_mesher(max_workers):
+    """Test: mesh files, geometry dictionaries and a missing file in a batch"""
+    
+    output_dir = junk_dir + 'test_batch_mesher_' + str(max_workers) + '/'
+    geometry = {'xf_0': 0.0, 'xf_N': 1.0, 'N_fv': 3, 'spacing': 'uniform', 
+                'expansion_ratio': None}
+    inputs = [parent_dir + 'test_FV_*.input', geometry, 
+              parent_dir + 'test_missing.input', parent_dir + 'test_geometric.input']
+    results = pybatch.batch_mesher(inputs, output_dir, use_cache=False, 
+                                   max_workers=max_workers)
+    
+    success = (([result['input'] for result in results] == 
+                [parent_dir + 'test_FV_input.input', 1, 
+                 parent_dir + 'test_missing.input', parent_dir + 'test_geometric.input']) and
+               ([result['N_fv'] for result in results] == [6, 3, None, 8]) and
+               ('FileNotFoundError' in results[2]['error']) and
+               (results[0]['error'] is None) and
+               (results[0]['mesh_file'] == output_dir + 'test_FV_input.mesh'))
+    
+    assert success
+    
+    mesh = pymesh.read_mesh(results[1]['mesh_file'])
+    assert np.allclose(mesh['face_nodes'], [0, 1/3, 2/3, 1])
+    
+    summary = pybatch.batch_summary(results)
+    assert (summary['n_jobs'], summary['n_failed']) == (4, 1)
+
+
+def test_batch_dict_without_output_dir():
+    """Test: geometry dictionaries need an output directory"""
+    
+    geometry = {'xf_0': 0.0, 'xf_N': 1.0, 'N_fv': 3, 'spacing': 'uniform', 
+                'expansion_ratio': None}
+    
+    with pytest.raises(ValueError, match="output directory"):
+        pybatch.batch_mesher([geometry])
+
+
+
+def test_batch_same_mesh_file():
+    """Test: inputs with the same name in different directories are rejected"""
+    
+    output_dir = junk_dir + 'test_batch_same_mesh_file/'
+    inputs = []
+    for case_dir in ['a', 'b']:
+        os.makedirs(output_dir + case_dir, exist_ok=True)
+        inputs.append(shutil.copy(parent_dir + 'test_geometric.input',
+                                  output_dir + case_dir + '/case.input'))
+    
+    with pytest.raises(ValueError, match="would both be saved"):
+        pybatch.batch_mesher(inputs, output_dir, use_cache=False)
+    # the same file twice
+    with pytest.raises(ValueError, match="would both be saved"):
+        pybatch.batch_mesher(inputs[:1] * 2, use_cache=False)
+    results = pybatch.batch_mesher(inputs, use_cache=False)
+    
+    success = [result['N_fv'] for result in results] == [8, 8]
+    
+    assert success
+
+
+if __name__ == '__main__':
+    import context
+    
+    parent_dir = './data/'
+    junk_dir = './junk/'
+    
+    test_batch_mesher(2)
+    test_batch_dict_without_output_dir()
+    test_batch_same_mesh_file()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+"""
+Unit tests for the command-line interface
+
+To run all tests: navigate to the top-level directory and execute:
+pytest
+
+To run tests for just one file:
+pytest file_to_test.py
+
+"""
+
+import os
+import subprocess
+import sys
+import numpy as np
+import pytest
+import pycfd
+from pycfd import pycli, pymesh
+
+# parent directory used for data files, w.r.t. to the MAIN project directory
+parent_dir = 'tests/data/'
+# directory used for junk data created by tests
+junk_dir = 'tests/junk/'
+
+
+@pytest.fixture(autouse=True)
+def junk_mesh_cache(monkeypatch):
+    """Keep the meshes cached by the tests in the junk directory"""
+    
+    monkeypatch.setenv('PYCFD_CACHE_DIR', junk_dir + 'cache/')
+
+
+
+def test_lazy_imports():
+    """Test: generating a mesh doesn't import Matplotlib"""
+    
+    os.makedirs(junk_dir, exist_ok=True)
+    mesh_file = junk_dir + 'test_cli_lazy.mesh'
+    code = ('import sys; from pycfd import pycli; '
+            'code = pycli.main(["-q", "mesh", "' + parent_dir + 'test_geometric.input", "' +
+            mesh_file + '", "--no-cache"]); '
+            'print(code, "matplotlib" in sys.modules)')
+    env = dict(os.environ,
+               PYTHONPATH=os.path.dirname(os.path.dirname(os.path.abspath(pycfd.__file__))))
+    output = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True,
+                            text=True, check=True).stdout
+    
+    success = (output.split() == ['0', 'False']) and os.path.exists(mesh_file)
+    
+    assert success
+
+
+def test_subcommands(capsys):
+    """Test: mesh, convert, inspect, assemble and plot a mesh"""
+    
+    os.makedirs(junk_dir, exist_ok=True)
+    mesh_file = junk_dir + 'test_cli.mesh'
+    binary_file = junk_dir + 'test_cli_binary.mesh'
+    assembled_file = junk_dir + 'test_cli_assembled.mesh'
+    image_file = junk_dir + 'test_cli.png'
+    exit_codes = [pycli.main(['mesh', parent_dir + 'test_geometric.input', mesh_file]),
+                  pycli.main(['convert', mesh_file, binary_file, '--format', 'binary',
+                              '--dtype', 'float32']),
+                  pycli.main(['assemble', mesh_file, '-o', assembled_file]),
+                  pycli.main(['plot', binary_file, '-o', image_file])]
+    capsys.readouterr()
+    exit_codes.append(pycli.main(['inspect', binary_file]))
+    lines = dict(line.split(None, 1) for line in
+                 capsys.readouterr().out.replace('min width', 'min_width').splitlines())
+    mesh = pymesh.read_mesh(mesh_file)
+    binary_mesh = pymesh.read_mesh(binary_file)
+    
+    success = ((exit_codes == [0, 0, 0, 0, 0]) and
+               pymesh.is_binary_mesh(binary_file) and os.path.exists(image_file) and
+               (binary_mesh['face_nodes'].dtype == np.float32) and
+               np.allclose(binary_mesh['face_nodes'], mesh['face_nodes'], rtol=1e-7) and
+               np.array_equal(pymesh.read_mesh(assembled_file)['face_nodes'],
+                              mesh['face_nodes']) and
+               (lines['format'] == 'binary') and (lines['cells'] == '8') and
+               (lines['precision'] == 'float32') and
+               np.isclose(float(lines['min_width']), np.diff(mesh['face_nodes']).min()))
+    
+    assert success
+
+
+def test_errors(capsys):
+    """Test: a failing subcommand prints the error and exits with code 1"""
+    
+    exit_code = pycli.main(['inspect', parent_dir + 'test_missing.mesh'])
+    stderr = capsys.readouterr().err
+    
+    success = (exit_code == 1) and stderr.startswith('ERROR')
+    
+    assert success
+    
+    # wrong arguments are reported by argparse
+    with pytest.raises(SystemExit):
+        pycli.main(['mesh', parent_dir + 'test_geometric.input', '--format', 'csv'])
+
+
+
+if __name__ == '__main__':
+    import context
+    
+    parent_dir = './data/'
+    junk_dir = './junk/'
+    
+    test_lazy_imports()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+
+"""
+Unit tests for the grid-convergence studies
+
+To run all tests: navigate to the top-level directory and execute:
+pytest
+
+To run tests for just one file:
+pytest file_to_test.py
+
+"""
+
+import multiprocessing as mp
+import numpy as np
+import pytest
+from pycfd import pymesh, pysolver, pyconvergence
+
+# parent directory used for data files, w.r.t. to the MAIN project directory
+parent_dir = 'tests/data/'
+# directory used for junk data created by tests
+junk_dir = 'tests/junk/'
+
+
+def geometric_mesh(N_fv, ratio=1.01):
+    """Geometric mesh in [0, 1]"""
+    
+    geometry = {'xf_0': 0.0, 'xf_N': 1.0, 'N_fv': N_fv, 'spacing': 'geometric',
+                'expansion_ratio': ratio}
+    
+    return pymesh.generate_mesh(geometry)
+
+
+def solve_sine(mesh, conductivity):
+    """Diffusion with exact solution sin(pi*x) (second-order accurate)"""
+    
+    source = conductivity * np.pi**2 * np.sin(np.pi * mesh.centroids)
+    
+    return pysolver.solve_diffusion(mesh, conductivity, source)
+
+
+def solve_integral(mesh, conductivity):
+    """Integral of the solution of solve_sine() (exact: 2/pi)"""
+    
+    return np.dot(solve_sine(mesh, conductivity), mesh.volumes)
+
+
+
+def test_nested_meshes():
+    """Test: coarse levels are strided views of the finest face nodes"""
+    
+    mesh = geometric_mesh(64)
+    meshes = pyconvergence.nested_meshes(mesh, 4)
+    values = np.arange(64.0)
+    coarse_values = pyconvergence.restrict_field(values, mesh, 8)
+    
+    success = (([m.N_fv for m in meshes] == [64, 32, 16, 8]) and
+               all(np.shares_memory(m.face_nodes, mesh.face_nodes) for m in meshes) and
+               np.array_equal(meshes[3].face_nodes, mesh.face_nodes[::8]) and
+               np.allclose(np.dot(coarse_values, meshes[3].volumes),
+                           np.dot(values, mesh.volumes)))
+    
+    assert success
+    
+    with pytest.raises(ValueError):
+        pyconvergence.nested_meshes(mesh, 8)
+
+
+def test_scalar_formulas():
+    """Test: order, Richardson extrapolation and GCI of f = 1 + h^2"""
+    
+    f_fine, f_medium, f_coarse = 1 + 0.1**2, 1 + 0.2**2, 1 + 0.4**2
+    order = pyconvergence.observed_order(f_fine, f_medium, f_coarse)
+    extrapolated = pyconvergence.richardson_extrapolation(f_fine, f_medium, order)
+    gci = pyconvergence.grid_convergence_index(f_fine, f_medium, order)
+    
+    success = (np.isclose(order, 2.0) and np.isclose(extrapolated, 1.0) and
+               np.isclose(gci, 1.25 * 0.03 / 1.01 / 3) and
+               np.isnan(pyconvergence.observed_order(1.0, 1.0, 2.0)))
+    
+    assert success
+
+
+@pytest.mark.parametrize('max_workers', [1, 3])
+def test_convergence_study(max_workers):
+    """Test: second order of the diffusion solver, fields and scalars"""
+    
+    mesh = geometric_mesh(512)
+    # exact averages of the solution over the cells of the coarsest mesh
+    xf = mesh.face_nodes[::8]
+    exact = (np.cos(np.pi * xf[:-1]) - np.cos(np.pi * xf[1:])) / (np.pi * np.diff(xf))
+    study = pyconvergence.convergence_study(mesh, solve_sine, 4, args=(2.0,),
+                                            max_workers=max_workers)
+    scalar_study = pyconvergence.convergence_study(mesh, solve_integral, 3, args=(2.0,),
+                                                   max_workers=max_workers)
+    
+    success = ((study['N_fv'] == [512, 256, 128, 64]) and
+               np.allclose(study['orders'], 2.0, atol=0.05) and
+               (study['restricted'][0].shape == (64,)) and
+               np.allclose(study['solutions'][0], solve_sine(mesh, 2.0)) and
+               (study['gci'] < study['gci_medium']) and
+               np.isclose(study['asymptotic_ratio'], 1.0, atol=0.05) and
+               # the extrapolation is closer to the exact solution
+               (np.abs(study['extrapolated'] - exact).max() <
+                0.01 * np.abs(study['restricted'][0] - exact).max()) and
+               np.isclose(scalar_study['order'], 2.0, atol=0.05) and
+               (abs(scalar_study['extrapolated'] - 2/np.pi) <
+                0.01 * abs(scalar_study['solutions'][0] - 2/np.pi)) and
+               (abs(scalar_study['solutions'][0] - 2/np.pi) <
+                scalar_study['gci'] * 2/np.pi))
+    
+    assert success
+    
+    with pytest.raises(ValueError):
+        pyconvergence.convergence_study(mesh, solve_sine, 2, args=(2.0,))
+
+
+
+@pytest.mark.parametrize('start_method', ['fork', 'spawn'])
+def test_start_method(start_method):
+    """Test: same study with the meshes inherited or pickled by the workers"""
+    
+    if start_method not in mp.get_all_start_methods():
+        pytest.skip('start method ' + start_method + ' not available')
+    mesh = geometric_mesh(64)
+    study = pyconvergence.convergence_study(mesh, solve_integral, 3, args=(2.0,),
+                                            max_workers=3,
+                                            mp_context=mp.get_context(start_method))
+    sequential = pyconvergence.convergence_study(mesh, solve_integral, 3, args=(2.0,),
+                                                 max_workers=1)
+    
+    success = study['solutions'] == sequential['solutions']
+    
+    assert success
+
+
+if __name__ == '__main__':
+    import context
+    
+    parent_dir = './data/'
+    junk_dir = './junk/'
+    
+    test_nested_meshes()
+    test_scalar_formulas()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+
+"""
+Unit tests for the backends of the kernels
+
+To run all tests: navigate to the top-level directory and execute:
+pytest
+
+To run tests for just one file:
+pytest file_to_test.py
+
+"""
+
+import os
+import subprocess
+import sys
+import numpy as np
+import pytest
+import pycfd
+from pycfd import pykernels, pymesh, pysolver
+
+# parent directory used for data files, w.r.t. to the MAIN project directory
+parent_dir = 'tests/data/'
+# directory used for junk data created by tests
+junk_dir = 'tests/junk/'
+
+
+@pytest.fixture(params=pykernels.KERNEL_BACKENDS)
+def kernel_backend(request, monkeypatch):
+    """Run the test with every backend (skipped if not available)"""
+    
+    if request.param not in pykernels.available_backends():
+        pytest.skip('kernel backend ' + request.param + ' not available')
+    monkeypatch.setattr(pykernels, '_backend', request.param)
+    
+    return request.param
+
+
+def random_system(N, seed=0):
+    """Diagonally dominant tridiagonal system in banded form"""
+    
+    rng = np.random.default_rng(seed)
+    A = rng.uniform(-1, 0, (3, N))
+    A[1] = 2.5 + rng.uniform(0, 1, N)
+    A[0, 0] = 0.0
+    A[2, -1] = 0.0
+    b = rng.uniform(-1, 1, N)
+    
+    return A, b
+
+
+
+def test_thomas_kernels(kernel_backend):
+    """Test: factorization and sweeps vs dense solver, in place"""
+    
+    A, b = random_system(500)
+    x_dense = np.linalg.solve(pysolver.banded_to_dense(A), b)
+    factors = np.empty((2, 500))
+    pysolver.factor_tridiagonal(A, out=factors)
+    x = pysolver.solve_factored(A[0], factors, b)
+    # the right-hand side overwritten with the solution
+    x_inplace = b.copy()
+    pysolver.solve_factored(A[0], factors, x_inplace, out=x_inplace)
+    
+    success = ((pykernels.get_backend() == kernel_backend) and
+               np.allclose(x, x_dense, rtol=0, atol=1e-12) and
+               np.array_equal(x_inplace, x) and
+               np.allclose(pysolver.solve_tridiagonal(A[:, :1], b[:1]), b[0] / A[1, 0]))
+    
+    assert success
+
+
+def test_same_solution(kernel_backend):
+    """Test: every backend gives the solution of the reference backend"""
+    
+    geometry = {'xf_0': 0.0, 'xf_N': 1.0, 'N_fv': 10**4, 'spacing': 'geometric',
+                'expansion_ratio': 1.0005}
+    mesh = pymesh.generate_mesh(geometry)
+    args = (1 + mesh.centroids, np.sin(mesh.centroids), ('neumann', 1.0),
+            ('dirichlet', 2.0))
+    phi = pysolver.solve_diffusion(mesh, *args)
+    A, b = pysolver.assemble_diffusion(mesh, *args)
+    factors = np.empty((2, mesh.N_fv))
+    pykernels.get_kernel('factor_tridiagonal', 'numpy')(*A, *factors)
+    phi_reference = np.empty(mesh.N_fv)
+    pykernels.get_kernel('solve_factored', 'numpy')(A[0], *factors, b, phi_reference)
+    
+    success = np.allclose(phi, phi_reference, rtol=1e-13, atol=0)
+    
+    assert success
+
+
+def test_backend_selection(monkeypatch):
+    """Test: environment variable, fallback without Numba, errors"""
+    
+    monkeypatch.setattr(pykernels, '_backend', None)
+    monkeypatch.setenv(pykernels.BACKEND_VARIABLE, 'numpy')
+    from_environment = pykernels.get_backend()
+    
+    # Numba not installed
+    monkeypatch.setattr(pykernels, 'available_backends', lambda: ('numpy',))
+    monkeypatch.setattr(pykernels, '_backend', None)
+    monkeypatch.setenv(pykernels.BACKEND_VARIABLE, 'numba')
+    fallback = pykernels.get_backend()
+    auto = pykernels.set_backend('auto')
+    
+    success = (from_environment == 'numpy') and (fallback == 'numpy') and (auto == 'numpy')
+    
+    assert success
+    
+    with pytest.raises(ValueError, match='not available'):
+        pykernels.set_backend('numba')
+    with pytest.raises(ValueError, match='Unknown kernel backend'):
+        pykernels.set_backend('cuda')
+    with pytest.raises(ValueError, match='Unknown kernel'):
+        pykernels.get_kernel('thomas')
+
+
+def test_without_numba():
+    """Test: the library imports and solves when Numba can't be imported"""
+    
+    code = ('import sys; sys.modules["numba"] = None; '
+            'import numpy as np; from pycfd import pykernels, pysolver; '
+            'A = np.array([[0.0, -1.0], [2.0, 2.0], [-1.0, 0.0]]); '
+            'x = pysolver.solve_tridiagonal(A, np.array([1.0, 1.0])); '
+            'print(pykernels.get_backend(), np.allclose(x, 1.0))')
+    env = dict(os.environ,
+               PYTHONPATH=os.path.dirname(os.path.dirname(os.path.abspath(pycfd.__file__))))
+    env.pop(pykernels.BACKEND_VARIABLE, None)
+    output = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True,
+                            text=True, check=True).stdout
+    
+    success = output.split() == ['numpy', 'True']
+    
+    assert success
+
+
+
+if __name__ == '__main__':
+    import context
+    
+    parent_dir = './data/'
+    junk_dir = './junk/'
+    
+    test_without_numba()
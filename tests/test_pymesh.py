@@ -11,6 +11,7 @@ pytest file_to_test.py
 
 """
 
+import os
 import numpy as np
 import pytest
 from pycfd import pymesh
@@ -21,6 +22,13 @@ parent_dir = 'tests/data/'
 junk_dir = 'tests/junk/'
 
 
+@pytest.fixture(autouse=True)
+def junk_mesh_cache(monkeypatch):
+    """Keep the meshes cached by the tests in the junk directory"""
+    
+    monkeypatch.setenv('PYCFD_CACHE_DIR', junk_dir + 'cache/')
+
+
 
 def test_read_mesh_1D():
     """Test: read 1D .mesh file"""
@@ -38,6 +46,40 @@ def test_read_mesh_1D():
     assert success
 
 
+def test_read_mesh_chunks(monkeypatch):
+    """Test: read .mesh file in chunks smaller than a line"""
+    
+    mesh_file = parent_dir + 'test.mesh'
+    mesh_whole = pymesh.read_mesh(mesh_file)
+    for chunk_size in [1, 3, 7, 64]:
+        monkeypatch.setattr(pymesh, 'TEXT_CHUNK_SIZE', chunk_size)
+        mesh_read = pymesh.read_mesh(mesh_file)
+        
+        success = ((np.array_equal(mesh_whole['centroids'], mesh_read['centroids'])) and 
+            (np.array_equal(mesh_whole['face_nodes'], mesh_read['face_nodes'])))
+        
+        assert success
+
+
+@pytest.mark.parametrize('mesh_file', ['test_empty.mesh', 'test_whitespace.mesh'])
+def test_read_empty_mesh(mesh_file):
+    """Test: reading an empty (or whitespace-only) .mesh file raises EOFError"""
+    
+    with pytest.raises(EOFError, match="ERROR: Empty mesh file"):
+        pymesh.read_mesh(parent_dir + mesh_file)
+
+
+def test_read_invalid_mesh():
+    """Test: reading a .mesh file with invalid coordinates raises ValueError"""
+    
+    mesh_file = junk_dir + 'test_read_invalid_mesh.mesh'
+    with open(mesh_file, 'w') as file:
+        file.write('CENTROID COORDINATES\n0\nabc\n\nFACE NODES COORDINATES\n-1\n1\n')
+    
+    with pytest.raises(ValueError, match="Invalid coordinates"):
+        pymesh.read_mesh(mesh_file)
+
+
 def test_print_mesh():
     """Test: print mesh to .mesh file"""
     
@@ -72,6 +114,59 @@ def test_print_mesh():
     assert success
 
 
+def test_binary_mesh():
+    """Test: print and read back a binary .mesh file (auto-detected format)"""
+    
+    mesh_exact = {'centroids': np.array([0, 0.2, 0.4, 0.6, 0.8, 1]),
+            'face_nodes':np.array( [-0.1, 0.1, 0.3, 0.5, 0.7, 0.9, 1.1])
+            }
+    mesh_file = junk_dir + 'test_binary_mesh.mesh'
+    pymesh.print_mesh(mesh_exact, mesh_file, file_format='binary')
+    
+    for mmap in [False, True]:
+        mesh_read = pymesh.read_mesh(mesh_file, mmap=mmap)
+        
+        success = (pymesh.is_binary_mesh(mesh_file) and
+            (np.array_equal(mesh_exact['centroids'], mesh_read['centroids'])) and 
+            (np.array_equal(mesh_exact['face_nodes'], mesh_read['face_nodes'])))
+        
+        assert success
+    
+    # only a slice of the memory-mapped mesh is touched
+    assert mesh_read['face_nodes'][2:4].tolist() == [0.3, 0.5]
+
+
+def test_binary_mesh_byte_order():
+    """Test: binary .mesh file with non-native byte order and float32"""
+    
+    xC = np.array([0, 0.2, 0.4], dtype='>f4')
+    xf = np.array([-0.1, 0.1, 0.3, 0.5], dtype='>f4')
+    mesh_file = junk_dir + 'test_binary_mesh_byte_order.mesh'
+    pymesh.print_mesh({'centroids': xC, 'face_nodes': xf}, mesh_file, 'binary')
+    mesh_read = pymesh.read_mesh(mesh_file)
+    
+    success = ((mesh_read['centroids'].dtype == np.dtype('>f4')) and
+               np.array_equal(mesh_read['centroids'], xC) and 
+               np.array_equal(mesh_read['face_nodes'], xf))
+    
+    assert success
+
+
+def test_truncated_binary_mesh():
+    """Test: a binary .mesh file shorter than declared in its header"""
+    
+    mesh_exact = {'centroids': np.array([0, 0.2, 0.4, 0.6, 0.8, 1]),
+            'face_nodes':np.array( [-0.1, 0.1, 0.3, 0.5, 0.7, 0.9, 1.1])
+            }
+    mesh_file = junk_dir + 'test_truncated_binary_mesh.mesh'
+    pymesh.print_mesh(mesh_exact, mesh_file, file_format='binary')
+    with open(mesh_file, 'r+b') as file:
+        file.truncate(pymesh.BINARY_HEADER_SIZE + 8)
+    
+    with pytest.raises(EOFError, match="Truncated binary mesh file"):
+        pymesh.read_mesh(mesh_file)
+
+
 def test_1D_cell_center_mesh():
     """Test: create 1D finite volume mesh"""
     
@@ -94,6 +189,668 @@ def test_1D_cell_center_mesh():
     assert success
 
 
+def test_1D_geometric_mesh():
+    """Test: graded face nodes are the same of the sequential recurrence"""
+    
+    input_file = parent_dir + 'test_geometric.input'
+    mesh_file = junk_dir + 'test_1D_geometric_mesh.mesh'
+    pymesh.mesher(input_file, mesh_file)
+    mesh_created = pymesh.read_mesh(mesh_file)
+    
+    # reference: x_f(i) = x_f(i-1) + h_1*alpha^(i-1)
+    xf_0, xf_N, N_fv, exp_ratio = 0, 2, 8, 1.2
+    h_1 = (xf_N - xf_0) * (1 - exp_ratio) / (1 - exp_ratio**N_fv)
+    xf_exact = np.zeros(N_fv+1)
+    xf_exact[-1] = xf_N
+    for i in range(1, N_fv):
+        xf_exact[i] = xf_exact[i-1] + h_1 * exp_ratio**(i-1)
+    xC_exact = (xf_exact[1:] + xf_exact[:-1]) / 2
+    
+    tol = 1e-14
+    diff_centroids = np.abs(mesh_created['centroids'] - xC_exact)
+    diff_faces = np.abs(mesh_created['face_nodes'] - xf_exact)
+    
+    success = (diff_centroids < tol).all() and (diff_faces < tol).all()
+    
+    assert success
+
+
+@pytest.mark.parametrize('spacing, exp_ratio', [('geometric', 0.9),
+                                                ('double-sided', 1.2),
+                                                ('bi-geometric', (1.1, 1.3)),
+                                                ('tanh', 3.0),
+                                                ('roberts', 1.05)])
+def test_grade_face_nodes(spacing, exp_ratio):
+    """Test: graded face nodes are increasing and the end points are exact"""
+    
+    xf_0, xf_N = -0.1, 1.1
+    for N_fv in [1, 2, 7, 8]:
+        xf = pymesh.grade_face_nodes(xf_0, xf_N, N_fv, spacing, exp_ratio)
+        
+        success = ((len(xf) == N_fv+1) and (xf[0] == xf_0) and 
+                   (xf[-1] == xf_N) and (np.diff(xf) > 0).all())
+        
+        assert success
+
+
+def test_double_sided_symmetry():
+    """Test: double-sided and tanh spacings give symmetric cell widths"""
+    
+    tol = 1e-12
+    for spacing, exp_ratio in [('double-sided', 1.2), ('tanh', 3.0)]:
+        for N_fv in [7, 8]:
+            h = np.diff(pymesh.grade_face_nodes(0, 1, N_fv, spacing, exp_ratio))
+            
+            assert (np.abs(h - h[::-1]) < tol).all()
+
+
+def test_bi_geometric_mesh():
+    """Test: bi-geometric spacing read from .input file"""
+    
+    input_file = parent_dir + 'test_bigeometric.input'
+    geometry = pymesh.read_input_geom(input_file)
+    xf = pymesh.grade_face_nodes(geometry['xf_0'], geometry['xf_N'], 
+                                 geometry['N_fv'], geometry['spacing'], 
+                                 geometry['expansion_ratio'])
+    h = np.diff(xf)
+    
+    tol = 1e-12
+    # 4 cells growing from a with ratio 1.1, 3 cells growing from b with 1.3
+    # and the same width for the two cells at the interface
+    success = ((geometry['expansion_ratio'] == (1.1, 1.3)) and 
+               (np.abs(h[1:4] / h[:3] - 1.1) < tol).all() and
+               (np.abs(h[4:-1] / h[5:] - 1.3) < tol).all() and
+               (abs(h[3] - h[4]) < tol))
+    
+    assert success
+
+
+def test_unknown_spacing():
+    """Test: unknown spacing raises an error"""
+    
+    with pytest.raises(ValueError, match="Unknown spacing"):
+        pymesh.grade_face_nodes(0, 1, 4, 'cubic', 1.1)
+
+
+@pytest.mark.parametrize('spacing, exp_ratio', [('geometric', 1.0),
+                                                ('double-sided', 1.0),
+                                                ('bi-geometric', (1.0, 1.0)),
+                                                ('tanh', 0.0)])
+def test_uniform_limit(spacing, exp_ratio):
+    """Test: the limits alpha = 1 and delta = 0 of the laws give a uniform mesh"""
+    
+    xf = pymesh.grade_face_nodes(-1.0, 2.0, 12, spacing, exp_ratio)
+    
+    success = np.allclose(xf, np.linspace(-1.0, 2.0, 13), rtol=0, atol=1e-14)
+    
+    assert success
+
+
+@pytest.mark.parametrize('exp_ratio', [1.1, 1/1.1])
+def test_geometric_large_N(exp_ratio):
+    """Test: no overflow of the geometric series with many cells"""
+    
+    xf = pymesh.grade_face_nodes(0.0, 1.0, 20000, 'geometric', exp_ratio)
+    widths = np.diff(xf)
+    # the largest cells (the series converges to 1/(1 - 1/alpha) of the largest)
+    largest = widths[-10:] if exp_ratio > 1 else widths[:10]
+    alpha = max(exp_ratio, 1/exp_ratio)
+    
+    success = (np.isclose(xf[-1], 1.0, rtol=0, atol=1e-14) and
+               (widths >= 0).all() and
+               np.isclose(largest.max(), 1 - 1/alpha, rtol=1e-12) and
+               np.allclose(largest[1:] / largest[:-1], exp_ratio, rtol=1e-12))
+    
+    assert success
+
+
+@pytest.mark.parametrize('spacing, exp_ratio', [('geometric', 0.0),
+                                                ('geometric', -1.1),
+                                                ('geometric', None),
+                                                ('double-sided', np.nan),
+                                                ('bi-geometric', 1.1),
+                                                ('bi-geometric', (1.1, 0.0)),
+                                                ('tanh', -1.0),
+                                                ('roberts', 1.0),
+                                                ('roberts', 0.5)])
+def test_invalid_grading(spacing, exp_ratio):
+    """Test: degenerate parameters of the laws raise an error"""
+    
+    with pytest.raises(ValueError, match='ERROR'):
+        pymesh.grade_face_nodes(0.0, 1.0, 8, spacing, exp_ratio)
+
+
+def test_generate_mesh():
+    """Test: create 1D finite volume mesh in memory, with derived quantities"""
+    
+    geometry = pymesh.read_input_geom(parent_dir + 'test_FV_input.input')
+    mesh = pymesh.generate_mesh(geometry)
+    
+    tol = 1e-10
+    success = ((len(mesh) == 6) and
+               (np.abs(mesh.cell_widths - 0.2) < tol).all() and
+               (np.abs(mesh.volumes - 0.2) < tol).all() and
+               (np.abs(mesh.face_distances[1:-1] - 0.2) < tol).all() and
+               (np.abs(mesh.face_distances[[0, -1]] - 0.1) < tol).all() and
+               (np.abs(mesh.face_interp_weights[1:-1] - 0.5) < tol).all() and
+               (mesh.face_interp_weights[0] == 0) and
+               (mesh.face_interp_weights[-1] == 1))
+    
+    assert success
+    # derived quantities are computed once and shared
+    assert mesh.cell_widths is mesh.cell_widths
+    assert not mesh.cell_widths.flags.writeable
+
+
+def test_mesh_interp_weights():
+    """Test: interpolation weights on a non-uniform mesh"""
+    
+    mesh = pymesh.Mesh([0.5, 2.0], [0.0, 1.0, 3.0])
+    # face at x = 1 between centroids 0.5 and 2: w = (2 - 1)/(2 - 0.5)
+    tol = 1e-14
+    success = ((abs(mesh.face_interp_weights[1] - 2/3) < tol) and
+               np.array_equal(mesh.face_distances, [0.5, 1.5, 1.0]))
+    
+    assert success
+
+
+@pytest.mark.parametrize('spacing, exp_ratio', [('uniform', 1.0), 
+                                                   ('geometric', 1.02),
+                                                   ('geometric', 1.2)])
+def test_locate_points(spacing, exp_ratio):
+    """Test: cells containing the points, same as a binary search"""
+    
+    geometry = {'xf_0': -1.0, 'xf_N': 2.0, 'N_fv': 100, 'spacing': spacing,
+                'expansion_ratio': exp_ratio}
+    mesh = pymesh.generate_mesh(geometry)
+    xf = mesh.face_nodes
+    points = np.concatenate([np.random.default_rng(0).uniform(-1, 2, 10**5), xf])
+    cells = mesh.locate(points)
+    cells_exact = np.minimum(np.searchsorted(xf, points, side='right') - 1, 99)
+    
+    success = (np.array_equal(cells, cells_exact) and 
+               (mesh.locate(2.0)[0] == 99) and
+               # the index is cached on the mesh
+               (mesh._get_point_index() is mesh._get_point_index()))
+    
+    assert success
+
+
+def test_probe_points():
+    """Test: linear interpolation between the centroids"""
+    
+    mesh = pymesh.Mesh([0.5, 2.0, 3.5], [0.0, 1.0, 3.0, 4.0])
+    points = [0.0, 0.25, 0.5, 1.0, 2.0, 3.0, 4.0]
+    values = mesh.probe(3*mesh.centroids + 1, points)
+    # constant between the boundaries and the first/last centroids
+    values_exact = [2.5, 2.5, 2.5, 4.0, 7.0, 10.0, 11.5]
+    
+    success = np.allclose(values, values_exact, rtol=0, atol=1e-14)
+    
+    assert success
+
+
+def test_points_outside():
+    """Test: policies for the points outside the mesh"""
+    
+    mesh = pymesh.Mesh([0.5, 2.0, 3.5], [0.0, 1.0, 3.0, 4.0])
+    points = [-1.0, 0.5, 5.0, np.nan]
+    
+    one_cell = pymesh.Mesh([0.5], [0.0, 1.0])
+    
+    # NaN points are never clipped: -1 with both 'clip' and 'mask'
+    success = (np.array_equal(mesh.locate(points, 'clip'), [0, 0, 2, -1]) and
+               np.array_equal(mesh.locate(points, 'mask'), [-1, 0, -1, -1]) and
+               np.array_equal(mesh.probe(mesh.centroids, points, 'mask'), 
+                              [np.nan, 0.5, np.nan, np.nan], equal_nan=True) and
+               np.array_equal(mesh.probe(mesh.centroids, points, 'clip'), 
+                              [0.5, 0.5, 3.5, np.nan], equal_nan=True) and
+               np.array_equal(one_cell.locate(points, 'clip'), [0, 0, 0, -1]) and
+               np.array_equal(one_cell.probe([7.0], points, 'mask'), 
+                              [np.nan, 7.0, np.nan, np.nan], equal_nan=True))
+    
+    assert success
+    
+    with pytest.raises(ValueError, match="outside the mesh"):
+        mesh.locate(points)
+    with pytest.raises(ValueError, match="Unknown policy"):
+        mesh.locate(points, 'extrapolate')
+
+
+def test_mesher_returns_mesh():
+    """Test: mesh returned by mesher() is the same saved to file"""
+    
+    input_file = parent_dir + 'test_geometric.input'
+    mesh_file = junk_dir + 'test_mesher_returns_mesh.mesh'
+    mesh = pymesh.mesher(input_file, mesh_file, file_format='binary')
+    mesh_read = pymesh.read_mesh(mesh_file)
+    
+    success = (isinstance(mesh, pymesh.Mesh) and 
+               np.array_equal(mesh['centroids'], mesh_read['centroids']) and
+               np.array_equal(mesh['face_nodes'], mesh_read['face_nodes']))
+    
+    assert success
+
+
+def test_read_mesh_type():
+    """Test: read_mesh() returns a Mesh for every file format"""
+    
+    input_file = parent_dir + 'test_geometric.input'
+    mesh = pymesh.mesher(input_file, junk_dir + 'test_read_mesh_type.mesh')
+    meshes = []
+    for file_format in ['text', 'binary', 'parametric']:
+        mesh_file = junk_dir + 'test_read_mesh_type_' + file_format + '.mesh'
+        pymesh.print_mesh(mesh, mesh_file, file_format=file_format)
+        meshes.append(pymesh.read_mesh(mesh_file))
+    
+    success = (all(isinstance(mesh_read, pymesh.Mesh) for mesh_read in meshes) and
+               all(np.allclose(mesh_read.centroids, mesh.centroids, rtol=1e-15) and
+                   np.allclose(mesh_read.volumes, mesh.volumes, rtol=1e-12)
+                   for mesh_read in meshes) and
+               (pymesh.as_mesh(meshes[0]) is meshes[0]) and
+               isinstance(pymesh.as_mesh({'centroids': mesh.centroids,
+                                          'face_nodes': mesh.face_nodes}), pymesh.Mesh))
+    
+    assert success
+
+
+def test_connect_more_meshes():
+    """Test: connect text and binary meshes sharing their interface faces"""
+    
+    face_nodes = [np.array([0, 0.5, 1]), np.array([1, 1.2, 1.4, 2]), np.array([2, 3])]
+    mesh_files = []
+    for i, xf in enumerate(face_nodes):
+        mesh_files.append(junk_dir + 'test_connect_more_meshes_' + str(i) + '.mesh')
+        file_format = 'binary' if i == 1 else 'text'
+        pymesh.print_mesh(pymesh.Mesh((xf[1:] + xf[:-1]) / 2, xf), 
+                          mesh_files[-1], file_format)
+    mesh = pymesh.connect_more_meshes(mesh_files, max_workers=2)
+    
+    xf_exact = np.array([0, 0.5, 1, 1.2, 1.4, 2, 3])
+    xC_exact = (xf_exact[1:] + xf_exact[:-1]) / 2
+    
+    success = (np.array_equal(mesh['face_nodes'], xf_exact) and 
+               np.array_equal(mesh['centroids'], xC_exact))
+    
+    assert success
+
+
+def test_connect_disjoint_meshes():
+    """Test: connecting meshes that do not share the interface face fails"""
+    
+    mesh_files = [parent_dir + 'test.mesh', parent_dir + 'test.mesh']
+    
+    with pytest.raises(ValueError, match="do not share their interface face"):
+        pymesh.connect_more_meshes(mesh_files)
+
+
+@pytest.mark.parametrize('spacing, exp_ratio', [('uniform', None),
+                                                ('geometric', 1.2),
+                                                ('double-sided', 1.2),
+                                                ('bi-geometric', (1.1, 1.3)),
+                                                ('tanh', 3.0),
+                                                ('roberts', 1.05)])
+def test_print_mesh_stream(spacing, exp_ratio):
+    """Test: streamed mesh files are identical to the non-streamed ones"""
+    
+    for N_fv in [1, 7, 8]:
+        geometry = {'xf_0': -0.1, 'xf_N': 1.1, 'N_fv': N_fv, 'spacing': spacing, 
+                    'expansion_ratio': exp_ratio}
+        for file_format in ['text', 'binary']:
+            mesh_file = junk_dir + 'test_print_mesh_stream.mesh'
+            pymesh.print_mesh(pymesh.generate_mesh(geometry), mesh_file, file_format)
+            with open(mesh_file, 'rb') as file:
+                content_exact = file.read()
+            
+            for chunk_size in [1, 3, 100]:
+                pymesh.print_mesh_stream(geometry, mesh_file, file_format=file_format, 
+                                         chunk_size=chunk_size)
+                with open(mesh_file, 'rb') as file:
+                    content = file.read()
+                
+                assert content == content_exact
+
+
+def test_stream_mesher():
+    """Test: stream 1D finite volume mesh from .input file"""
+    
+    input_file = parent_dir + 'test_FV_input.input'
+    mesh_file = junk_dir + 'test_stream_mesher.mesh'
+    pymesh.stream_mesher(input_file, mesh_file, chunk_size=4)
+    mesh_read = pymesh.read_mesh(mesh_file)
+    mesh_exact = pymesh.read_mesh(parent_dir + 'test.mesh')
+    
+    tol = 1e-10
+    diff_centroids = np.abs(mesh_read['centroids'] - mesh_exact['centroids'])
+    diff_faces = np.abs(mesh_read['face_nodes'] - mesh_exact['face_nodes'])
+    
+    success = (diff_centroids < tol).all() and (diff_faces < tol).all()
+    
+    assert success
+
+
+@pytest.mark.parametrize('spacing, exp_ratio', [('uniform', None), 
+                                                   ('geometric', 1.01),
+                                                   ('tanh', 3.0),
+                                                   ('bi-geometric', (1.01, 1.03))])
+def test_parametric_mesh(spacing, exp_ratio):
+    """Test: parametric mesh file regenerates the same coordinates"""
+    
+    geometry = {'xf_0': -1.0, 'xf_N': 2.5, 'N_fv': 1001, 'spacing': spacing,
+                'expansion_ratio': exp_ratio}
+    mesh = pymesh.generate_mesh(geometry)
+    mesh_file = junk_dir + 'test_parametric_mesh.mesh'
+    stream_file = junk_dir + 'test_parametric_mesh_stream.mesh'
+    pymesh.print_mesh(mesh, mesh_file, file_format='parametric')
+    pymesh.print_mesh_stream(geometry, stream_file, file_format='parametric',
+                             chunk_size=100)
+    mesh_read = pymesh.read_mesh(mesh_file)
+    xC, xf = pymesh.read_mesh_range(mesh_file, 300, 700)
+    
+    success = (np.array_equal(mesh_read.centroids, mesh.centroids) and
+               np.array_equal(mesh_read.face_nodes, mesh.face_nodes) and
+               np.array_equal(xC, mesh.centroids[300:700]) and
+               np.array_equal(xf, mesh.face_nodes[300:701]) and
+               # same file when streamed
+               (open(mesh_file).read() == open(stream_file).read()) and
+               (os.path.getsize(mesh_file) < 300))
+    
+    assert success
+
+
+def test_parametric_mesh_errors():
+    """Test: refined meshes can't be parametric, wrong checksums are detected"""
+    
+    geometry = {'xf_0': 0.0, 'xf_N': 1.0, 'N_fv': 10, 'spacing': 'uniform',
+                'expansion_ratio': None}
+    mesh = pymesh.generate_mesh(geometry)
+    mesh_file = junk_dir + 'test_parametric_mesh_errors.mesh'
+    with pytest.raises(ValueError, match="generated from a geometry"):
+        pymesh.print_mesh(pymesh.Mesh(mesh.centroids, mesh.face_nodes), mesh_file,
+                          file_format='parametric')
+    
+    pymesh.print_mesh(mesh, mesh_file, file_format='parametric')
+    with open(mesh_file) as file:
+        content = file.read()
+    with open(mesh_file, 'w') as file:
+        file.write(content.replace('N\n10\n', 'N\n11\n'))
+    with pytest.raises(ValueError, match="checksum"):
+        pymesh.read_mesh(mesh_file)
+    
+    success = pymesh.read_parametric_mesh(mesh_file, verify=False).N_fv == 11
+    
+    assert success
+
+
+def test_read_mesh_range():
+    """Test: range of cells of text and binary mesh files"""
+    
+    mesh = pymesh.read_mesh(parent_dir + 'test.mesh')
+    binary_file = junk_dir + 'test_read_mesh_range.mesh'
+    pymesh.print_mesh(mesh, binary_file, file_format='binary')
+    
+    for mesh_file in [parent_dir + 'test.mesh', binary_file]:
+        xC, xf = pymesh.read_mesh_range(mesh_file, 2, 4)
+    
+        success = (np.array_equal(xC, mesh['centroids'][2:4]) and
+                   np.array_equal(xf, mesh['face_nodes'][2:5]))
+    
+        assert success
+
+
+@pytest.mark.parametrize('file_format', ['text', 'binary', 'parametric'])
+def test_single_precision(file_format):
+    """Test: single precision meshes through generation, files and streaming"""
+    
+    geometry = {'xf_0': 0.0, 'xf_N': 1.0, 'N_fv': 1000, 'spacing': 'geometric',
+                'expansion_ratio': 1.005}
+    mesh = pymesh.generate_mesh(geometry, dtype=np.float32)
+    mesh_double = pymesh.generate_mesh(geometry)
+    mesh_file = junk_dir + 'test_single_precision.mesh'
+    stream_file = junk_dir + 'test_single_precision_stream.mesh'
+    pymesh.print_mesh(mesh, mesh_file, file_format)
+    pymesh.print_mesh_stream(geometry, stream_file, file_format=file_format,
+                             chunk_size=77, dtype=np.float32)
+    mesh_read = pymesh.read_mesh(mesh_file, dtype=np.float32)
+    
+    success = ((mesh.dtype == np.float32) and (mesh.cell_widths.dtype == np.float32) and
+               (mesh.centroids.nbytes == mesh_double.centroids.nbytes // 2) and
+               np.array_equal(mesh.face_nodes, mesh_double.face_nodes.astype(np.float32)) and
+               (mesh_read['centroids'].dtype == np.float32) and
+               np.array_equal(mesh_read['centroids'], mesh.centroids) and
+               np.array_equal(mesh_read['face_nodes'], mesh.face_nodes) and
+               (open(mesh_file, 'rb').read() == open(stream_file, 'rb').read()))
+    
+    assert success
+
+
+@pytest.mark.parametrize('dtype_file, dtype', [(np.float32, np.float64),
+                                               (np.float64, np.float32)])
+def test_parametric_precision(dtype_file, dtype, monkeypatch):
+    """Test: parametric file read in another precision, generated once"""
+    
+    geometry = {'xf_0': 0.0, 'xf_N': 1.0, 'N_fv': 1000, 'spacing': 'geometric',
+                'expansion_ratio': 1.005}
+    mesh_file = junk_dir + 'test_parametric_precision.mesh'
+    pymesh.print_mesh(pymesh.generate_mesh(geometry, dtype=dtype_file), mesh_file,
+                      'parametric')
+    mesh_expected = pymesh.generate_mesh(geometry, dtype=dtype)
+    generated = []
+    generate_mesh = pymesh.generate_mesh
+    def counting_generate_mesh(*args, **kwargs):
+        generated.append(args)
+        return generate_mesh(*args, **kwargs)
+    monkeypatch.setattr(pymesh, 'generate_mesh', counting_generate_mesh)
+    mesh_read = pymesh.read_mesh(mesh_file, dtype=dtype)
+    
+    success = ((len(generated) == 1) and (mesh_read.dtype == dtype) and
+               np.array_equal(mesh_read.centroids, mesh_expected.centroids) and
+               np.array_equal(mesh_read.face_nodes, mesh_expected.face_nodes) and
+               (mesh_read.geometry == geometry))
+    
+    assert success
+
+
+def test_text_digits():
+    """Test: number of significant digits of text mesh files"""
+    
+    mesh = pymesh.read_mesh(parent_dir + 'test.mesh')
+    mesh_file = junk_dir + 'test_text_digits.mesh'
+    pymesh.print_mesh(mesh, mesh_file, digits=4)
+    with open(mesh_file) as file:
+        lines = file.read().split()
+    
+    success = ((lines[2] == '0.000e+00') and (lines[3] == '2.000e-01') and
+               np.allclose(pymesh.read_mesh(mesh_file)['face_nodes'], 
+                           mesh['face_nodes'], rtol=1e-3, atol=0))
+    
+    assert success
+
+
+def test_resolution_warning():
+    """Test: warning when single precision can't resolve the smallest cell"""
+    
+    geometry = {'xf_0': 1000.0, 'xf_N': 1001.0, 'N_fv': 1000, 
+                'spacing': 'geometric', 'expansion_ratio': 1.005}
+    with pytest.warns(RuntimeWarning, match="can't resolve the smallest cell"):
+        pymesh.generate_mesh(geometry, dtype=np.float32)
+    with pytest.raises(ValueError, match="Unknown precision"):
+        pymesh.generate_mesh(geometry, dtype=np.float16)
+    
+    # the same cells close to the origin are resolved
+    geometry['xf_0'] = 0.0
+    geometry['xf_N'] = 1.0
+    
+    success = pymesh.check_resolution(pymesh.generate_mesh(geometry).face_nodes, 
+                                      np.float32)
+    
+    assert success
+
+
+def test_cell_density():
+    """Test: number of cells in bins, with cells crossing the bin edges"""
+    
+    geometry = {'xf_0': 0.0, 'xf_N': 1.0, 'N_fv': 1000, 'spacing': 'geometric', 
+                'expansion_ratio': 1.002}
+    mesh = pymesh.generate_mesh(geometry)
+    xf = mesh.face_nodes
+    # bins at the face nodes: one cell each
+    density_faces = pymesh.cell_density(xf, xf[::10])
+    # bins beyond the mesh are empty
+    density = pymesh.cell_density(xf, np.linspace(-0.5, 1.5, 201))
+    # half of the first cell
+    density_half = pymesh.cell_density(xf, [0.0, 0.5 * xf[1]])
+    
+    success = (np.allclose(density_faces, 10, rtol=0, atol=1e-9) and
+               np.isclose(density.sum(), 1000, rtol=1e-12) and
+               (density[:50] == 0).all() and (density[150:] == 0).all() and
+               np.isclose(density_half[0], 0.5))
+    
+    assert success
+
+
+def test_plot_mesh_lod():
+    """Test: markers only when few face nodes are visible, saved without display"""
+    
+    os.makedirs(junk_dir, exist_ok=True)
+    image_file = junk_dir + 'test_plot_mesh.png'
+    geometry = {'xf_0': 0.0, 'xf_N': 1.0, 'N_fv': 10**5, 'spacing': 'uniform', 
+                'expansion_ratio': None}
+    ax = pymesh.plot_mesh(pymesh.generate_mesh(geometry), max_markers=1000, 
+                          output_file=image_file)
+    _, centroids, face_nodes = ax.lines
+    strip = ax.images[0]
+    drawn_strip = (strip.get_visible() and not face_nodes.get_visible() and
+                   os.path.getsize(image_file) > 0)
+    # zoom in: about 100 cells visible
+    ax.set_xlim(0.5, 0.501)
+    drawn_markers = (face_nodes.get_visible() and not strip.get_visible() and
+                     (len(face_nodes.get_xdata()) <= 103) and 
+                     (len(centroids.get_xdata()) == len(face_nodes.get_xdata()) - 1))
+    # zoom out again
+    ax.set_xlim(0.0, 0.5)
+    
+    success = (drawn_strip and drawn_markers and strip.get_visible() and
+               np.isclose(strip.get_extent()[1], 0.5))
+    
+    assert success
+
+
+def test_mesh_quality():
+    """Test: quality of a generated mesh, whole and streamed in chunks"""
+    
+    geometry = {'xf_0': 1.0, 'xf_N': 3.0, 'N_fv': 1000, 'spacing': 'geometric', 
+                'expansion_ratio': 1.003}
+    mesh = pymesh.generate_mesh(geometry)
+    report = pymesh.validate_mesh(mesh)
+    report_chunks = pymesh.mesh_quality(mesh, chunk_size=7)
+    # chunks of different length, as generated
+    quality = pymesh.MeshQuality(length=2.0)
+    centroid_chunks = pymesh.iter_centroids(geometry, chunk_size=300)
+    for face_chunk in pymesh.iter_face_nodes(geometry, chunk_size=170):
+        quality.update(next(centroid_chunks, []), face_chunk)
+    report_stream = quality.report()
+    widths = mesh.cell_widths
+    
+    success = ((report['errors'] == []) and report['monotonic'] and
+               (report['N_fv'] == 1000) and (report['N_faces'] == 1001) and
+               (report['min_width'] == widths.min()) and 
+               (report['max_width'] == widths.max()) and
+               np.isclose(report['max_ratio'], 1.003) and
+               (report['ratio_counts'].tolist() == [999, 0, 0, 0, 0, 0]) and
+               (report['max_centroid_offset'] < 1e-9) and
+               (abs(report['length_error']) < 1e-15) and
+               all(np.array_equal(report_chunks[key], report[key]) and
+                   np.array_equal(report_stream[key], report[key]) for key in report))
+    
+    assert success
+
+
+@pytest.mark.parametrize('centroids, face_nodes, error', [
+    ([0.5, 1.5], [0.0, 1.0, 2.0, 3.0], 'face nodes for 2 cells'),
+    ([0.5, 1.5, 2.5], [0.0, 2.0, 1.0, 3.0], 'not increasing at 1 cells'),
+    ([0.5, 2.5, 2.9], [0.0, 1.0, 2.0, 3.0], 'centroids outside their cells'),
+    ([0.5, np.nan, 2.5], [0.0, 1.0, 2.0, 3.0], '1 non-finite coordinates')])
+def test_invalid_mesh(centroids, face_nodes, error):
+    """Test: invalid meshes are rejected when read, unless not validated or mapped"""
+    
+    os.makedirs(junk_dir, exist_ok=True)
+    mesh = {'centroids': np.array(centroids), 'face_nodes': np.array(face_nodes)}
+    mesh_file = junk_dir + 'test_invalid_mesh.mesh'
+    pymesh.print_mesh(mesh, mesh_file)
+    with pytest.raises(ValueError, match=error):
+        pymesh.read_mesh(mesh_file)
+    pymesh.print_mesh(mesh, mesh_file, 'binary')
+    with pytest.raises(ValueError, match=error):
+        pymesh.read_mesh(mesh_file)
+    with pytest.raises(ValueError, match=error):
+        pymesh.read_mesh(mesh_file, mmap=True, validate=True)
+    # memory-mapped files are not read entirely unless asked
+    mapped_mesh = pymesh.read_mesh(mesh_file, mmap=True)
+    
+    success = (np.array_equal(pymesh.read_mesh(mesh_file, validate=False)['face_nodes'],
+                              face_nodes) and
+               np.array_equal(mapped_mesh.face_nodes, face_nodes))
+    
+    assert success
+
+
+def test_calculate_expansion_ratio():
+    """Test: expansion ratio of a geometric mesh from its first cell"""
+    
+    input_file = parent_dir + 'test_geometric.input'
+    geometry = pymesh.read_input_geom(input_file)
+    mesh = pymesh.generate_mesh(geometry)
+    h_1 = mesh.cell_widths[0]
+    alpha, err, k, max_iteration_reached = pymesh.calculate_expansion_ratio(
+        geometry['N_fv'], geometry['xf_0'], geometry['xf_N'], h_1)
+    
+    tol = 1e-12
+    success = ((abs(alpha - geometry['expansion_ratio']) < tol) and 
+               (err < tol) and not max_iteration_reached)
+    
+    assert success
+
+
+def test_calculate_expansion_ratio_batch():
+    """Test: many expansion ratios at once, also in inverse mode"""
+    
+    N = np.array([8, 8, 10, 1000, 10**6])
+    alpha_exact = np.array([1.2, 0.8, 1.0, 1.001, 1.00001])
+    L = 2.0
+    h_1 = np.array([L * (1 - alpha) / (1 - alpha**n) if alpha != 1 else L / n 
+                    for n, alpha in zip(N, alpha_exact)])
+    h_N = h_1 * alpha_exact**(N - 1)
+    
+    # plus a case where alpha^N underflows (first cell: h_1 = L*(1 - alpha))
+    # or overflows (last cell: h_N = L*(alpha - 1)/alpha)
+    cases = [(np.append(N, 10**6), np.append(alpha_exact, 0.999), 
+              {'h_1': np.append(h_1, L * (1 - 0.999))}),
+             (np.append(N, 10**6), np.append(alpha_exact, 1.001), 
+              {'h_N': np.append(h_N, L * (1.001 - 1) / 1.001)})]
+    
+    tol = 1e-10
+    for N_case, alpha_case, cell_size in cases:
+        alpha, err, k, max_iteration_reached = pymesh.calculate_expansion_ratio(
+            N_case, 0.0, L, **cell_size)
+        
+        success = ((np.abs(alpha / alpha_case - 1) < tol).all() and 
+                   not max_iteration_reached.any())
+        
+        assert success
+
+
+def test_calculate_expansion_ratio_invalid():
+    """Test: no expansion ratio for a first cell larger than the domain"""
+    
+    alpha, err, k, max_iteration_reached = pymesh.calculate_expansion_ratio(
+        [1, 1, 5, 5], 0.0, 1.0, [1.0, 0.5, 2.0, 1.0])
+    
+    success = (alpha[0] == 1) and np.isnan(alpha[1:3]).all() and (alpha[3] == 0)
+    
+    assert success
+
+
 def test_read_geom():
     """Test: read geometry from .input file"""
     
@@ -148,9 +905,36 @@ if __name__ == '__main__':
     junk_dir = './junk/'       # directory used for junk data created by tests
     
     test_read_mesh_1D()
+    test_read_invalid_mesh()
     #test_raw_mesh_conversion()
     test_print_mesh()
+    test_binary_mesh()
+    test_binary_mesh_byte_order()
+    test_truncated_binary_mesh()
     test_1D_cell_center_mesh()
+    test_1D_geometric_mesh()
+    test_double_sided_symmetry()
+    test_bi_geometric_mesh()
+    test_unknown_spacing()
+    test_generate_mesh()
+    test_mesh_interp_weights()
+    test_probe_points()
+    test_points_outside()
+    test_mesher_returns_mesh()
+    test_read_mesh_type()
+    test_connect_more_meshes()
+    test_connect_disjoint_meshes()
+    test_stream_mesher()
+    test_parametric_mesh_errors()
+    test_read_mesh_range()
+    test_text_digits()
+    test_resolution_warning()
+    test_cell_density()
+    test_plot_mesh_lod()
+    test_mesh_quality()
+    test_calculate_expansion_ratio()
+    test_calculate_expansion_ratio_batch()
+    test_calculate_expansion_ratio_invalid()
     test_read_geom()
     test_check_empty_file()
     test_check_whitespaces_file()
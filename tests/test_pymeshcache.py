@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+"""
+Unit tests for the mesh cache
+
+To run all tests: navigate to the top-level directory and execute:
+pytest
+
+To run tests for just one file:
+pytest file_to_test.py
+
+"""
+
+import os
+import numpy as np
+import pytest
+from pycfd import pymesh, pymeshcache
+
+# parent directory used for data files, w.r.t. to the MAIN project directory
+parent_dir = 'tests/data/'
+# directory used for junk data created by tests
+junk_dir = 'tests/junk/'
+
+
+
+def test_geometry_key(monkeypatch):
+    """Test: the cache key depends on geometry, discretisation method and generator"""
+    
+    geometry = {'xf_0': -0.1, 'xf_N': 1.1, 'N_fv': 6, 'spacing': 'uniform', 'expansion_ratio': None}
+    key = pymeshcache.geometry_key(geometry, 'cellcenter')
+    
+    success = ((key == pymeshcache.geometry_key(dict(geometry), 'cellcenter')) and
+               (key != pymeshcache.geometry_key(geometry, 'cellvertex')) and
+               (key != pymeshcache.geometry_key(dict(geometry, N_fv=7), 'cellcenter')))
+    
+    assert success
+    
+    # a new version of the mesh generator doesn't use the old cached meshes
+    monkeypatch.setattr(pymeshcache, 'GENERATOR_VERSION', pymeshcache.GENERATOR_VERSION + 1)
+    
+    assert key != pymeshcache.geometry_key(geometry, 'cellcenter')
+
+
+def test_cache_hit(monkeypatch):
+    """Test: a cached mesh is returned without generating it again"""
+    
+    cache = pymeshcache.MeshCache(junk_dir + 'test_cache_hit/')
+    cache.clear()
+    input_file = parent_dir + 'test_geometric.input'
+    mesh_file = junk_dir + 'test_cache_hit.mesh'
+    mesh_generated = pymesh.mesher(input_file, mesh_file, cache=cache)
+    
+    def fail(*args):
+        raise AssertionError("mesh generated again")
+    monkeypatch.setattr(pymesh, 'generate_mesh', fail)
+    
+    for file_format in ['text', 'binary']:
+        mesh_cached = pymesh.mesher(input_file, mesh_file, file_format=file_format, 
+                                    cache=cache)
+        mesh_read = pymesh.read_mesh(mesh_file)
+        
+        success = (np.array_equal(mesh_generated['face_nodes'], mesh_cached['face_nodes']) and
+                   np.array_equal(mesh_generated['centroids'], mesh_cached['centroids']) and
+                   np.array_equal(mesh_generated['face_nodes'], mesh_read['face_nodes']))
+        
+        assert success
+    
+    # opt-out: the cache is ignored
+    with pytest.raises(AssertionError, match="mesh generated again"):
+        pymesh.mesher(input_file, mesh_file, use_cache=False, cache=cache)
+
+
+def test_cache_opt_in(monkeypatch):
+    """Test: by default the cache is used only if its directory is set"""
+    
+    cache_dir = junk_dir + 'test_cache_opt_in/'
+    pymeshcache.MeshCache(cache_dir).clear()
+    input_file = parent_dir + 'test_geometric.input'
+    mesh_file = junk_dir + 'test_cache_opt_in.mesh'
+    monkeypatch.setattr(pymeshcache, 'DEFAULT_CACHE_DIR', cache_dir)
+    monkeypatch.delenv(pymeshcache.CACHE_DIR_VARIABLE, raising=False)
+    pymesh.mesher(input_file, mesh_file)
+    not_cached = not os.listdir(cache_dir) if os.path.isdir(cache_dir) else True
+    
+    monkeypatch.setenv(pymeshcache.CACHE_DIR_VARIABLE, cache_dir)
+    pymesh.mesher(input_file, mesh_file)
+    
+    success = (not_cached and (len(os.listdir(cache_dir)) == 1) and
+               not pymeshcache.cache_enabled(False) and pymeshcache.cache_enabled(True))
+    
+    assert success
+
+
+def test_cache_eviction():
+    """Test: the least recently used meshes are removed from a full cache"""
+    
+    # every mesh of 4 cells takes 64 + 9*8 = 136 bytes: room for 2 meshes
+    cache = pymeshcache.MeshCache(junk_dir + 'test_cache_eviction/', max_size=300)
+    cache.clear()
+    keys = []
+    for i, exp_ratio in enumerate([1.1, 1.2, 1.3]):
+        geometry = {'xf_0': 0.0, 'xf_N': 1.0, 'N_fv': 4, 'spacing': 'geometric', 
+                    'expansion_ratio': exp_ratio}
+        keys.append(pymeshcache.geometry_key(geometry, 'cellcenter'))
+        if i == 2:
+            # access the first mesh: the second one becomes the oldest
+            cache.lookup(keys[0])
+        mesh, mesh_file = pymesh.generate_cached_mesh(geometry, cache=cache)
+        if i < 2:
+            # make sure the access times are different
+            os.utime(mesh_file, (i, i))
+    
+    success = (os.path.exists(cache.path(keys[0])) and 
+               not os.path.exists(cache.path(keys[1])) and
+               os.path.exists(cache.path(keys[2])))
+    
+    assert success
+
+
+
+if __name__ == '__main__':
+    import context
+    
+    parent_dir = './data/'
+    junk_dir = './junk/'
+    
+    test_cache_eviction()
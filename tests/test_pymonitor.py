@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+"""
+Unit tests for the monitoring of the mesh operations
+
+To run all tests: navigate to the top-level directory and execute:
+pytest
+
+To run tests for just one file:
+pytest file_to_test.py
+
+"""
+
+import logging
+import os
+import pytest
+from pycfd import pymesh, pymonitor
+
+# parent directory used for data files, w.r.t. to the MAIN project directory
+parent_dir = 'tests/data/'
+# directory used for junk data created by tests
+junk_dir = 'tests/junk/'
+
+
+
+def test_record_mesher():
+    """Test: phases of mesher() are recorded with time, bytes and allocations"""
+    
+    input_file = parent_dir + 'test_geometric.input'
+    mesh_file = junk_dir + 'test_record_mesher.mesh'
+    with pymonitor.record() as records:
+        pymesh.mesher(input_file, mesh_file, use_cache=False)
+    records = {phase_record.name: phase_record for phase_record in records}
+    
+    success = ((list(records) == ['mesher/read_input_geom', 
+                                  'mesher/generate_mesh', 
+                                  'mesher/print_mesh', 
+                                  'mesher']) and
+               (records['mesher/read_input_geom'].bytes_read == os.path.getsize(input_file)) and
+               # 8 centroids and 9 face nodes
+               (records['mesher/generate_mesh'].bytes_allocated == 17*8) and
+               (records['mesher/print_mesh'].bytes_written == os.path.getsize(mesh_file)) and
+               (records['mesher'].wall_time >= records['mesher/print_mesh'].wall_time))
+    
+    assert success
+
+
+def test_record_disabled():
+    """Test: no records and no callbacks left once the block is over"""
+    
+    with pymonitor.record() as records:
+        pass
+    pymesh.read_mesh(parent_dir + 'test.mesh')
+    
+    success = (records == []) and (pymonitor._callbacks == []) 
+    
+    assert success
+
+
+def test_callback_registry():
+    """Test: a registered callback receives the records of the phases"""
+    
+    names = []
+    callback = lambda phase_record: names.append(phase_record.name)
+    pymonitor.add_callback(callback)
+    try:
+        mesh = pymesh.read_mesh(parent_dir + 'test.mesh')
+    finally:
+        pymonitor.remove_callback(callback)
+    
+    assert names == ['read_mesh']
+
+
+def test_quiet(capsys, caplog):
+    """Test: records propagate by default, printed once set up, unless quiet"""
+    
+    input_file = parent_dir + 'test_FV_input.input'
+    logger = pymonitor.logger
+    state = (list(logger.handlers), logger.propagate, logger.level)
+    try:
+        # importing the library doesn't print anything: the records go to
+        # the handlers of the application
+        logger.removeHandler(pymonitor._handler)
+        logger.propagate = True
+        with caplog.at_level(logging.INFO, logger='pycfd'):
+            pymesh.read_input_geom(input_file)
+        propagated = any('Reading geometry from' in message for message in caplog.messages)
+        assert propagated and (capsys.readouterr().out == '')
+        
+        pymonitor.setup_logging(quiet=True)
+        pymesh.read_input_geom(input_file)
+        assert capsys.readouterr().out == ''
+        
+        pymonitor.set_quiet(False)
+        pymesh.read_input_geom(input_file)
+        assert 'Reading geometry from' in capsys.readouterr().out
+    finally:
+        logger.handlers[:] = state[0]
+        logger.propagate = state[1]
+        logger.setLevel(state[2])
+
+
+if __name__ == '__main__':
+    import context
+    
+    parent_dir = './data/'
+    junk_dir = './junk/'
+    
+    test_record_mesher()
+    test_record_disabled()
+    test_callback_registry()
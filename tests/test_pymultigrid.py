@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+
+"""
+Unit tests for the geometric multigrid solver
+
+To run all tests: navigate to the top-level directory and execute:
+pytest
+
+To run tests for just one file:
+pytest file_to_test.py
+
+"""
+
+import numpy as np
+import pytest
+from pycfd import pymesh, pysolver, pymultigrid
+
+# parent directory used for data files, w.r.t. to the MAIN project directory
+parent_dir = 'tests/data/'
+# directory used for junk data created by tests
+junk_dir = 'tests/junk/'
+
+
+def graded_mesh(N_fv, ratio=1e4):
+    """Geometric mesh in [0, 1] with the given ratio between the last and the first cell"""
+    
+    geometry = {'xf_0': 0.0, 'xf_N': 1.0, 'N_fv': N_fv, 'spacing': 'geometric',
+                'expansion_ratio': ratio**(1/N_fv)}
+    
+    return pymesh.generate_mesh(geometry)
+
+
+
+def test_build_hierarchy():
+    """Test: agglomeration of cell pairs, views of the face nodes"""
+    
+    mesh = graded_mesh(40)
+    meshes = pymultigrid.build_hierarchy(mesh, coarsest_size=4)
+    
+    success = (([m.N_fv for m in meshes] == [40, 20, 10, 5, 3]) and
+               # even number of cells: views of the finest face nodes
+               all(np.shares_memory(m.face_nodes, mesh.face_nodes) for m in meshes[:4]) and
+               np.array_equal(meshes[3].face_nodes, mesh.face_nodes[::8]) and
+               # odd number of cells: the last one is not agglomerated (a copy)
+               np.array_equal(meshes[4].face_nodes, mesh.face_nodes[[0, 16, 32, 40]]) and
+               not np.shares_memory(meshes[4].face_nodes, mesh.face_nodes) and
+               all(np.allclose(m.centroids, 0.5*(m.face_nodes[1:] + m.face_nodes[:-1]))
+                   for m in meshes))
+    
+    assert success
+
+
+def test_multigrid_vs_thomas():
+    """Test: same solution as the direct solver, for all boundary conditions"""
+    
+    mesh = graded_mesh(1001)
+    conductivity = 1 + mesh.centroids
+    for bc_left, bc_right in [(('dirichlet', 1.0), ('dirichlet', 2.0)),
+                              (('neumann', 1.0), ('dirichlet', 2.0)),
+                              (('dirichlet', 1.0), ('neumann', -1.0))]:
+        for cycle in ['V', 'W']:
+            phi, info = pymultigrid.solve_diffusion_multigrid(
+                mesh, conductivity, 1.0, bc_left, bc_right, cycle=cycle, tol=1e-12)
+            phi_direct = pysolver.solve_diffusion(mesh, conductivity, 1.0, bc_left,
+                                                  bc_right)
+    
+            success = (info['converged'] and
+                       np.allclose(phi, phi_direct, rtol=0, atol=1e-8))
+    
+            assert success
+
+
+def test_error_estimate():
+    """Test: the estimated error bounds the error of the stopped cycles"""
+    
+    mesh = graded_mesh(1000)
+    solver = pymultigrid.MultigridSolver(mesh, 1 + mesh.centroids, ('neumann', 1.0),
+                                         ('dirichlet', 2.0))
+    phi_exact, _ = solver.solve(1.0, tol=1e-15, max_cycles=40)
+    
+    for tol in [1e-6, 1e-10]:
+        phi, info = solver.solve(1.0, tol=tol)
+        error = np.abs(phi - phi_exact).max() / np.abs(phi_exact).max()
+        
+        success = (info['converged'] and (info['error'] <= tol) and
+                   (error <= 1.5 * info['error']) and (info['residual'] < 1e-8))
+        
+        assert success
+
+
+def test_mesh_independent_convergence():
+    """Test: number of cycles independent of number of cells and grading"""
+    
+    n_cycles = []
+    for N_fv in [100, 1000, 10000]:
+        for ratio in [1.0, 1e4, 1e8]:
+            mesh = graded_mesh(N_fv, ratio) if ratio > 1 else pymesh.Mesh(
+                       (np.arange(N_fv) + 0.5) / N_fv, np.linspace(0, 1, N_fv + 1))
+            _, info = pymultigrid.solve_diffusion_multigrid(
+                mesh, 1.0, 1.0, ('neumann', 1.0), ('dirichlet', 2.0))
+            n_cycles.append(info['n_cycles'])
+    
+    success = max(n_cycles) - min(n_cycles) <= 2
+    
+    assert success
+
+
+def test_extreme_grading():
+    """Test: no loss of accuracy when the smallest cells are tiny"""
+    
+    # first cell ~1e-11 wide: -phi'' = 1, phi'(0) = 1, phi(1) = 2
+    mesh = graded_mesh(10**4, 1e8)
+    xC = mesh.centroids
+    phi, _ = pymultigrid.solve_diffusion_multigrid(mesh, 1.0, 1.0, ('neumann', 1.0),
+                                                   ('dirichlet', 2.0))
+    
+    success = np.abs(phi - (-xC**2/2 + xC + 1.5)).max() < 1e-6
+    
+    assert success
+
+
+def test_multigrid_preconditioner():
+    """Test: conjugate gradient preconditioned by a V-cycle"""
+    
+    mesh = graded_mesh(2000)
+    solver = pymultigrid.MultigridSolver(mesh, 2.0, ('dirichlet', 0.0),
+                                         ('neumann', 1.0))
+    b = solver.rhs(np.cos(mesh.centroids))
+    A = solver.operators[0]
+    phi, info = pysolver.conjugate_gradient(A, b, solver.precondition)
+    _, info_plain = pysolver.conjugate_gradient(A, b, max_iterations=50)
+    
+    success = (info['converged'] and (info['n_iterations'] < 15) and
+               not info_plain['converged'] and
+               np.allclose(phi, pysolver.solve_tridiagonal(A, b), rtol=0, atol=1e-8))
+    
+    assert success
+
+
+def test_unknown_cycle():
+    """Test: unknown cycle"""
+    
+    with pytest.raises(ValueError):
+        pymultigrid.MultigridSolver(graded_mesh(10), cycle='F')
+
+
+
+if __name__ == '__main__':
+    import context
+    
+    parent_dir = './data/'
+    junk_dir = './junk/'
+    
+    test_build_hierarchy()
+    test_multigrid_vs_thomas()
+    test_error_estimate()
+    test_mesh_independent_convergence()
+    test_extreme_grading()
+    test_multigrid_preconditioner()
+    test_unknown_cycle()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+
+"""
+Unit tests for the domain decomposition and the shared-memory execution
+
+To run all tests: navigate to the top-level directory and execute:
+pytest
+
+To run tests for just one file:
+pytest file_to_test.py
+
+"""
+
+import os
+import numpy as np
+import pytest
+from pycfd import pymesh, pypartition
+
+# parent directory used for data files, w.r.t. to the MAIN project directory
+parent_dir = 'tests/data/'
+# directory used for junk data created by tests
+junk_dir = 'tests/junk/'
+
+
+def uniform_mesh(N_fv):
+    """Uniform mesh in [0, 1]"""
+    
+    geometry = {'xf_0': 0.0, 'xf_N': 1.0, 'N_fv': N_fv, 'spacing': 'uniform',
+                'expansion_ratio': 1.0}
+    
+    return pymesh.generate_mesh(geometry)
+
+
+def diffusion_kernel(u, subdomain, c):
+    """Explicit diffusion step with a 5-point stencil, zero outside the mesh"""
+    
+    g = subdomain.n_ghost
+    if subdomain.is_first:
+        u[:g] = 0.0
+    if subdomain.is_last:
+        u[-g:] = 0.0
+    n = len(u)
+    u[g:n-g] += c * (-u[g-2:n-g-2] + 16*u[g-1:n-g-1] - 30*u[g:n-g] +
+                     16*u[g+1:n-g+1] - u[g+2:n-g+2]) / 12
+
+
+def pid_kernel(u, subdomain):
+    """Store the process identifier in the cells of the subdomain"""
+    
+    u[subdomain.interior] = os.getpid()
+
+
+def failing_kernel(u, subdomain):
+    """Kernel failing in the second subdomain"""
+    
+    if subdomain.index == 1:
+        raise RuntimeError('failure')
+
+
+
+def test_partition_mesh():
+    """Test: subdomains balanced by number of cells and by weight"""
+    
+    weights = np.ones(100)
+    weights[:10] = 10.0
+    offsets_weights = pypartition.partition_mesh(100, 4, weights)
+    subdomain_weights = np.add.reduceat(weights, offsets_weights[:-1])
+    
+    success = (np.array_equal(pypartition.partition_mesh(10, 3), [0, 3, 6, 10]) and
+               (offsets_weights[1] < 10) and
+               (subdomain_weights.max() < 1.1 * weights.sum() / 4) and
+               # all the weight in the last cell: minimum size enforced
+               np.array_equal(pypartition.partition_mesh(10, 3, np.eye(10)[-1],
+                                                         min_size=2), [0, 6, 8, 10]))
+    
+    assert success
+    
+    with pytest.raises(ValueError):
+        pypartition.partition_mesh(5, 3, min_size=2)
+    with pytest.raises(ValueError):
+        pypartition.partition_mesh(5, 2, -np.ones(5))
+
+
+def test_scatter_gather():
+    """Test: values and ghost cells of the subdomains"""
+    
+    mesh = uniform_mesh(20)
+    decomposition = pypartition.DomainDecomposition(mesh, 3, n_ghost=2)
+    values = np.arange(20.0)
+    with decomposition.create_field(values) as field:
+        u = field.local(decomposition.subdomains[1])
+        start = decomposition.subdomains[1].start
+        stop = decomposition.subdomains[1].stop
+    
+        success = (np.array_equal(field.gather(decomposition), values) and
+                   np.array_equal(u, values[start-2:stop+2]) and
+                   np.array_equal(decomposition.local_mesh(1).centroids,
+                                  mesh.centroids[start:stop]))
+    
+        assert success
+
+
+@pytest.mark.parametrize('parallel', [False, True])
+def test_parallel_stencil(parallel):
+    """Test: same result as the stencil on the whole mesh"""
+    
+    mesh = uniform_mesh(200)
+    phi = np.sin(np.pi * mesh.centroids)
+    with pypartition.DomainDecomposition(mesh, 4, n_ghost=2) as decomposition:
+        with decomposition.create_field(phi) as field:
+            # in two runs, with the same workers
+            decomposition.run(diffusion_kernel, field, 20, args=(0.2,), parallel=parallel)
+            decomposition.run(diffusion_kernel, field, 30, args=(0.2,), parallel=parallel)
+            phi_parallel = field.gather(decomposition)
+    
+    # the whole mesh as a single subdomain
+    u = np.concatenate([[0.0, 0.0], phi, [0.0, 0.0]])
+    whole = pypartition.Subdomain(0, 0, 200, 2, True, True)
+    for _ in range(50):
+        diffusion_kernel(u, whole, 0.2)
+    
+    success = np.allclose(phi_parallel, u[2:-2], rtol=0, atol=1e-14)
+    
+    assert success
+
+
+def test_persistent_workers():
+    """Test: the workers are reused by every run until close()"""
+    
+    decomposition = pypartition.DomainDecomposition(uniform_mesh(20), 3)
+    with decomposition.create_field() as field:
+        decomposition.run(pid_kernel, field, 1)
+        pids_first = field.gather(decomposition)
+        decomposition.run(pid_kernel, field, 1)
+        pids_second = field.gather(decomposition)
+        decomposition.close()
+        decomposition.run(pid_kernel, field, 1)
+        pids_restarted = field.gather(decomposition)
+    decomposition.close()
+    
+    success = ((len(set(pids_first)) == 3) and (os.getpid() not in pids_first) and
+               np.array_equal(pids_first, pids_second) and
+               not set(pids_first) & set(pids_restarted) and
+               (decomposition._workers is None))
+    
+    assert success
+
+
+def test_worker_failure():
+    """Test: a failing worker stops the others, new workers for the next run"""
+    
+    with pypartition.DomainDecomposition(uniform_mesh(20), 3) as decomposition:
+        with decomposition.create_field() as field:
+            with pytest.raises(RuntimeError, match="subdomains 1 failed"):
+                decomposition.run(failing_kernel, field, 10)
+            decomposition.run(pid_kernel, field, 1)
+            pids = field.gather(decomposition)
+    
+    success = len(set(pids)) == 3
+    
+    assert success
+
+
+
+if __name__ == '__main__':
+    import context
+    
+    parent_dir = './data/'
+    junk_dir = './junk/'
+    
+    test_partition_mesh()
+    test_scatter_gather()
+    test_persistent_workers()
+    test_worker_failure()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+
+"""
+Unit tests for the results store
+
+To run all tests: navigate to the top-level directory and execute:
+pytest
+
+To run tests for just one file:
+pytest file_to_test.py
+
+"""
+
+import os
+import numpy as np
+import pytest
+from pycfd import pymesh, pyresults
+
+# parent directory used for data files, w.r.t. to the MAIN project directory
+parent_dir = 'tests/data/'
+# directory used for junk data created by tests
+junk_dir = 'tests/junk/'
+
+
+def geometric_mesh(N_fv):
+    """Geometric mesh in [0, 1]"""
+    
+    geometry = {'xf_0': 0.0, 'xf_N': 1.0, 'N_fv': N_fv, 'spacing': 'geometric',
+                'expansion_ratio': 1.01}
+    
+    return pymesh.generate_mesh(geometry)
+
+
+def solution(mesh, step):
+    """Fields of a step"""
+    
+    return {'T': np.sin(mesh.centroids + step), 'u': mesh.centroids * step}
+
+
+
+@pytest.mark.parametrize('dtype', [np.float32, np.float64])
+def test_append_and_read(dtype):
+    """Test: steps read back by step, time, record and cell history"""
+    
+    os.makedirs(junk_dir, exist_ok=True)
+    results_file = junk_dir + 'test_results_' + np.dtype(dtype).name + '.res'
+    mesh = geometric_mesh(101)
+    with pyresults.ResultsStore.create(results_file, mesh, ['T', 'u'], dtype) as store:
+        for step in range(0, 50, 5):
+            store.append(step, 0.1 * step, solution(mesh, step))
+    
+    with pyresults.ResultsStore(results_file, mesh=mesh) as store:
+        fields = store.read_step(25)
+        step_time, fields_time = store.read_time(2.7)
+        fields_last = store.read_record(-1, mmap=False)
+        history = store.history('T', 7)
+        history_cells = store.history('u', [0, 100])
+        success = ((len(store) == 10) and (store.field_names == ('T', 'u')) and
+                   (store.dtype == dtype) and
+                   np.array_equal(store.steps, np.arange(0, 50, 5)) and
+                   np.allclose(store.times, 0.1 * np.arange(0, 50, 5)) and
+                   np.array_equal(fields['T'], solution(mesh, 25)['T'].astype(dtype)) and
+                   np.array_equal(fields['u'], solution(mesh, 25)['u'].astype(dtype)) and
+                   (step_time == 25) and np.array_equal(fields_time['T'], fields['T']) and
+                   np.array_equal(fields_last['u'], solution(mesh, 45)['u'].astype(dtype)) and
+                   np.array_equal(history, np.sin(mesh.centroids[7] +
+                                                  np.arange(0, 50, 5)).astype(dtype)) and
+                   (history_cells.shape == (10, 2)))
+    
+    assert success
+
+
+def test_interrupted_write():
+    """Test: an incomplete record is ignored, then removed when appending"""
+    
+    os.makedirs(junk_dir, exist_ok=True)
+    results_file = junk_dir + 'test_results_interrupted.res'
+    mesh = geometric_mesh(50)
+    store = pyresults.ResultsStore.create(results_file, mesh, ['T', 'u'])
+    for step in range(3):
+        store.append(step, float(step), solution(mesh, step))
+    # a reader sees the steps appended after it was opened only when refreshed
+    reader = pyresults.ResultsStore(results_file)
+    store.append(3, 3.0, solution(mesh, 3))
+    N_before = len(reader)
+    N_new = reader.refresh()
+    store.close()
+    reader.close()
+    size = os.path.getsize(results_file)
+    # the writer is killed while writing the next record
+    with open(results_file, 'ab') as file:
+        file.write(pyresults.RECORD_MAGIC + bytes(100))
+    
+    with pyresults.ResultsStore(results_file) as store:
+        readable = (len(store) == 4) and np.array_equal(store.steps, np.arange(4))
+    with pyresults.ResultsStore(results_file, 'a') as store:
+        store.append(4, 4.0, solution(mesh, 4))
+    
+    with pyresults.ResultsStore(results_file) as store:
+        success = (readable and (N_before == 3) and (N_new == 1) and
+                   (len(store) == 5) and
+                   (os.path.getsize(results_file) == size + store.record_size) and
+                   np.array_equal(store.read_step(4)['u'], solution(mesh, 4)['u']))
+    
+    assert success
+
+
+def test_results_errors():
+    """Test: other mesh, wrong steps and fields, read-only store, wrong file"""
+    
+    os.makedirs(junk_dir, exist_ok=True)
+    results_file = junk_dir + 'test_results_errors.res'
+    mesh = geometric_mesh(20)
+    with pytest.raises(ValueError):
+        pyresults.ResultsStore.create(results_file, mesh, ['T', 'T'])
+    with pytest.raises(ValueError):
+        pyresults.ResultsStore.create(results_file, mesh, ['T'], dtype=np.float16)
+    with pyresults.ResultsStore.create(results_file, mesh, ['T']) as store:
+        store.append(1, 0.5, np.ones(20))
+        with pytest.raises(ValueError, match='not after the last saved step'):
+            store.append(1, 0.6, np.ones(20))
+        with pytest.raises(ValueError, match='not after the last saved step'):
+            store.append(2, 0.4, np.ones(20))
+        with pytest.raises(ValueError, match='one value per cell'):
+            store.append(2, 0.6, np.ones(19))
+        with pytest.raises(ValueError, match="Missing field 'T'"):
+            store.append(2, 0.6, {'u': np.ones(20)})
+    with pytest.raises(ValueError, match='another mesh'):
+        pyresults.ResultsStore(results_file, mesh=geometric_mesh(21))
+    with pyresults.ResultsStore(results_file) as store:
+        with pytest.raises(ValueError, match='not open for appending'):
+            store.append(2, 0.6, np.ones(20))
+        with pytest.raises(KeyError):
+            store.read_step(2)
+        with pytest.raises(ValueError):
+            store.read_time(0.1)
+    with pytest.raises(ValueError, match='Not a results file'):
+        pyresults.ResultsStore(parent_dir + 'test.mesh')
+
+
+
+if __name__ == '__main__':
+    import context
+    
+    parent_dir = './data/'
+    junk_dir = './junk/'
+    
+    test_interrupted_write()
+    test_results_errors()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+
+"""
+Unit tests for the steady diffusion solver
+
+To run all tests: navigate to the top-level directory and execute:
+pytest
+
+To run tests for just one file:
+pytest file_to_test.py
+
+"""
+
+import numpy as np
+import pytest
+from pycfd import pykernels, pymesh, pysolver
+
+# parent directory used for data files, w.r.t. to the MAIN project directory
+parent_dir = 'tests/data/'
+# directory used for junk data created by tests
+junk_dir = 'tests/junk/'
+
+
+
+def test_solve_tridiagonal(monkeypatch):
+    """Test: Thomas algorithm vs dense solver, also across many blocks"""
+    
+    rng = np.random.default_rng(0)
+    N = 1000
+    A = rng.uniform(-1, 0, (3, N))
+    A[1] = 2.5 + rng.uniform(0, 1, N)
+    A[0, 0] = 0.0
+    A[2, -1] = 0.0
+    b = rng.uniform(-1, 1, N)
+    x_dense = np.linalg.solve(pysolver.banded_to_dense(A), b)
+    
+    # the blocks are of the reference (numpy) kernels
+    monkeypatch.setattr(pykernels, '_backend', 'numpy')
+    for block_size in [pykernels.THOMAS_BLOCK_SIZE, 7, 1]:
+        monkeypatch.setattr(pykernels, 'THOMAS_BLOCK_SIZE', block_size)
+        x = pysolver.solve_tridiagonal(A, b)
+    
+        success = np.allclose(x, x_dense, rtol=0, atol=1e-12)
+    
+        assert success
+
+
+def test_solve_diffusion_linear():
+    """Test: linear solution is exact on a graded mesh (Dirichlet and Neumann)"""
+    
+    mesh = pymesh.mesher(parent_dir + 'test_geometric.input',
+                         junk_dir + 'test_solve_diffusion_linear.mesh', 
+                         use_cache=False)
+    xC = mesh.centroids
+    
+    phi = pysolver.solve_diffusion(mesh, 3.0, 0.0, ('dirichlet', 1.0),
+                                   ('dirichlet', 5.0))
+    # 0 <= x <= 2
+    success_dirichlet = np.allclose(phi, 1.0 + 2.0*xC, rtol=0, atol=1e-12)
+    
+    phi = pysolver.solve_diffusion(mesh, 3.0, 0.0, ('neumann', -0.5),
+                                   ('dirichlet', 5.0))
+    success_neumann = np.allclose(phi, 5.0 - 0.5*(xC - 2.0), rtol=0, atol=1e-12)
+    
+    phi = pysolver.solve_diffusion(mesh, 3.0, 0.0, ('dirichlet', 1.0), 
+                                   ('neumann', 2.0))
+    success_neumann_right = np.allclose(phi, 1.0 + 2.0*xC, rtol=0, atol=1e-12)
+    
+    success = success_dirichlet and success_neumann and success_neumann_right
+    
+    assert success
+
+
+def test_solve_diffusion_composite_wall():
+    """Test: two materials, harmonic mean of the conductivity on the faces"""
+    
+    # 0 <= x <= 1 with conductivity 1, 1 <= x <= 2 with conductivity 4
+    xf = np.array([0.0, 0.3, 0.7, 1.0, 1.2, 1.6, 2.0])
+    mesh = pymesh.Mesh(0.5*(xf[1:] + xf[:-1]), xf)
+    conductivity = np.array([1.0, 1.0, 1.0, 4.0, 4.0, 4.0])
+    phi = pysolver.solve_diffusion(mesh, conductivity, 0.0, ('dirichlet', 0.0),
+                                   ('dirichlet', 1.0))
+    
+    # same heat flux q through both materials: q*1/1 + q*1/4 = 1
+    q = 1 / 1.25
+    xC = mesh.centroids
+    phi_exact = np.where(xC < 1.0, q*xC, q + q/4*(xC - 1.0))
+    
+    success = np.allclose(phi, phi_exact, rtol=0, atol=1e-12)
+    
+    assert success
+
+
+def test_solve_diffusion_convergence():
+    """Test: second-order convergence with a source term"""
+    
+    # -phi'' = pi^2 sin(pi x), phi(0) = phi(1) = 0  =>  phi = sin(pi x)
+    errors = []
+    for N_fv in [20, 40, 80]:
+        # same ratio between the last and the first cell on all the meshes
+        geometry = {'xf_0': 0.0, 'xf_N': 1.0, 'N_fv': N_fv, 
+                    'spacing': 'geometric', 'expansion_ratio': 1.1**(20/N_fv)}
+        mesh = pymesh.generate_mesh(geometry)
+        xC = mesh.centroids
+        phi = pysolver.solve_diffusion(mesh, 1.0, np.pi**2 * np.sin(np.pi*xC))
+        errors.append(np.abs(phi - np.sin(np.pi*xC)).max())
+    orders = np.log2(np.array(errors[:-1]) / np.array(errors[1:]))
+    
+    success = (orders > 1.8).all()
+    
+    assert success
+
+
+def test_solve_diffusion_dense():
+    """Test: same solution as the dense solver, mesh as dictionary"""
+    
+    mesh = pymesh.read_mesh(parent_dir + 'test.mesh')
+    args = (mesh, 2.0, 1.0, ('neumann', 1.0), ('dirichlet', 3.0))
+    A, b = pysolver.assemble_diffusion(*args)
+    phi_dense = np.linalg.solve(pysolver.banded_to_dense(A), b)
+    phi = pysolver.solve_diffusion(*args)
+    
+    success = np.allclose(phi, phi_dense, rtol=0, atol=1e-12)
+    
+    assert success
+
+
+def test_solve_diffusion_errors():
+    """Test: unknown boundary conditions, two Neumann, negative conductivity"""
+    
+    mesh = pymesh.read_mesh(parent_dir + 'test.mesh')
+    with pytest.raises(ValueError):
+        pysolver.solve_diffusion(mesh, bc_left=('robin', 1.0))
+    with pytest.raises(ValueError):
+        pysolver.solve_diffusion(mesh, bc_left=('neumann', 0.0),
+                                 bc_right=('Neumann', 1.0))
+    with pytest.raises(ValueError):
+        pysolver.solve_diffusion(mesh, conductivity=-1.0)
+
+
+
+if __name__ == '__main__':
+    import context
+    
+    # parent directory used for data files, w.r.t. to the TEST directory
+    parent_dir = './data/'
+    junk_dir = './junk/'
+    
+    test_solve_diffusion_linear()
+    test_solve_diffusion_composite_wall()
+    test_solve_diffusion_convergence()
+    test_solve_diffusion_dense()
+    test_solve_diffusion_errors()
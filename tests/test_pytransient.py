@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+
+"""
+Unit tests for the transient convection-diffusion solver
+
+To run all tests: navigate to the top-level directory and execute:
+pytest
+
+To run tests for just one file:
+pytest file_to_test.py
+
+"""
+
+import tracemalloc
+import numpy as np
+import pytest
+from pycfd import pymesh, pysolver, pytransient
+
+# parent directory used for data files, w.r.t. to the MAIN project directory
+parent_dir = 'tests/data/'
+# directory used for junk data created by tests
+junk_dir = 'tests/junk/'
+
+
+def graded_mesh(N_fv=100):
+    """Geometric mesh in [0, 1]"""
+    
+    geometry = {'xf_0': 0.0, 'xf_N': 1.0, 'N_fv': N_fv, 'spacing': 'geometric',
+                'expansion_ratio': 1.01}
+    
+    return pymesh.generate_mesh(geometry)
+
+
+
+def test_diffusion_decay():
+    """Test: decay of a sine with all the time schemes"""
+    
+    mesh = graded_mesh()
+    xC = mesh.centroids
+    t_end = 0.1
+    phi_exact = np.sin(np.pi*xC) * np.exp(-np.pi**2 * t_end)
+    
+    for time_scheme, cfl in [('explicit', 0.5), ('implicit', 2.0),
+                             ('crank-nicolson', 5.0)]:
+        solver = pytransient.ConvectionDiffusion(mesh, diffusivity=1.0,
+                                                 time_scheme=time_scheme)
+        phi = np.sin(np.pi*xC)
+        phi, stats = solver.run(phi, t_end, cfl=cfl)
+    
+        success = ((np.abs(phi - phi_exact).max() < 1e-3) and
+                   (stats['t'] == t_end) and
+                   (stats['n_steps'] == solver.n_steps))
+    
+        assert success
+
+
+def test_steady_state():
+    """Test: long implicit run reaches the solution of the steady solver"""
+    
+    mesh = graded_mesh()
+    args = {'source': 2.0, 'bc_left': ('neumann', 1.0),
+            'bc_right': ('dirichlet', 3.0)}
+    solver = pytransient.ConvectionDiffusion(mesh, diffusivity=0.5,
+                                             time_scheme='implicit', **args)
+    phi = np.zeros(mesh.N_fv)
+    solver.run(phi, 100.0, dt=1.0)
+    phi_steady = pysolver.solve_diffusion(mesh, 0.5, **args)
+    
+    success = np.allclose(phi, phi_steady, rtol=0, atol=1e-10)
+    
+    assert success
+
+
+def test_convection_diffusion_steady():
+    """Test: steady convection-diffusion with central scheme vs exact solution"""
+    
+    mesh = graded_mesh(200)
+    xC = mesh.centroids
+    Pe = 10.0
+    solver = pytransient.ConvectionDiffusion(mesh, velocity=1.0, diffusivity=1/Pe,
+                                             bc_left=('dirichlet', 0.0),
+                                             bc_right=('dirichlet', 1.0),
+                                             time_scheme='implicit',
+                                             convection_scheme='central')
+    phi = np.zeros(mesh.N_fv)
+    solver.run(phi, 50.0, dt=0.5)
+    phi_exact = np.expm1(Pe*xC) / np.expm1(Pe)
+    
+    success = np.abs(phi - phi_exact).max() < 2e-3
+    
+    assert success
+
+
+def test_tvd_bounded():
+    """Test: TVD schemes don't create new extrema and beat upwind"""
+    
+    mesh = graded_mesh(200)
+    xC = mesh.centroids
+    phi_exact = (xC < 0.5).astype(float)
+    
+    errors = {}
+    for scheme, limiter in [('upwind', 'minmod'), ('tvd', 'minmod'),
+                            ('tvd', 'van leer'), ('tvd', 'superbee')]:
+        solver = pytransient.ConvectionDiffusion(mesh, velocity=1.0,
+                                                 bc_left=('dirichlet', 1.0),
+                                                 bc_right=('neumann', 0.0),
+                                                 time_scheme='explicit',
+                                                 convection_scheme=scheme,
+                                                 limiter=limiter)
+        phi = np.zeros(mesh.N_fv)
+        phi, _ = solver.run(phi, 0.5, cfl=0.4)
+        errors[limiter if scheme == 'tvd' else scheme] = np.abs(phi - phi_exact).mean()
+    
+        success = (phi.min() >= 0.0) and (phi.max() <= 1.0 + 1e-14)
+    
+        assert success
+    
+    success = ((errors['minmod'] < errors['upwind']) and
+               (errors['superbee'] < errors['minmod']))
+    
+    assert success
+
+
+def test_tvd_negative_velocity():
+    """Test: convection from right to left mirrors convection from left to right"""
+    
+    xf = np.linspace(0.0, 1.0, 101)
+    mesh = pymesh.Mesh(0.5*(xf[1:] + xf[:-1]), xf)
+    phi = {}
+    for sign, bc_left, bc_right in [(1, ('dirichlet', 1.0), ('neumann', 0.0)),
+                                    (-1, ('neumann', 0.0), ('dirichlet', 1.0))]:
+        solver = pytransient.ConvectionDiffusion(mesh, velocity=sign, diffusivity=1e-3,
+                                                 bc_left=bc_left, bc_right=bc_right,
+                                                 time_scheme='crank-nicolson',
+                                                 convection_scheme='tvd')
+        phi[sign] = solver.run(np.zeros(mesh.N_fv), 0.3, cfl=0.5)[0]
+    
+    success = np.allclose(phi[1], phi[-1][::-1], rtol=0, atol=1e-12)
+    
+    assert success
+
+
+def test_step_no_allocations():
+    """Test: explicit time steps don't allocate arrays"""
+    
+    mesh = graded_mesh(10**4)
+    solver = pytransient.ConvectionDiffusion(mesh, velocity=1.0, diffusivity=1e-3,
+                                             time_scheme='explicit',
+                                             convection_scheme='tvd')
+    phi = np.zeros(mesh.N_fv)
+    dt = solver.cfl_time_step(0.5)
+    solver.step(phi, dt)
+    tracemalloc.start()
+    for _ in range(10):
+        solver.step(phi, dt)
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    # a single array of the mesh takes 80 kB
+    success = peak_memory < 8 * 10**3
+    
+    assert success
+
+
+def test_unknown_schemes():
+    """Test: unknown schemes, limiters and negative diffusivity"""
+    
+    mesh = graded_mesh(10)
+    with pytest.raises(ValueError):
+        pytransient.ConvectionDiffusion(mesh, time_scheme='runge-kutta')
+    with pytest.raises(ValueError):
+        pytransient.ConvectionDiffusion(mesh, convection_scheme='quick')
+    with pytest.raises(ValueError):
+        pytransient.ConvectionDiffusion(mesh, convection_scheme='tvd', limiter='koren')
+    with pytest.raises(ValueError):
+        pytransient.ConvectionDiffusion(mesh, diffusivity=-1.0)
+
+
+
+if __name__ == '__main__':
+    import context
+    
+    parent_dir = './data/'
+    junk_dir = './junk/'
+    
+    test_diffusion_decay()
+    test_steady_state()
+    test_convection_diffusion_steady()
+    test_tvd_bounded()
+    test_tvd_negative_velocity()
+    test_step_no_allocations()
+    test_unknown_schemes()